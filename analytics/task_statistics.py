@@ -0,0 +1,40 @@
+import numpy as np
+
+
+def span_days(start, end):
+    return (end - start).astype(np.int64) + 1
+
+
+def has_dates(start, end):
+    return ~np.isnat(start) & ~np.isnat(end)
+
+
+def task_status_statistics(days):
+    completed = has_dates(days["actual_start"], days["actual_end"])
+    completed_on_time = int((completed & (days["actual_end"] <= days["planned_end"])).sum())
+    completed_count = int(completed.sum())
+    return {
+        "completed_on_time": completed_on_time,
+        "overdue": completed_count - completed_on_time,
+        "not_completed": len(completed) - completed_count,
+    }
+
+
+def average_durations(days):
+    planned = has_dates(days["planned_start"], days["planned_end"])
+    actual = has_dates(days["actual_start"], days["actual_end"])
+    planned_spans = span_days(days["planned_start"][planned], days["planned_end"][planned])
+    actual_spans = span_days(days["actual_start"][actual], days["actual_end"][actual])
+    return {
+        "avg_planned_duration": float(planned_spans.mean()) if planned_spans.size else 0,
+        "avg_actual_duration": float(actual_spans.mean()) if actual_spans.size else 0,
+    }
+
+
+def average_duration_deviation(days):
+    # Учитываются задачи с заданной фактической длительностью
+    actual = days["actual_duration"]
+    completed = ~np.isnan(actual) & (actual != 0)
+    if not completed.any():
+        return 0
+    return float((actual[completed] - days["duration"][completed]).mean())
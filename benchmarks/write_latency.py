@@ -0,0 +1,98 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection_profiles import CONNECTION_PROFILES
+from database.db_manager import DatabaseManager
+
+# Параметры SQLite по умолчанию - так БД открывалась до появления профилей
+SQLITE_DEFAULTS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "cache_size": -2000,
+    "mmap_size": 0,
+    "temp_store": "DEFAULT",
+    "foreign_keys": "OFF",
+}
+
+
+def prepare_database(path, tasks, backend):
+    # На пустой БД создается синтетический план, чтобы было что обновлять
+    db_manager = DatabaseManager(path, profile="bulk-load", backend=backend)
+    if not db_manager.get_project_start_date():
+        db_manager.save_project_start_date("2024-01-01")
+    task_ids = [row[0] for row in db_manager.execute_query("SELECT id FROM tasks")]
+    if not task_ids:
+        task_ids = db_manager.add_tasks_bulk(
+            {
+                "ref": index,
+                "name": f"Задача {index}",
+                "description": "",
+                "direction": "ТМО",
+                "duration": 1 + index % 5,
+                "dependencies": [index - 1] if index else [],
+            }
+            for index in range(tasks)
+        )
+    db_manager.close()
+    return task_ids
+
+
+def measure_profile(path, profile, task_ids, operations, backend):
+    if profile in CONNECTION_PROFILES:
+        db_manager = DatabaseManager(path, profile=profile, backend=backend)
+    else:
+        db_manager = DatabaseManager(path, profile="durable", backend=backend)
+        for pragma, value in SQLITE_DEFAULTS.items():
+            db_manager.exec_statement(f"PRAGMA {pragma} = {value}")
+    latencies = []
+    for operation in range(operations):
+        task_id = task_ids[operation % len(task_ids)]
+        started = time.perf_counter()
+        if operation % 2:
+            db_manager.update_task_actual_dates(task_id, "2024-01-01", "2024-01-02")
+        else:
+            db_manager.update_task_actual_duration(task_id, 1 + operation % 5)
+        latencies.append((time.perf_counter() - started) * 1000)
+    db_manager.close()
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка одиночных UPDATE для разных профилей подключения")
+    parser.add_argument("database", nargs="?", default="pnr_planner.db", help="БД-образец, копируется во временный каталог")
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=1000, help="Размер синтетического плана для пустой БД")
+    parser.add_argument("--backend", choices=("qt", "sqlite"), default="qt")
+    args = parser.parse_args()
+
+    app = None
+    if args.backend == "qt":
+        from PySide6.QtCore import QCoreApplication
+        app = QCoreApplication([])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.db")
+        if os.path.exists(args.database):
+            shutil.copy(args.database, path)
+        task_ids = prepare_database(path, args.tasks, args.backend)
+
+        print(f"{'профиль':<12}{'среднее, мс':>14}{'p50, мс':>10}{'p95, мс':>10}")
+        for profile in ("sqlite-default", *CONNECTION_PROFILES):
+            result = measure_profile(path, profile, task_ids, args.operations, args.backend)
+            print(f"{profile:<12}{result['mean']:>14.3f}{result['p50']:>10.3f}{result['p95']:>10.3f}")
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from PySide6.QtCore import QObject, Signal
+
+
+class AsyncDatabase(QObject):
+    # Фасад над DatabaseManager для GUI: запросы ставятся в очередь и выполняются по одному
+    # в отдельном потоке БД со своими соединениями. submit() сразу возвращает Future, а обработчики
+    # on_result / on_error вызываются в потоке GUI через сигналы (соединение через очередь событий Qt)
+    succeeded = Signal(object, object)
+    failed = Signal(object, object)
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self._requests = queue.Queue()
+        self.succeeded.connect(self._deliver)
+        self.failed.connect(self._deliver)
+        self._thread = threading.Thread(target=self._run, name="database-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, function, *args, on_result=None, on_error=None):
+        # function(*args) выполняется в потоке БД; обычно это метод DatabaseManager или EntityRepository
+        future = Future()
+        self._requests.put((future, function, args, on_result, on_error))
+        return future
+
+    def pending(self):
+        return self._requests.unfinished_tasks
+
+    def close(self):
+        # Запросы, поставленные до закрытия, выполняются; затем соединения потока БД закрываются
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                self._requests.task_done()
+                break
+            future, function, args, on_result, on_error = request
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = function(*args)
+                    except Exception as e:
+                        future.set_exception(e)
+                        self.failed.emit(on_error or self._report_error, e)
+                    else:
+                        future.set_result(result)
+                        if on_result:
+                            self.succeeded.emit(on_result, result)
+            finally:
+                self._requests.task_done()
+        self.db_manager.release_thread_connections()
+
+    def _deliver(self, callback, value):
+        callback(value)
+
+    def _report_error(self, error):
+        print(f"Ошибка при выполнении запроса к БД: {error}")
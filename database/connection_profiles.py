@@ -0,0 +1,33 @@
+# Параметры соединения SQLite, применяемые при открытии БД.
+# durable - каждая транзакция сбрасывается на диск (synchronous=FULL);
+# fast - WAL с synchronous=NORMAL: БД не повреждается при сбое, но последние транзакции
+#        могут быть потеряны при отключении питания;
+# bulk-load - для массовой загрузки: без fsync и без проверки внешних ключей
+CONNECTION_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16384,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "foreign_keys": "ON",
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "foreign_keys": "OFF",
+    },
+}
+
+DEFAULT_PROFILE = "fast"
@@ -0,0 +1,213 @@
+import importlib
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from database.connection_profiles import CONNECTION_PROFILES
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+# Драйверы загружаются только при выборе, чтобы без графического интерфейса не импортировать Qt
+BACKENDS = {
+    "qt": ("database.qt_backend", "QtConnectionRegistry"),
+    "sqlite": ("database.sqlite_backend", "SqliteConnectionRegistry"),
+}
+DEFAULT_BACKEND = "qt"
+
+
+def create_registry(backend, db_name, profile):
+    if backend not in BACKENDS:
+        raise Exception(f"Неизвестный драйвер БД: {backend}")
+    module_name, class_name = BACKENDS[backend]
+    return getattr(importlib.import_module(module_name), class_name)(db_name, profile)
+
+
+class ConnectionRegistry(ABC):
+    # Соединение можно использовать только в том потоке, где оно открыто, поэтому каждый поток
+    # получает свои именованные соединения: читающее (только для чтения) и пишущее.
+    # Пишущие транзакции всех потоков выполняются по очереди под общей блокировкой.
+    # Драйвер (QtSql или sqlite3) реализует открытие соединений, транзакции и объект запроса
+    # с интерфейсом QSqlQuery: prepare, bindValue, exec, next, value, lastInsertId, finish, lastError
+    _registry_numbers = itertools.count()
+
+    def __init__(self, db_name, profile):
+        if profile not in CONNECTION_PROFILES:
+            raise Exception(f"Неизвестный профиль подключения: {profile}")
+        self.db_name = db_name
+        self.profile = profile
+        self.write_lock = threading.RLock()
+        self._prefix = f"pnr_{next(self._registry_numbers)}"
+        self._connection_numbers = itertools.count()
+        self._local = threading.local()
+        self._open_names = set()
+        self._names_lock = threading.Lock()
+        self.statement_hits = 0
+        self.statement_misses = 0
+        self._stats_lock = threading.Lock()
+
+    @abstractmethod
+    def query(self, db):
+        pass
+
+    @abstractmethod
+    def field_types(self, query):
+        # Типы Python (int, float, bool) столбцов результата выполненного запроса, None - если неизвестен
+        pass
+
+    def writer(self):
+        return self._connection("writer", read_only=False)
+
+    def reader(self):
+        # Внутри пишущей транзакции чтение идет через то же соединение, чтобы видеть свои изменения
+        if self._state().transaction_depth:
+            return self.writer()
+        return self._connection("reader", read_only=True)
+
+    def current_profile(self):
+        return self._state().profile or self.profile
+
+    def apply_profile(self, profile):
+        # Профиль меняется только для соединений текущего потока
+        if profile not in CONNECTION_PROFILES:
+            raise Exception(f"Неизвестный профиль подключения: {profile}")
+        state = self._state()
+        state.profile = profile
+        for role, db in state.connections.items():
+            self._apply_pragmas(db, profile, read_only=role == "reader")
+
+    def statement(self, db, sql):
+        # Подготовленные запросы кэшируются по тексту SQL и соединению и переиспользуются
+        # с новыми параметрами. Кэш у каждого потока свой, как и соединения
+        state = self._state()
+        key = (self._connection_name(db), sql)
+        query = state.statements.get(key)
+        if query is not None:
+            state.statements.move_to_end(key)
+            with self._stats_lock:
+                self.statement_hits += 1
+            return query
+
+        query = self.query(db)
+        query.setForwardOnly(True)
+        if not query.prepare(sql):
+            raise Exception(f"Ошибка при подготовке запроса: {query.lastError().text()}")
+        state.statements[key] = query
+        if len(state.statements) > STATEMENT_CACHE_SIZE:
+            state.statements.popitem(last=False)
+        with self._stats_lock:
+            self.statement_misses += 1
+        return query
+
+    def statement_cache_stats(self):
+        with self._stats_lock:
+            return {
+                "hits": self.statement_hits,
+                "misses": self.statement_misses,
+                "size": len(self._state().statements),
+            }
+
+    def begin(self):
+        state = self._state()
+        self.write_lock.acquire()
+        try:
+            self._begin(self.writer())
+        except Exception:
+            self.write_lock.release()
+            raise
+        state.transaction_depth += 1
+
+    def commit(self):
+        self._finish(self._commit)
+
+    def rollback(self):
+        self._finish(self._rollback)
+
+    def release(self):
+        # Закрывает соединения текущего потока; вызывается при завершении фоновой задачи
+        state = self._state()
+        state.statements.clear()
+        names = [self._connection_name(db) for db in state.connections.values()]
+        # Ссылки на соединения не должны оставаться в локальных переменных до _remove()
+        while state.connections:
+            state.connections.popitem()[1].close()
+        for name in names:
+            self._remove(name)
+        with self._names_lock:
+            self._open_names.difference_update(names)
+
+    def close_all(self):
+        self.release()
+        with self._names_lock:
+            names = list(self._open_names)
+            self._open_names.clear()
+        # Соединения других потоков к этому моменту должны быть освобождены через release()
+        for name in names:
+            self._remove(name)
+
+    def _finish(self, action):
+        state = self._state()
+        if not state.transaction_depth:
+            return
+        try:
+            action(self.writer())
+        finally:
+            state.transaction_depth -= 1
+            self.write_lock.release()
+
+    def _state(self):
+        state = self._local
+        if not hasattr(state, "connections"):
+            state.connections = {}
+            state.statements = OrderedDict()
+            state.transaction_depth = 0
+            state.profile = None
+        return state
+
+    def _connection(self, role, read_only):
+        state = self._state()
+        db = state.connections.get(role)
+        if db is not None:
+            return db
+
+        name = f"{self._prefix}_{role}_{next(self._connection_numbers)}"
+        db = self._open(name, read_only)
+        self._apply_pragmas(db, self.current_profile(), read_only)
+        state.connections[role] = db
+        with self._names_lock:
+            self._open_names.add(name)
+        return db
+
+    def _apply_pragmas(self, db, profile, read_only):
+        for pragma, value in CONNECTION_PROFILES[profile].items():
+            # Режим журнала хранится в файле БД и задается пишущим соединением
+            if read_only and pragma == "journal_mode":
+                continue
+            query = self.query(db)
+            if not query.exec(f"PRAGMA {pragma} = {value}"):
+                raise Exception(f"Ошибка при выполнении запроса: {query.lastError().text()}")
+
+    @abstractmethod
+    def _open(self, name, read_only):
+        pass
+
+    @abstractmethod
+    def _remove(self, name):
+        pass
+
+    @abstractmethod
+    def _connection_name(self, db):
+        pass
+
+    @abstractmethod
+    def _begin(self, db):
+        pass
+
+    @abstractmethod
+    def _commit(self, db):
+        pass
+
+    @abstractmethod
+    def _rollback(self, db):
+        pass
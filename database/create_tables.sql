@@ -25,12 +25,31 @@ CREATE TABLE IF NOT EXISTS tasks (
     FOREIGN KEY(assigned_employee_id) REFERENCES employees(id)
 );
 
-CREATE TABLE IF NOT EXISTS task_visualization_dates (
+CREATE TABLE IF NOT EXISTS project_calendar (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    task_id INTEGER NOT NULL,
-    planned_start DATE,
-    planned_end DATE,
-    actual_start DATE,
-    actual_end DATE,
-    FOREIGN KEY(task_id) REFERENCES tasks(id)
-);
\ No newline at end of file
+    workdays TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS calendar_holidays (
+    date DATE PRIMARY KEY,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS employee_calendar_exceptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    is_working INTEGER NOT NULL,
+    UNIQUE(employee_id, date),
+    FOREIGN KEY(employee_id) REFERENCES employees(id)
+);
+
+CREATE TABLE IF NOT EXISTS task_dependencies (
+    predecessor_id INTEGER NOT NULL,
+    successor_id INTEGER NOT NULL,
+    PRIMARY KEY(predecessor_id, successor_id),
+    FOREIGN KEY(predecessor_id) REFERENCES tasks(id),
+    FOREIGN KEY(successor_id) REFERENCES tasks(id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_task_dependencies_successor ON task_dependencies(successor_id, predecessor_id);
\ No newline at end of file
@@ -1,167 +1,635 @@
-from PySide6.QtSql import QSqlDatabase, QSqlQuery
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import itertools
+import json
+import re
+import numpy as np
+from database.connection_profiles import DEFAULT_PROFILE
+from database.connection_registry import DEFAULT_BACKEND, create_registry
+from database.migrations import EMPLOYEE_SUMMARY_TERMS, MIGRATIONS, TASK_SUMMARY_TERMS, day_number
+from database.records import DATE_COLUMNS, Employee, TaskTable
+from scheduling.critical_path import acyclic_edges, parse_dependencies, topological_order
+from scheduling.planned_dates import calculate_task_dates, reflow_planned_dates
+from scheduling.resource_leveling import level_resources
+from scheduling.risk_analysis import analyze_task_table
+from scheduling.work_calendar import DEFAULT_WORKDAYS, WorkCalendar
+
+# Поля задачи в порядке TASK_FIELDS; даты берутся из столбцов *_day (дни от 1970-01-01)
+# Номера дней вычисляются из столбцов дат, а не читаются из *_day: так все столбцы запроса есть
+# в индексе idx_tasks_planned_start (миграция 11), и get_all_tasks не обращается к самой таблице
+TASK_SELECT = f"""
+    SELECT
+        id, name, description, direction, duration, (
+            SELECT group_concat(predecessor_id, ',') FROM task_dependencies WHERE successor_id = tasks.id
+        ) AS dependencies,
+        {day_number("planned_start")} AS planned_start, {day_number("planned_end")} AS planned_end,
+        {day_number("actual_start")} AS actual_start, {day_number("actual_end")} AS actual_end,
+        actual_duration, assigned_employee_id
+    FROM tasks
+"""
+FIELD_DTYPES = {int: np.int64, float: np.float64, bool: bool}
+# Типы значений, которые помещаются в массив столбца без потерь; при другом значении тип столбца,
+# определенный драйвером по первой строке, расширяется: bool -> int64 -> float64 -> object
+STORAGE_VALUE_TYPES = {"b": {bool}, "i": {int, bool}, "f": {float, int, bool}}
+PROMOTED_DTYPES = {bool: np.dtype(np.int64), int: np.dtype(np.int64), float: np.dtype(np.float64)}
+TASK_DTYPES = {
+    "id": np.int64,
+    "name": object,
+    "description": object,
+    "direction": object,
+    "duration": np.int64,
+    "dependencies": object,
+    **dict.fromkeys(DATE_COLUMNS, "datetime64[D]"),
+    "actual_duration": np.float64,
+    "assigned_employee_id": object,
+}
+# Сколько последних записей журнала change_log сохраняется при запуске
+CHANGE_LOG_SIZE = 100000
+# Базовый план с такой длиной цепочки дельт сохраняется целиком, чтобы чтение не замедлялось
+BASELINE_CHAIN_LIMIT = 16
+# Общие табличные выражения (WITH RECURSIVE) с датами задач базового плана (параметр - его ID)
+# или текущего плана. В базовом плане для задачи берется строка ближайшего по цепочке родителей плана:
+# SQLite возвращает остальные столбцы агрегатного запроса из строки с MIN(depth)
+BASELINE_DATES = """
+    {name}_chain(baseline_id, depth) AS (
+        SELECT id, 0 FROM baselines WHERE id = ?
+        UNION ALL
+        SELECT baselines.parent_id, {name}_chain.depth + 1
+        FROM baselines JOIN {name}_chain ON baselines.id = {name}_chain.baseline_id
+        WHERE baselines.parent_id IS NOT NULL
+    ),
+    {name}(task_id, planned_start_day, planned_end_day) AS (
+        SELECT task_id, planned_start_day, planned_end_day FROM (
+            SELECT
+                baseline_tasks.task_id, baseline_tasks.planned_start_day, baseline_tasks.planned_end_day,
+                MIN({name}_chain.depth)
+            FROM {name}_chain JOIN baseline_tasks ON baseline_tasks.baseline_id = {name}_chain.baseline_id
+            GROUP BY baseline_tasks.task_id
+        )
+        WHERE planned_start_day IS NOT NULL
+    )
+"""
+PLAN_DATES = """
+    {name}(task_id, planned_start_day, planned_end_day) AS (
+        SELECT id, planned_start_day, planned_end_day FROM tasks WHERE planned_start_day IS NOT NULL
+    )
+"""
+# Итоги по направлению в таблице direction_summary, поддерживаемой триггерами
+DIRECTION_SUMMARY_FIELDS = (*EMPLOYEE_SUMMARY_TERMS, *TASK_SUMMARY_TERMS)
+# Вес совпадений в названии задачи относительно описания при ранжировании результатов поиска
+SEARCH_NAME_WEIGHT = 10.0
+BASELINE_DIFF_DTYPES = {
+    "task_id": np.int64,
+    **dict.fromkeys(("base_start", "base_end", "plan_start", "plan_end"), "datetime64[D]"),
+    "start_slip": np.float64,
+    "end_slip": np.float64,
+}
+
+
+def search_expression(text):
+    # Запрос FTS5 из слов текста; кавычки защищают слова от разбора как операторов (AND, NEAR, ...)
+    text = (text or "").replace("ё", "е").replace("Ё", "Е")
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
 
 class DatabaseManager:
-    def __init__(self, db_name='pnr_planner.db'):
-        self.db = QSqlDatabase.addDatabase('QSQLITE')
-        self.db.setDatabaseName(db_name)
-        if not self.db.open():
-            print("Ошибка подключения к БД")
+    def __init__(self, db_name='pnr_planner.db', profile=DEFAULT_PROFILE, backend=DEFAULT_BACKEND):
+        # backend: "qt" (QtSql, для GUI) или "sqlite" (модуль sqlite3, без Qt - для серверных пересчетов)
+        self.work_calendar = None
+        # Версии таблиц увеличиваются при каждой записи через DatabaseManager, по ним кэши
+        # (EntityRepository) определяют, что данные устарели
+        self.table_versions = {"tasks": 0, "employees": 0}
+        self._version_numbers = itertools.count(1)
+        self.connections = create_registry(backend, db_name, profile)
+        try:
+            self.writer()
+        except Exception as e:
+            print(f"Ошибка подключения к БД: {e}")
             return
-        self.create_tables()
+        self.apply_migrations()
+        self.prune_changes()
+
+    @property
+    def connection_profile(self):
+        return self.connections.current_profile()
+
+    def apply_connection_profile(self, profile):
+        self.connections.apply_profile(profile)
+
+    def writer(self):
+        return self.connections.writer()
+
+    def reader(self):
+        return self.connections.reader()
+
+    def transaction(self):
+        self.connections.begin()
+
+    def commit(self):
+        self.connections.commit()
+
+    def rollback(self):
+        self.connections.rollback()
+
+    def query(self, connection):
+        return self.connections.query(connection)
+
+    def prepared_query(self, connection, sql):
+        return self.connections.statement(connection, sql)
 
-    def create_tables(self):
-        query = QSqlQuery()
-        with open('database/create_tables.sql', 'r', encoding='utf-8') as f:
-            sql_script = f.read()
-            for statement in sql_script.split(';'):
-                if statement.strip():
-                    if not query.exec_(statement):
-                        print(f"Ошибка при выполнении запроса: {query.lastError().text()}")
+    def statement_cache_stats(self):
+        return self.connections.statement_cache_stats()
+
+    def release_thread_connections(self):
+        self.connections.release()
+
+    def close(self):
+        self.connections.close_all()
+
+    def table_version(self, table):
+        return self.table_versions[table]
+
+    def _tables_changed(self, *tables):
+        # Вызывается после фиксации изменений, чтобы кэш не запомнил данные до записи под новой версией
+        for table in tables or tuple(self.table_versions):
+            self.table_versions[table] = next(self._version_numbers)
+
+    def get_data_version(self):
+        # Меняется, когда транзакцию фиксирует другое соединение к файлу БД (другой поток или процесс),
+        # собственные записи пишущего соединения на него не влияют
+        query = self.prepared_query(self.writer(), "PRAGMA data_version")
+        data_version = query.value(0) if query.exec() and query.next() else None
+        query.finish()
+        return data_version
+
+    def last_change_seq(self):
+        query = self.prepared_query(self.reader(), "SELECT COALESCE(MAX(seq), 0) FROM change_log")
+        seq = query.value(0) if query.exec() and query.next() else 0
+        query.finish()
+        return seq
+
+    def changes_since(self, seq):
+        # Записи журнала с номером больше seq: [(seq, таблица, ID строки, 'INSERT' | 'UPDATE' | 'DELETE')]
+        # в порядке изменений. None - если нужные записи уже удалены prune_changes() и данные
+        # следует перечитать целиком
+        query = self.prepared_query(self.reader(), "SELECT MIN(seq) FROM change_log")
+        first_seq = query.value(0) if query.exec() and query.next() else None
+        query.finish()
+        if first_seq not in (None, "") and seq < first_seq - 1:
+            return None
+
+        query = self.prepared_query(
+            self.reader(),
+            "SELECT seq, table_name, row_id, operation FROM change_log WHERE seq > ? ORDER BY seq",
+        )
+        query.bindValue(0, seq)
+        if not query.exec():
+            raise Exception(f"Ошибка при чтении журнала изменений: {query.lastError().text()}")
+        changes = []
+        while query.next():
+            changes.append((query.value(0), query.value(1), query.value(2), query.value(3)))
+        query.finish()
+        return changes
+
+    def prune_changes(self, keep=CHANGE_LOG_SIZE):
+        # Оставляет последние keep записей журнала, последняя запись не удаляется никогда:
+        # по ней changes_since() определяет, что журнал неполон
+        query = self.prepared_query(
+            self.writer(),
+            "DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - MAX(?, 1)",
+        )
+        query.bindValue(0, keep)
+        if not query.exec():
+            raise Exception(f"Ошибка при очистке журнала изменений: {query.lastError().text()}")
+
+    def get_schema_version(self):
+        query = self.query(self.writer())
+        if query.exec("PRAGMA user_version") and query.next():
+            return query.value(0)
+        return 0
+
+    def apply_migrations(self):
+        current_version = self.get_schema_version()
+        if current_version >= MIGRATIONS[-1][0]:
+            return
+        # Миграции выполняются без проверки внешних ключей
+        self.exec_statement("PRAGMA foreign_keys = OFF")
+        for version, steps in MIGRATIONS:
+            if version <= current_version:
+                continue
+            try:
+                self.transaction()
+                for step in steps:
+                    if callable(step):
+                        step(self)
+                    else:
+                        self.exec_statement(step)
+                self.exec_statement(f"PRAGMA user_version = {version}")
+                self.commit()
+
+            except Exception as e:
+                self.rollback()
+                print(f"Ошибка при применении миграции {version}: {e}")
+                raise e
+        self.apply_connection_profile(self.connection_profile)
 
     def add_employee(self, name, direction):
-        query = QSqlQuery()
-        query.prepare("""
+        query = self.prepared_query(self.writer(), """
         INSERT INTO employees (name, direction) 
         VALUES (?, ?)
         """)
-        query.addBindValue(name)
-        query.addBindValue(direction)
+        query.bindValue(0, name)
+        query.bindValue(1, direction)
         query.exec()
+        self._tables_changed("employees")
+
+    def add_employees_bulk(self, employees):
+        # employees: iterable of (name, direction); возвращает ID в порядке входных записей
+        employee_ids = []
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("INSERT INTO employees (name, direction) VALUES (?, ?)")
+            for name, direction in employees:
+                query.bindValue(0, name)
+                query.bindValue(1, direction)
+                if not query.exec():
+                    raise Exception(f"Ошибка при добавлении сотрудника: {query.lastError().text()}")
+                employee_ids.append(query.lastInsertId())
+            self.commit()
+            self._tables_changed("employees")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при добавлении сотрудников: {e}")
+            raise e
+        return employee_ids
 
     def delete_employee(self, employee_id):
-        query = QSqlQuery()
-        query.prepare("DELETE FROM tasks WHERE assigned_employee_id = ?")
-        query.addBindValue(employee_id)
-        if not query.exec():
-            raise Exception(f"Ошибка при удалении задач сотрудника: {query.lastError().text()}")
-        query.prepare("DELETE FROM employees WHERE id = ?")
-        query.addBindValue(employee_id)
-        if not query.exec():
-            raise Exception(f"Ошибка при удалении сотрудника: {query.lastError().text()}")
+        # Задачи сотрудника удаляются вместе с ним, плановые даты оставшихся последующих задач
+        # пересчитываются в той же транзакции. Возвращает ID задач, у которых изменились даты
+        try:
+            self.transaction()
+            successor_ids = [row[0] for row in self.execute_query("""
+                SELECT DISTINCT task_dependencies.successor_id
+                FROM task_dependencies
+                JOIN tasks AS predecessors ON predecessors.id = task_dependencies.predecessor_id
+                JOIN tasks AS successors ON successors.id = task_dependencies.successor_id
+                WHERE predecessors.assigned_employee_id = ?
+                  AND successors.assigned_employee_id IS NOT ?
+            """, (employee_id, employee_id))]
+            query = self.query(self.writer())
+            query.prepare("""
+                DELETE FROM task_dependencies
+                WHERE predecessor_id IN (SELECT id FROM tasks WHERE assigned_employee_id = ?)
+                   OR successor_id IN (SELECT id FROM tasks WHERE assigned_employee_id = ?)
+            """)
+            query.addBindValue(employee_id)
+            query.addBindValue(employee_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при удалении зависимостей задач сотрудника: {query.lastError().text()}")
+            query.prepare("DELETE FROM tasks WHERE assigned_employee_id = ?")
+            query.addBindValue(employee_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при удалении задач сотрудника: {query.lastError().text()}")
+            query.prepare("DELETE FROM employee_calendar_exceptions WHERE employee_id = ?")
+            query.addBindValue(employee_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при удалении календаря сотрудника: {query.lastError().text()}")
+            self.work_calendar = None
+            query.prepare("DELETE FROM employees WHERE id = ?")
+            query.addBindValue(employee_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при удалении сотрудника: {query.lastError().text()}")
+            changed_ids = self._reschedule(successor_ids)
+            self.commit()
+            self._tables_changed("tasks", "employees")
+
+        except Exception as e:
+            self.rollback()
+            self.work_calendar = None
+            print(f"Ошибка при удалении сотрудника: {e}")
+            raise e
+        return changed_ids
 
     def delete_task(self, task_id):
+        # Последующие задачи теряют зависимость от удаленной, их плановые даты пересчитываются
+        # в той же транзакции. Возвращает ID задач, у которых изменились даты
         try:
-            self.db.transaction()
-            query = QSqlQuery()
-            query.prepare("DELETE FROM tasks WHERE id = ?")
+            self.transaction()
+            successor_ids = self.get_successors(task_id)
+            query = self.query(self.writer())
+            query.prepare("DELETE FROM task_dependencies WHERE predecessor_id = ? OR successor_id = ?")
+            query.addBindValue(task_id)
             query.addBindValue(task_id)
             if not query.exec():
-                raise Exception(f"Ошибка при удалении задачи из таблицы tasks: {query.lastError().text()}")
+                raise Exception(f"Ошибка при удалении зависимостей задачи: {query.lastError().text()}")
 
-            query.prepare("DELETE FROM task_visualization_dates WHERE task_id = ?")
+            query.prepare("DELETE FROM tasks WHERE id = ?")
             query.addBindValue(task_id)
             if not query.exec():
-                raise Exception(
-                    f"Ошибка при удалении задачи из таблицы task_visualization_dates: {query.lastError().text()}")
+                raise Exception(f"Ошибка при удалении задачи из таблицы tasks: {query.lastError().text()}")
 
-            self.db.commit()
+            changed_ids = self._reschedule(successor_ids)
+            self.commit()
+            self._tables_changed("tasks")
 
         except Exception as e:
-            self.db.rollback()
+            self.rollback()
             print(f"Ошибка при удалении задачи: {e}")
             raise e
+        return changed_ids
 
     def get_all_employees(self):
-        query = QSqlQuery("SELECT id, name, direction FROM employees")
+        query = self.prepared_query(self.reader(), "SELECT id, name, direction FROM employees")
+        if not query.exec():
+            raise Exception(f"Ошибка при получении сотрудников: {query.lastError().text()}")
         employees = []
         while query.next():
-            employees.append((query.value(0), query.value(1), query.value(2)))
+            employees.append(Employee(query.value(0), query.value(1), query.value(2) or None))
+        query.finish()
         return employees
 
     def get_all_tasks(self):
-        query = """
-            SELECT 
-                id, name, description, direction, duration, dependencies,
-                planned_start, planned_end, actual_start, actual_end, actual_duration, assigned_employee_id
-            FROM tasks
-            ORDER BY planned_start ASC
-        """
-        return self.execute_query(query)
+        return self._task_table(TASK_SELECT + " ORDER BY tasks.planned_start ASC")
+
+    def search_tasks(self, text, limit=100):
+        # Полнотекстовый поиск по названию и описанию: каждое слово запроса ищется как начало слова
+        # ("нас 10" находит "Насос Н-101"). TaskTable найденных задач, лучшие совпадения первыми
+        match = search_expression(text)
+        if not match:
+            return self._task_table(TASK_SELECT + " WHERE 0")
+        return self._task_table(TASK_SELECT + f"""
+            JOIN (
+                SELECT rowid AS match_id, bm25(tasks_fts, {SEARCH_NAME_WEIGHT}, 1.0) AS match_rank
+                FROM tasks_fts WHERE tasks_fts MATCH ?
+                ORDER BY match_rank LIMIT ?
+            ) AS matches ON matches.match_id = tasks.id
+            ORDER BY matches.match_rank
+        """, [match, limit])
+
+    def get_task_by_id(self, task_id):
+        tasks = self._task_table(TASK_SELECT + " WHERE id = ?", (task_id,))
+        return tasks.row(0) if len(tasks) else None
+
+    def _task_table(self, query, params=None):
+        columns = self.fetch_columns(query, params, TASK_DTYPES)
+        # QtSql возвращает NULL как пустую строку, sqlite3 - как None
+        for column in ("direction", "dependencies", "assigned_employee_id"):
+            values = columns[column]
+            values[values == ""] = None
+        return TaskTable(columns)
+
+    def fetch_columns(self, query, params=None, dtypes=None):
+        # Результат читается однонаправленным курсором сразу в массивы NumPy по столбцам, без кортежей строк.
+        # Число и типы столбцов определяются один раз после выполнения; dtypes переопределяет тип столбца.
+        # Тип от драйвера расширяется, если значение в него не помещается (2.5 в целом столбце, текст в числовом).
+        # NULL: float - NaN, datetime64 - NaT, целый столбец с NULL переводится в float64 с NaN
+        sql_query = self.prepared_query(self.reader(), query)
+        for index, param in enumerate(params or ()):
+            sql_query.bindValue(index, param)
+        if not sql_query.exec():
+            raise Exception(f"Ошибка при выполнении запроса: {sql_query.lastError().text()}")
+
+        record = sql_query.record()
+        names = [record.fieldName(index) for index in range(record.count())]
+        dtypes = dtypes or {}
+        field_types = (
+            self.connections.field_types(sql_query) if any(name not in dtypes for name in names) else None
+        )
+        column_dtypes = [
+            np.dtype(dtypes[name]) if name in dtypes else np.dtype(FIELD_DTYPES.get(field_types[index], object))
+            for index, name in enumerate(names)
+        ]
+        # Тип, неизвестный драйверу (текст или NULL в первой строке для sqlite3), уточняется по значениям
+        inferred = [name not in dtypes and field_types[index] is None for index, name in enumerate(names)]
+        kinds = [dtype.kind for dtype in column_dtypes]
+        # Даты накапливаются как int64 (дни от 1970-01-01) и в конце представляются как datetime64
+        storage = [np.dtype(np.int64) if kind == "M" else dtype for kind, dtype in zip(kinds, column_dtypes)]
+        null_day = np.iinfo(np.int64).min
+
+        capacity = 1024
+        arrays = [np.empty(capacity, dtype) for dtype in storage]
+        null_masks = [np.zeros(capacity, bool) if kind in "iub" else None for kind in kinds]
+        value_types = [
+            None if name in dtypes else STORAGE_VALUE_TYPES.get(kind) for name, kind in zip(names, kinds)
+        ]
+        columns = list(zip(range(len(names)), kinds, arrays, null_masks, value_types))
+        count = 0
+        while sql_query.next():
+            if count == capacity:
+                capacity *= 2
+                arrays = [np.resize(array, capacity) for array in arrays]
+                # np.resize повторяет старые значения, а маска NULL новых строк должна быть пустой
+                null_masks = [
+                    None if mask is None else np.concatenate((mask, np.zeros(capacity - mask.size, bool)))
+                    for mask in null_masks
+                ]
+                columns = list(zip(range(len(names)), kinds, arrays, null_masks, value_types))
+            for index, kind, array, mask, accepted in columns:
+                value = sql_query.value(index)
+                if kind == "O":
+                    array[count] = value
+                elif value is None or value == "":
+                    if kind == "f":
+                        array[count] = np.nan
+                    elif kind == "M":
+                        array[count] = null_day
+                    else:
+                        array[count] = 0
+                        mask[count] = True
+                else:
+                    if accepted is not None and type(value) not in accepted:
+                        kind, array, mask = self._promote_column(array, mask, count, value)
+                        kinds[index], arrays[index], null_masks[index] = kind, array, mask
+                        value_types[index] = STORAGE_VALUE_TYPES.get(kind)
+                        columns = list(zip(range(len(names)), kinds, arrays, null_masks, value_types))
+                    array[count] = value
+            count += 1
+        sql_query.finish()
+
+        result = {}
+        for name, kind, dtype, array, mask, infer in zip(names, kinds, column_dtypes, arrays, null_masks, inferred):
+            array = array[:count].copy() if count < capacity else array
+            if infer:
+                array = self._infer_numeric(array)
+            elif kind == "M":
+                array = array.view(dtype)
+            elif mask is not None and mask[:count].any():
+                array = array.astype(np.float64)
+                array[mask[:count]] = np.nan
+            result[name] = array
+        return result
+
+    def _promote_column(self, array, mask, count, value):
+        # Новый тип - самый узкий из bool, int64, float64, object, вмещающий и прежние значения, и value.
+        # Возвращает (вид типа, массив, маска NULL); заполненные строки [0, count) переносятся
+        dtype = PROMOTED_DTYPES.get(type(value), np.dtype(object))
+        if dtype != object:
+            dtype = np.promote_types(array.dtype, dtype)
+        if dtype == object:
+            promoted = np.empty(array.size, object)
+            promoted[:count] = array[:count].tolist()
+            if mask is not None:
+                promoted[:count][mask[:count]] = None
+            elif array.dtype.kind == "f":
+                promoted[:count][np.isnan(array[:count])] = None
+            return "O", promoted, None
+        promoted = array.astype(dtype)
+        if dtype.kind == "f" and mask is not None:
+            promoted[:count][mask[:count]] = np.nan
+            mask = None
+        return dtype.kind, promoted, mask
+
+    def _infer_numeric(self, values):
+        # Столбец без текстовых значений становится int64, а при дробных значениях или NULL - float64 с NaN
+        has_nulls = False
+        has_floats = False
+        has_numbers = False
+        for value in values:
+            if value is None or value == "":
+                has_nulls = True
+            elif isinstance(value, float):
+                has_floats = has_numbers = True
+            elif isinstance(value, int) and not isinstance(value, bool):
+                has_numbers = True
+            else:
+                return values
+        if not has_numbers:
+            return values
+        if not (has_nulls or has_floats):
+            return values.astype(np.int64)
+        return np.array([np.nan if value is None or value == "" else value for value in values], dtype=np.float64)
+
+    def fetch_dataframe(self, query, params=None, dtypes=None):
+        # pandas загружается только здесь: импорт пакета занимает заметное время
+        import pandas as pd
+
+        return pd.DataFrame(self.fetch_columns(query, params, dtypes), copy=False)
+
+    def iter_task_columns(self, chunk_size=10000):
+        # Задачи читаются однонаправленным курсором и выдаются частями по столбцам,
+        # так что в памяти одновременно находится не более chunk_size строк
+        columns = (
+            "id", "name", "description", "direction", "duration", "dependencies",
+            "planned_start_day", "planned_end_day", "actual_start_day", "actual_end_day",
+            "actual_duration", "assigned_employee_id", "employee_name",
+        )
+        query = self.query(self.reader())
+        query.setForwardOnly(True)
+        if not query.exec("""
+            SELECT
+                t.id, t.name, t.description, t.direction, t.duration, (
+                    SELECT group_concat(predecessor_id, ',') FROM task_dependencies WHERE successor_id = t.id
+                ) AS dependencies,
+                t.planned_start_day, t.planned_end_day, t.actual_start_day, t.actual_end_day,
+                t.actual_duration, t.assigned_employee_id, e.name
+            FROM tasks t
+            LEFT JOIN employees e ON e.id = t.assigned_employee_id
+            ORDER BY t.id
+        """):
+            raise Exception(f"Ошибка при чтении задач: {query.lastError().text()}")
+
+        chunk = [[] for _ in columns]
+        while query.next():
+            for index, values in enumerate(chunk):
+                value = query.value(index)
+                values.append(None if value == "" else value)
+            if len(chunk[0]) >= chunk_size:
+                yield dict(zip(columns, chunk))
+                chunk = [[] for _ in columns]
+        if chunk[0]:
+            yield dict(zip(columns, chunk))
 
     def execute_query(self, query, params=None):
         result = []
-        sql_query = QSqlQuery(self.db)
+        is_select = query.strip().upper().startswith("SELECT")
+        connection = self.reader() if is_select else self.writer()
         try:
             if params:
-                sql_query.prepare(query)
-                for param in params:
-                    sql_query.addBindValue(param)
+                sql_query = self.prepared_query(connection, query)
+                for index, param in enumerate(params):
+                    sql_query.bindValue(index, param)
                 if not sql_query.exec():
                     print(f"Ошибка при выполнении параметризованного запроса: {sql_query.lastError().text()}")
                     return result
             else:
+                sql_query = self.query(connection)
                 if not sql_query.exec(query):
                     print(f"Ошибка при выполнении запроса: {sql_query.lastError().text()}")
                     return result
 
-            if query.strip().upper().startswith("SELECT"):
+            if is_select:
+                columns = range(sql_query.record().count())
                 while sql_query.next():
-                    row = [sql_query.value(i) for i in range(sql_query.record().count())]
-                    result.append(tuple(row))
+                    result.append(tuple(sql_query.value(i) for i in columns))
+                # Незавершенный запрос из кэша QSQLITE держит снимок БД открытым для соединения
+                sql_query.finish()
+            else:
+                # Произвольный запрос на запись может затронуть любую таблицу
+                self._tables_changed()
 
         except Exception as e:
             print(f"Ошибка при выполнении запроса: {e}")
             return result
         return result
 
-    def get_tasks_for_list(self):
-        query = "SELECT id, name FROM tasks ORDER BY planned_start ASC"
-        return self.execute_query(query)
-
-    def get_task_by_id(self, task_id):
-        query = QSqlQuery()
-        query.prepare("""
-            SELECT 
-                id, name, description, direction, duration, dependencies,
-                planned_start, planned_end, actual_start, actual_end, assigned_employee_id
-            FROM tasks
-            WHERE id = ?
-        """)
-        query.addBindValue(task_id)
-        if not query.exec_():
-            raise Exception(f"Ошибка при загрузке задачи: {query.lastError().text()}")
-
-        if query.next():
-            return tuple(query.value(i) for i in range(11))
-        return None
-
     def update_task_actual_dates(self, task_id, actual_start, actual_end):
-        query = QSqlQuery()
-        query.prepare("""
+        query = self.prepared_query(self.writer(), """
             UPDATE tasks
             SET actual_start = ?, actual_end = ?
             WHERE id = ?
         """)
-        query.addBindValue(actual_start)
-        query.addBindValue(actual_end)
-        query.addBindValue(task_id)
+        query.bindValue(0, actual_start)
+        query.bindValue(1, actual_end)
+        query.bindValue(2, task_id)
         if not query.exec():
             raise Exception(f"Ошибка при обновлении фактических дат: {query.lastError().text()}")
+        self._tables_changed("tasks")
 
     def get_employees_by_direction(self, direction):
-        query = QSqlQuery()
-        query.prepare("SELECT id, name FROM employees WHERE direction = ?")
-        query.addBindValue(direction)
+        query = self.prepared_query(self.reader(), "SELECT id, name, direction FROM employees WHERE direction = ?")
+        query.bindValue(0, direction)
         if not query.exec():
             raise Exception(f"Ошибка при получении сотрудников: {query.lastError().text()}")
         employees = []
         while query.next():
-            employees.append((query.value(0), query.value(1)))  # (id, name)
+            employees.append(Employee(query.value(0), query.value(1), query.value(2)))
+        query.finish()
         return employees
 
+    def get_direction_summary(self):
+        # {направление: {итог: значение}} по одной строке на направление, None - направление не задано.
+        # Итоги: employee_count, task_count, duration_sum, actual_duration_sum, effective_duration_sum
+        # (фактическая длительность, если задана, иначе плановая), span_days_sum (дни между фактическими
+        # или, если их нет, плановыми датами), completed_count (заданы фактические даты),
+        # deviation_count, overdue_count, deviation_sum (отклонение фактического окончания от планового)
+        query = self.prepared_query(self.reader(), f"""
+            SELECT direction, {", ".join(DIRECTION_SUMMARY_FIELDS)}
+            FROM direction_summary
+            WHERE employee_count > 0 OR task_count > 0
+            ORDER BY rowid
+        """)
+        if not query.exec():
+            raise Exception(f"Ошибка при чтении итогов по направлениям: {query.lastError().text()}")
+        summary = {}
+        while query.next():
+            summary[query.value(0) or None] = {
+                field: query.value(index) for index, field in enumerate(DIRECTION_SUMMARY_FIELDS, 1)
+            }
+        query.finish()
+        return summary
+
     def get_employee_name(self, employee_id):
-        query = QSqlQuery()
-        query.prepare("SELECT name FROM employees WHERE id = ?")
-        query.addBindValue(employee_id)
+        query = self.prepared_query(self.reader(), "SELECT name FROM employees WHERE id = ?")
+        query.bindValue(0, employee_id)
         if not query.exec():
             raise Exception(f"Ошибка при получении имени сотрудника: {query.lastError().text()}")
-        if query.next():
-            return query.value(0)
-        return "Не назначен"
+        name = query.value(0) if query.next() else "Не назначен"
+        query.finish()
+        return name
 
     def save_project_start_date(self, start_date):
-        query = QSqlQuery()
+        query = self.query(self.writer())
         query.prepare("SELECT COUNT(*) FROM project_settings")
         if not query.exec():
             raise Exception(f"Ошибка при проверке даты начала проекта: {query.lastError().text()}")
@@ -176,144 +644,736 @@ class DatabaseManager:
             raise Exception(f"Ошибка при сохранении даты начала проекта: {query.lastError().text()}")
 
     def get_project_start_date(self):
-        query = QSqlQuery("SELECT start_date FROM project_settings WHERE id = 1")
-        if query.exec() and query.next():
-            return query.value(0)
-        return None
+        query = self.prepared_query(self.reader(), "SELECT start_date FROM project_settings WHERE id = 1")
+        start_date = query.value(0) if query.exec() and query.next() else None
+        query.finish()
+        return start_date
+
+    def get_resource_leveling(self):
+        # Режим выравнивания загрузки: плановые даты учитывают не только зависимости,
+        # но и занятость сотрудников (задачи одного сотрудника не пересекаются)
+        query = self.prepared_query(self.reader(), "SELECT resource_leveling FROM project_settings WHERE id = 1")
+        resource_leveling = query.value(0) if query.exec() and query.next() else 0
+        query.finish()
+        return bool(resource_leveling)
+
+    def set_resource_leveling(self, enabled):
+        # Включение и выключение режима сразу пересчитывают плановые даты всех задач.
+        # Возвращает ID задач, у которых изменились даты
+        if not self.get_project_start_date():
+            raise Exception("Дата начала проекта не задана!")
+        try:
+            self.transaction()
+            query = self.prepared_query(self.writer(), "UPDATE project_settings SET resource_leveling = ? WHERE id = 1")
+            query.bindValue(0, int(enabled))
+            if not query.exec():
+                raise Exception(f"Ошибка при сохранении режима выравнивания загрузки: {query.lastError().text()}")
+            changed_ids = self._reschedule()
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при изменении режима выравнивания загрузки: {e}")
+            raise e
+        return changed_ids
+
+    def get_work_calendar(self):
+        if self.work_calendar is not None:
+            return self.work_calendar
+
+        workdays = DEFAULT_WORKDAYS
+        query = self.query(self.reader())
+        if query.exec("SELECT workdays FROM project_calendar WHERE id = 1") and query.next() and query.value(0):
+            workdays = [int(day) for day in query.value(0).split(",")]
+
+        holidays = [row[0] for row in self.execute_query("SELECT date FROM calendar_holidays")]
+        employee_exceptions = {}
+        for employee_id, day, is_working in self.execute_query(
+                "SELECT employee_id, date, is_working FROM employee_calendar_exceptions"):
+            employee_exceptions.setdefault(employee_id, {})[date.fromisoformat(day)] = bool(is_working)
+
+        project_start_date = self.get_project_start_date()
+        origin = date.fromisoformat(project_start_date) - timedelta(days=31) if project_start_date else None
+        self.work_calendar = WorkCalendar(workdays, holidays, employee_exceptions, origin=origin)
+        return self.work_calendar
+
+    def _calendar_changed(self, employee_id=None):
+        # Вызывается в транзакции изменения календаря: плановые даты задач сотрудника employee_id
+        # (None - всех задач) и зависящих от них пересчитываются по новому календарю. При откате
+        # вызывающий метод снова сбрасывает кэш календаря, прочитанный внутри отмененной транзакции
+        self.work_calendar = None
+        if not self.get_project_start_date():
+            return []
+        if employee_id is None:
+            return self._reschedule()
+        task_ids = [row[0] for row in self.execute_query(
+            "SELECT id FROM tasks WHERE assigned_employee_id = ?", (employee_id,)
+        )]
+        return self._reschedule(task_ids) if task_ids else []
+
+    def save_project_workdays(self, workdays):
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("INSERT OR REPLACE INTO project_calendar (id, workdays) VALUES (1, ?)")
+            query.addBindValue(",".join(str(day) for day in sorted(workdays)))
+            if not query.exec():
+                raise Exception(f"Ошибка при сохранении рабочих дней: {query.lastError().text()}")
+            changed_ids = self._calendar_changed()
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            self.work_calendar = None
+            print(f"Ошибка при изменении рабочих дней: {e}")
+            raise e
+        return changed_ids
+
+    def add_holiday(self, day, name=None):
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("INSERT OR REPLACE INTO calendar_holidays (date, name) VALUES (?, ?)")
+            query.addBindValue(day)
+            query.addBindValue(name)
+            if not query.exec():
+                raise Exception(f"Ошибка при добавлении праздничного дня: {query.lastError().text()}")
+            changed_ids = self._calendar_changed()
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            self.work_calendar = None
+            print(f"Ошибка при добавлении праздничного дня: {e}")
+            raise e
+        return changed_ids
+
+    def delete_holiday(self, day):
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("DELETE FROM calendar_holidays WHERE date = ?")
+            query.addBindValue(day)
+            if not query.exec():
+                raise Exception(f"Ошибка при удалении праздничного дня: {query.lastError().text()}")
+            changed_ids = self._calendar_changed()
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            self.work_calendar = None
+            print(f"Ошибка при удалении праздничного дня: {e}")
+            raise e
+        return changed_ids
+
+    def set_employee_calendar_exception(self, employee_id, day, is_working):
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("""
+                INSERT OR REPLACE INTO employee_calendar_exceptions (employee_id, date, is_working)
+                VALUES (?, ?, ?)
+            """)
+            query.addBindValue(employee_id)
+            query.addBindValue(day)
+            query.addBindValue(1 if is_working else 0)
+            if not query.exec():
+                raise Exception(f"Ошибка при сохранении исключения календаря: {query.lastError().text()}")
+            changed_ids = self._calendar_changed(employee_id)
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            self.work_calendar = None
+            print(f"Ошибка при изменении календаря сотрудника: {e}")
+            raise e
+        return changed_ids
+
+    def delete_employee_calendar_exception(self, employee_id, day):
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("DELETE FROM employee_calendar_exceptions WHERE employee_id = ? AND date = ?")
+            query.addBindValue(employee_id)
+            query.addBindValue(day)
+            if not query.exec():
+                raise Exception(f"Ошибка при удалении исключения календаря: {query.lastError().text()}")
+            changed_ids = self._calendar_changed(employee_id)
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            self.work_calendar = None
+            print(f"Ошибка при изменении календаря сотрудника: {e}")
+            raise e
+        return changed_ids
 
     def add_task_with_calculated_dates(self, name, description, direction, duration, dependencies_str, assigned_employee_id):
+        return self.add_tasks_bulk([{
+            "name": name,
+            "description": description,
+            "direction": direction,
+            "duration": duration,
+            "dependencies": dependencies_str,
+            "assigned_employee_id": assigned_employee_id,
+        }])[0]
+
+    def add_tasks_bulk(self, tasks):
+        # tasks: iterable of dict(name, description, direction, duration, dependencies, assigned_employee_id, ref)
+        # Зависимость ссылается на ref задачи из этого же пакета, иначе - на ID существующей задачи.
+        # Возвращает ID новых задач в порядке входных записей
         project_start_date = self.get_project_start_date()
         if not project_start_date:
             raise Exception("Дата начала проекта не задана!")
 
-        project_start_dt = datetime.strptime(project_start_date, "%Y-%m-%d")
-        tasks = self.get_all_tasks()
-        task_map = {task[0]: {"planned_end": task[7]} for task in tasks}
-        planned_start_dt = project_start_dt
+        tasks = list(tasks)
+        refs = {}
+        for index, task in enumerate(tasks):
+            ref = task.get("ref")
+            if ref is None:
+                continue
+            if ref in refs:
+                raise Exception(f"Задача {ref} указана в пакете несколько раз!")
+            refs[ref] = index
+
+        batch_dependencies = {}
+        existing_dependencies = {}
+        for index, task in enumerate(tasks):
+            dependencies = task.get("dependencies") or []
+            if isinstance(dependencies, str):
+                dependencies = parse_dependencies(dependencies)
+            batch_dependencies[index] = []
+            existing_dependencies[index] = []
+            for dep in dict.fromkeys(dependencies):
+                if dep in refs:
+                    batch_dependencies[index].append(refs[dep])
+                else:
+                    existing_dependencies[index].append(dep)
 
-        if dependencies_str:
-            dependency_ids = [int(dep.strip()) for dep in dependencies_str.split(",") if dep.strip()]
-            for dep_id in dependency_ids:
-                if dep_id not in task_map:
+        planned_ends = self.get_planned_ends(
+            list(dict.fromkeys(dep_id for deps in existing_dependencies.values() for dep_id in deps))
+        )
+        for deps in existing_dependencies.values():
+            for dep_id in deps:
+                if dep_id not in planned_ends:
                     raise Exception(f"Задача с ID {dep_id} не найдена!")
 
-            latest_dependency_end = project_start_dt
-            for dep_id in dependency_ids:
-                dep_end = datetime.strptime(task_map[dep_id]["planned_end"], "%Y-%m-%d")
-                if dep_end > latest_dependency_end:
-                    latest_dependency_end = dep_end
-
-            planned_start_dt = latest_dependency_end + timedelta(days=1)
-
-        planned_end_dt = planned_start_dt + timedelta(days=duration - 1)
-        planned_end_dt_for_gantt = planned_start_dt + timedelta(days=duration)
-        planned_start = planned_start_dt.strftime("%Y-%m-%d")
-        planned_end = planned_end_dt.strftime("%Y-%m-%d")
-        planned_end_for_gantt = planned_end_dt_for_gantt.strftime("%Y-%m-%d")
-
-        query = QSqlQuery()
-        query.prepare("""
-            INSERT INTO tasks (
-                name, description, direction, duration, dependencies, planned_start, planned_end, assigned_employee_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """)
-        query.addBindValue(name)
-        query.addBindValue(description)
-        query.addBindValue(direction)
-        query.addBindValue(duration)
-        query.addBindValue(dependencies_str or "")
-        query.addBindValue(planned_start)
-        query.addBindValue(planned_end)
-        query.addBindValue(assigned_employee_id)
+        order, _ = topological_order(list(range(len(tasks))), batch_dependencies)
+        project_start_dt = date.fromisoformat(project_start_date)
+        calendar = self.get_work_calendar()
+        dates = {}
+        for index in order:
+            task = tasks[index]
+            dependency_ends = [
+                date.fromisoformat(planned_ends[dep_id])
+                for dep_id in existing_dependencies[index] if planned_ends[dep_id]
+            ]
+            dependency_ends.extend(dates[dep_index][1] for dep_index in batch_dependencies[index])
+            dates[index] = calculate_task_dates(
+                task["duration"], dependency_ends, project_start_dt,
+                calendar.for_employee(task.get("assigned_employee_id"))
+            )
 
-        if not query.exec():
-            raise Exception(f"Ошибка при добавлении задачи: {query.lastError().text()}")
+        task_ids = {}
+        try:
+            self.transaction()
+            query = self.prepared_query(self.writer(), """
+                INSERT INTO tasks (
+                    name, description, direction, duration, planned_start, planned_end, assigned_employee_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """)
+            for index in order:
+                task = tasks[index]
+                planned_start, planned_end = dates[index]
+                query.bindValue(0, task["name"])
+                query.bindValue(1, task.get("description") or "")
+                query.bindValue(2, task.get("direction"))
+                query.bindValue(3, task["duration"])
+                query.bindValue(4, planned_start.isoformat())
+                query.bindValue(5, planned_end.isoformat())
+                query.bindValue(6, task.get("assigned_employee_id"))
+                if not query.exec():
+                    raise Exception(f"Ошибка при добавлении задачи: {query.lastError().text()}")
+                task_ids[index] = query.lastInsertId()
 
-        task_id = query.lastInsertId()
-        query.prepare("""
-            INSERT INTO task_visualization_dates (
-                task_id, planned_start, planned_end, actual_start, actual_end
-            ) VALUES (?, ?, ?, ?, ?)
-        """)
-        query.addBindValue(task_id)
-        query.addBindValue(planned_start)
-        query.addBindValue(planned_end_for_gantt)
-        query.addBindValue(None)
-        query.addBindValue(None)
+            self.exec_batch(
+                "INSERT INTO task_dependencies (predecessor_id, successor_id) VALUES (?, ?)",
+                (
+                    (dep_id, task_ids[index])
+                    for index in order
+                    for dep_id in existing_dependencies[index] + [task_ids[dep] for dep in batch_dependencies[index]]
+                )
+            )
+            # Даты по зависимостям рассчитаны выше; при выравнивании загрузки новые задачи
+            # делят сотрудников с остальными, и план выравнивается заново
+            if self.get_resource_leveling():
+                self._level_schedule()
+            self.commit()
+            self._tables_changed("tasks")
 
-        if not query.exec():
-            raise Exception(f"Ошибка при добавлении дат задачи: {query.lastError().text()}")
-
-    def calculate_planned_dates(self, duration, dependencies, project_start_date):
-        tasks = self.get_all_tasks()
-        task_map = {task[0]: {"planned_end": task[4]} for task in tasks}
-        latest_dependency_end = project_start_date
-
-        if dependencies:
-            for dep_id in dependencies.split(","):
-                dep_id = int(dep_id.strip())
-                if dep_id in task_map:
-                    dep_end = datetime.strptime(task_map[dep_id]["planned_end"], "%Y-%m-%d")
-                    if dep_end > latest_dependency_end:
-                        latest_dependency_end = dep_end
-        planned_start = latest_dependency_end
-        planned_end = planned_start + timedelta(days=duration - 1)
-        return planned_start, planned_end
-
-    def get_tasks_for_deletion(self):
-        query = """
-            SELECT 
-                id, name, planned_start, planned_end, assigned_employee_id, actual_start, actual_end
-            FROM tasks
-            ORDER BY planned_start ASC
-        """
-        return self.execute_query(query)
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при добавлении задачи: {e}")
+            raise e
+        return [task_ids[index] for index in range(len(tasks))]
+
+    def get_planned_ends(self, task_ids):
+        if not task_ids:
+            return {}
+        # Список разбивается на части, чтобы не превысить лимит параметров запроса SQLite
+        task_ids = list(task_ids)
+        planned_ends = {}
+        for offset in range(0, len(task_ids), 500):
+            chunk = task_ids[offset:offset + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            query = f"SELECT id, planned_end FROM tasks WHERE id IN ({placeholders})"
+            planned_ends.update(self.execute_query(query, chunk))
+        return planned_ends
+
+    def get_predecessors(self, task_id):
+        query = "SELECT predecessor_id FROM task_dependencies WHERE successor_id = ?"
+        return [row[0] for row in self.execute_query(query, (task_id,))]
+
+    def get_successors(self, task_id):
+        query = "SELECT successor_id FROM task_dependencies WHERE predecessor_id = ?"
+        return [row[0] for row in self.execute_query(query, (task_id,))]
+
+    def get_dependency_map(self):
+        dependency_map = {}
+        for predecessor_id, successor_id in self.execute_query(
+                "SELECT predecessor_id, successor_id FROM task_dependencies"):
+            dependency_map.setdefault(successor_id, []).append(predecessor_id)
+        return dependency_map
+
+    def set_task_dependencies(self, task_id, dependency_ids):
+        dependency_ids = list(dict.fromkeys(dependency_ids))
+        missing = set(dependency_ids) - set(self.get_planned_ends(dependency_ids))
+        if missing:
+            raise Exception(f"Задача с ID {min(missing)} не найдена!")
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("DELETE FROM task_dependencies WHERE successor_id = ?")
+            query.addBindValue(task_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при удалении зависимостей задачи: {query.lastError().text()}")
+            self.exec_batch(
+                "INSERT INTO task_dependencies (predecessor_id, successor_id) VALUES (?, ?)",
+                ((dep_id, task_id) for dep_id in dependency_ids)
+            )
+            changed_ids = self._reschedule([task_id])
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при изменении зависимостей задачи: {e}")
+            raise e
+        return changed_ids
+
+    def add_task_dependencies(self, edges):
+        # edges: iterable of (predecessor_id, successor_id); связи, образующие цикл, не записываются.
+        # Возвращает список пропущенных связей
+        edges = list(dict.fromkeys(edges))
+        try:
+            self.transaction()
+            accepted, skipped = acyclic_edges(self.get_dependency_map(), edges)
+            self.exec_batch(
+                "INSERT OR IGNORE INTO task_dependencies (predecessor_id, successor_id) VALUES (?, ?)", accepted
+            )
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при добавлении зависимостей задач: {e}")
+            raise e
+        return skipped
+
+    def assign_tasks_bulk(self, assignments):
+        # assignments: iterable of (task_id, employee_id, direction); направление задачи
+        # заполняется направлением сотрудника, только если оно не было задано
+        try:
+            self.transaction()
+            self.exec_batch(
+                """
+                UPDATE tasks
+                SET assigned_employee_id = ?, direction = COALESCE(direction, ?)
+                WHERE id = ?
+                """,
+                ((employee_id, direction, task_id) for task_id, employee_id, direction in assignments)
+            )
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при назначении сотрудников на задачи: {e}")
+            raise e
+
+    def calculate_planned_dates(self, duration, dependencies, project_start_date, assigned_employee_id=None):
+        planned_ends = self.get_planned_ends(list(dict.fromkeys(parse_dependencies(dependencies))))
+        dependency_ends = [date.fromisoformat(planned_end) for planned_end in planned_ends.values() if planned_end]
+        calendar = self.get_work_calendar().for_employee(assigned_employee_id)
+        return calculate_task_dates(duration, dependency_ends, project_start_date, calendar)
 
     def update_task_actual_duration(self, task_id, actual_duration):
-        query = QSqlQuery()
-        query.prepare("""
+        query = self.prepared_query(self.writer(), """
             UPDATE tasks
             SET actual_duration = ?
             WHERE id = ?
         """)
-        query.addBindValue(actual_duration)
-        query.addBindValue(task_id)
+        query.bindValue(0, actual_duration)
+        query.bindValue(1, task_id)
 
         if not query.exec():
             raise Exception(f"Ошибка при обновлении фактической длительности: {query.lastError().text()}")
+        self._tables_changed("tasks")
 
-    def update_task_visualization_dates(self, task_id, actual_start, actual_end):
-        query = QSqlQuery()
+    def save_actual_duration(self, task_id, actual_duration):
+        # Фактическое начало - следующий рабочий день после последнего фактического окончания
+        # предшествующих задач (без зависимостей - после начала проекта). Возвращает (actual_start, actual_end)
+        task = self.get_task_by_id(task_id)
+        if not task:
+            raise Exception("Задача не найдена!")
+        project_start_date = self.get_project_start_date()
+        if not project_start_date:
+            raise Exception("Дата начала проекта не задана!")
 
-        actual_end_dt = datetime.strptime(actual_end, "%Y-%m-%d")
-        actual_end_dt += timedelta(days=1)
-        actual_end_adjusted = actual_end_dt.strftime("%Y-%m-%d")
-        query.prepare("""
-            SELECT id FROM task_visualization_dates WHERE task_id = ?
-        """)
-        query.addBindValue(task_id)
+        calendar = self.get_work_calendar().for_employee(task.assigned_employee_id)
+        if task.dependencies:
+            dependency_ends = [
+                dep_task.actual_end
+                for dep_task in (self.get_task_by_id(dep_id) for dep_id in task.dependencies)
+                if dep_task and dep_task.actual_end
+            ]
+            if not dependency_ends:
+                raise Exception("Необходимо задать фактические даты для всех зависимых задач!")
+            actual_start = calendar.next_working_day(max(dependency_ends) + timedelta(days=1))
+        else:
+            actual_start = calendar.next_working_day(date.fromisoformat(project_start_date))
+        actual_end = calendar.finish_date(actual_start, actual_duration)
 
-        if not query.exec():
-            raise Exception(f"Ошибка при проверке существования записи: {query.lastError().text()}")
+        try:
+            self.transaction()
+            self.update_task_actual_duration(task_id, actual_duration)
+            self.update_task_actual_dates(task_id, actual_start.isoformat(), actual_end.isoformat())
+            self.commit()
+            self._tables_changed("tasks")
 
-        if query.next():
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при сохранении фактической длительности: {e}")
+            raise e
+        return actual_start.isoformat(), actual_end.isoformat()
+
+    def update_task_duration(self, task_id, duration):
+        # Длительность и сдвиг плановых дат последующих задач фиксируются вместе
+        try:
+            self.transaction()
+            query = self.prepared_query(self.writer(), "UPDATE tasks SET duration = ? WHERE id = ?")
+            query.bindValue(0, duration)
+            query.bindValue(1, task_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при обновлении длительности задачи: {query.lastError().text()}")
+            changed_ids = self._reschedule([task_id])
+            self.commit()
+            self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при изменении длительности задачи: {e}")
+            raise e
+        return changed_ids
+
+    def reschedule_tasks(self, task_ids=None):
+        # Пересчет плановых дат задач task_ids и зависящих от них (None - всех задач) в одной транзакции.
+        # Возвращает ID задач, у которых изменились даты
+        try:
+            self.transaction()
+            changed_ids = self._reschedule(task_ids)
+            self.commit()
+            if changed_ids:
+                self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при пересчете плановых дат: {e}")
+            raise e
+        return changed_ids
+
+    def level_schedule(self):
+        # Выравнивание загрузки всего плана в одной транзакции независимо от режима.
+        # Возвращает ID задач, у которых изменились даты
+        try:
+            self.transaction()
+            changed_ids = self._level_schedule()
+            self.commit()
+            if changed_ids:
+                self._tables_changed("tasks")
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при выравнивании загрузки сотрудников: {e}")
+            raise e
+        return changed_ids
+
+    def _reschedule(self, task_ids=None):
+        # Выполняется внутри транзакции вызывающего метода. Читаются только задачи task_ids и все
+        # последующие (по task_dependencies), а из остальных - даты окончания их предшественников.
+        # В режиме выравнивания загрузки любое изменение может сдвинуть задачи других цепочек
+        # того же сотрудника, поэтому план выравнивается целиком
+        if self.get_resource_leveling():
+            return self._level_schedule()
+        if task_ids is not None and not task_ids:
+            return []
+        project_start_date = self.get_project_start_date()
+        if not project_start_date:
+            raise Exception("Дата начала проекта не задана!")
+
+        if task_ids is None:
+            rows = self.execute_query(
+                "SELECT id, duration, planned_start, planned_end, assigned_employee_id FROM tasks"
+            )
+            dependency_map = self.get_dependency_map()
+            changed_ids = [row[0] for row in rows]
+        else:
+            downstream_ids = [row[0] for row in self.execute_query("""
+                SELECT id FROM tasks WHERE id IN (
+                    WITH RECURSIVE downstream(id) AS (
+                        SELECT value FROM json_each(?)
+                        UNION
+                        SELECT task_dependencies.successor_id
+                        FROM task_dependencies JOIN downstream ON task_dependencies.predecessor_id = downstream.id
+                    )
+                    SELECT id FROM downstream
+                )
+            """, (json.dumps(list(task_ids)),))]
+            if not downstream_ids:
+                return []
+            scope_ids = set(downstream_ids)
+            changed_ids = [task_id for task_id in task_ids if task_id in scope_ids]
+            dependency_map = {}
+            for predecessor_id, successor_id in self.execute_query("""
+                SELECT predecessor_id, successor_id FROM task_dependencies
+                WHERE successor_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(downstream_ids),)):
+                dependency_map.setdefault(successor_id, []).append(predecessor_id)
+            for predecessors in dependency_map.values():
+                scope_ids.update(predecessors)
+            rows = self.execute_query("""
+                SELECT id, duration, planned_start, planned_end, assigned_employee_id FROM tasks
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(scope_ids)),))
+
+        # Предшественники вне пересчитываемых задач не меняются, их связи не нужны
+        tasks = {row[0]: (row[1], dependency_map.get(row[0], []), row[2], row[3], row[4]) for row in rows}
+        changes = reflow_planned_dates(
+            tasks, changed_ids, date.fromisoformat(project_start_date), self.get_work_calendar()
+        )
+        self.exec_batch(
+            "UPDATE tasks SET planned_start = ?, planned_end = ? WHERE id = ?",
+            ((planned_start, planned_end, task_id) for task_id, planned_start, planned_end in changes)
+        )
+        return [change[0] for change in changes]
+
+    def _level_schedule(self):
+        # Выполняется внутри транзакции вызывающего метода
+        project_start, calendar = self.get_project_calendar()
+        rows = self.execute_query("SELECT id, duration, planned_start, planned_end, assigned_employee_id FROM tasks")
+        dependency_map = self.get_dependency_map()
+        schedule = level_resources(
+            ((row[0], row[1], dependency_map.get(row[0], []), row[4]) for row in rows), project_start, calendar
+        )["schedule"]
+        changes = []
+        for task_id, _, planned_start, planned_end, _ in rows:
+            start, end = schedule[task_id]
+            if (start.isoformat(), end.isoformat()) != (planned_start, planned_end):
+                changes.append((start.isoformat(), end.isoformat(), task_id))
+        self.exec_batch("UPDATE tasks SET planned_start = ?, planned_end = ? WHERE id = ?", changes)
+        return [change[2] for change in changes]
+
+    def get_project_calendar(self):
+        # (дата начала проекта, рабочий календарь) - исходные данные расчетов сроков вне БД
+        project_start_date = self.get_project_start_date()
+        if not project_start_date:
+            raise Exception("Дата начала проекта не задана!")
+        return date.fromisoformat(project_start_date), self.get_work_calendar()
+
+    def analyze_schedule_risk(self, tasks, iterations=10000, workers=None, seed=None):
+        # Моделирование сроков методом Монте-Карло по задачам tasks (TaskTable, например из
+        # EntityRepository.tasks()); из БД читаются только дата начала и календарь
+        project_start, calendar = self.get_project_calendar()
+        return analyze_task_table(tasks, project_start, calendar, iterations=iterations, workers=workers, seed=seed)
+
+    def create_baseline(self, name):
+        # Снимок текущих плановых дат всех задач под именем name; возвращает ID базового плана.
+        # Родитель - последний созданный базовый план, сохраняются только отличия от него
+        name = (name or "").strip()
+        if not name:
+            raise Exception("Название базового плана не задано!")
+        try:
+            self.transaction()
+            query = self.query(self.writer())
+            query.prepare("SELECT COUNT(*) FROM baselines WHERE name = ?")
+            query.addBindValue(name)
+            if query.exec() and query.next() and query.value(0):
+                raise Exception(f"Базовый план \"{name}\" уже существует!")
+
+            parent_id, depth = None, 0
+            if query.exec("SELECT id, depth FROM baselines ORDER BY id DESC LIMIT 1") and query.next():
+                if query.value(1) + 1 < BASELINE_CHAIN_LIMIT:
+                    parent_id, depth = query.value(0), query.value(1) + 1
+
+            query.prepare("INSERT INTO baselines (name, created_at, parent_id, depth) VALUES (?, ?, ?, ?)")
+            query.addBindValue(name)
+            query.addBindValue(datetime.now().isoformat(timespec="seconds"))
+            query.addBindValue(parent_id)
+            query.addBindValue(depth)
+            if not query.exec():
+                raise Exception(f"Ошибка при создании базового плана: {query.lastError().text()}")
+            baseline_id = query.lastInsertId()
+
+            if parent_id is None:
+                query.prepare("""
+                    INSERT INTO baseline_tasks (baseline_id, task_id, planned_start_day, planned_end_day)
+                    SELECT ?, id, planned_start_day, planned_end_day FROM tasks WHERE planned_start_day IS NOT NULL
+                """)
+                query.addBindValue(baseline_id)
+            else:
+                query.prepare(f"""
+                    WITH RECURSIVE {BASELINE_DATES.format(name="parent")}, {PLAN_DATES.format(name="plan")}
+                    INSERT INTO baseline_tasks (baseline_id, task_id, planned_start_day, planned_end_day)
+                    SELECT ?, plan.task_id, plan.planned_start_day, plan.planned_end_day
+                    FROM plan LEFT JOIN parent ON parent.task_id = plan.task_id
+                    WHERE parent.task_id IS NULL
+                       OR parent.planned_start_day IS NOT plan.planned_start_day
+                       OR parent.planned_end_day IS NOT plan.planned_end_day
+                    UNION ALL
+                    SELECT ?, parent.task_id, NULL, NULL
+                    FROM parent WHERE parent.task_id NOT IN (SELECT task_id FROM plan)
+                """)
+                query.addBindValue(parent_id)
+                query.addBindValue(baseline_id)
+                query.addBindValue(baseline_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при сохранении дат базового плана: {query.lastError().text()}")
+            self.commit()
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при создании базового плана: {e}")
+            raise e
+        return baseline_id
+
+    def get_baselines(self):
+        # [(ID, название, дата создания, число сохраненных строк задач)] в порядке создания
+        return self.execute_query("""
+            SELECT id, name, created_at, (SELECT COUNT(*) FROM baseline_tasks WHERE baseline_id = baselines.id)
+            FROM baselines ORDER BY id
+        """)
+
+    def delete_baseline(self, baseline_id):
+        # Строки удаляемого плана переносятся в дочерние планы (кроме задач, которые те хранят сами),
+        # и дочерние планы наследуют его родителя
+        try:
+            self.transaction()
+            query = self.query(self.writer())
             query.prepare("""
-                UPDATE task_visualization_dates
-                SET actual_start = ?, actual_end = ?
-                WHERE task_id = ?
+                UPDATE baselines SET depth = depth - 1 WHERE id IN (
+                    WITH RECURSIVE descendants(id) AS (
+                        SELECT id FROM baselines WHERE parent_id = ?
+                        UNION ALL
+                        SELECT baselines.id FROM baselines JOIN descendants ON baselines.parent_id = descendants.id
+                    )
+                    SELECT id FROM descendants
+                )
             """)
-            query.addBindValue(actual_start)
-            query.addBindValue(actual_end_adjusted)
-            query.addBindValue(task_id)
-        else:
+            query.addBindValue(baseline_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при обновлении цепочки базовых планов: {query.lastError().text()}")
             query.prepare("""
-                INSERT INTO task_visualization_dates (task_id, planned_start, planned_end, actual_start, actual_end)
-                SELECT id, planned_start, planned_end, ?, ?
-                FROM tasks
-                WHERE id = ?
+                INSERT OR IGNORE INTO baseline_tasks (baseline_id, task_id, planned_start_day, planned_end_day)
+                SELECT baselines.id, baseline_tasks.task_id, baseline_tasks.planned_start_day, baseline_tasks.planned_end_day
+                FROM baselines JOIN baseline_tasks ON baseline_tasks.baseline_id = baselines.parent_id
+                WHERE baselines.parent_id = ?
             """)
-            query.addBindValue(actual_start)
-            query.addBindValue(actual_end_adjusted)
-            query.addBindValue(task_id)
-        if not query.exec():
-            raise Exception(f"Ошибка при обновлении/добавлении записи: {query.lastError().text()}")
+            query.addBindValue(baseline_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при переносе дат базового плана: {query.lastError().text()}")
+            query.prepare("""
+                UPDATE baselines SET parent_id = (SELECT parent_id FROM baselines WHERE id = ?) WHERE parent_id = ?
+            """)
+            query.addBindValue(baseline_id)
+            query.addBindValue(baseline_id)
+            if not query.exec():
+                raise Exception(f"Ошибка при обновлении цепочки базовых планов: {query.lastError().text()}")
+            for sql in ("DELETE FROM baseline_tasks WHERE baseline_id = ?", "DELETE FROM baselines WHERE id = ?"):
+                query.prepare(sql)
+                query.addBindValue(baseline_id)
+                if not query.exec():
+                    raise Exception(f"Ошибка при удалении базового плана: {query.lastError().text()}")
+            self.commit()
+
+        except Exception as e:
+            self.rollback()
+            print(f"Ошибка при удалении базового плана: {e}")
+            raise e
+
+    def diff_baselines(self, baseline_id, other_baseline_id=None, changed_only=True):
+        # Сравнение базового плана с другим базовым планом или, если other_baseline_id не задан,
+        # с текущим планом. Столбцы NumPy: task_id, base_start, base_end, plan_start, plan_end (datetime64[D])
+        # и сдвиг start_slip, end_slip в днях (float64, NaN - задача есть только в одном из планов).
+        # changed_only: только задачи с изменившимися датами, добавленные и удаленные
+        other = (
+            PLAN_DATES.format(name="other") if other_baseline_id is None
+            else BASELINE_DATES.format(name="other")
+        )
+        where = "WHERE base_start IS NOT plan_start OR base_end IS NOT plan_end" if changed_only else ""
+        params = [baseline_id] if other_baseline_id is None else [baseline_id, other_baseline_id]
+        # Планы объединяются группировкой по task_id: для FULL JOIN табличных выражений
+        # SQLite не строит индекс и перебирает пары строк
+        return self.fetch_columns(f"""
+            WITH RECURSIVE {BASELINE_DATES.format(name="base")}, {other}
+            SELECT
+                task_id, base_start, base_end, plan_start, plan_end,
+                plan_start - base_start AS start_slip, plan_end - base_end AS end_slip
+            FROM (
+                SELECT
+                    task_id,
+                    MAX(CASE WHEN side = 0 THEN planned_start_day END) AS base_start,
+                    MAX(CASE WHEN side = 0 THEN planned_end_day END) AS base_end,
+                    MAX(CASE WHEN side = 1 THEN planned_start_day END) AS plan_start,
+                    MAX(CASE WHEN side = 1 THEN planned_end_day END) AS plan_end
+                FROM (
+                    SELECT 0 AS side, task_id, planned_start_day, planned_end_day FROM base
+                    UNION ALL
+                    SELECT 1, task_id, planned_start_day, planned_end_day FROM other
+                )
+                GROUP BY task_id
+            )
+            {where}
+            ORDER BY task_id
+        """, params, BASELINE_DIFF_DTYPES)
+
+    def exec_statement(self, query):
+        sql_query = self.query(self.writer())
+        if not sql_query.exec(query):
+            raise Exception(f"Ошибка при выполнении запроса: {sql_query.lastError().text()}")
+        self._tables_changed()
+
+    def exec_batch(self, query, rows):
+        # QSqlQuery.execBatch для SQLite эмулируется построчно с копированием списков значений
+        # (квадратичная сложность), поэтому один подготовленный запрос переиспользуется для всех строк
+        sql_query = self.prepared_query(self.writer(), query)
+        for row in rows:
+            for index, value in enumerate(row):
+                sql_query.bindValue(index, value)
+            if not sql_query.exec():
+                raise Exception(f"Ошибка при выполнении пакетного запроса: {sql_query.lastError().text()}")
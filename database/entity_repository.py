@@ -0,0 +1,150 @@
+UNASSIGNED_EMPLOYEE = "Не назначен"
+NO_DIRECTION = "Не задано"
+# Таблицы БД, при изменении которых перечитывается запись кэша
+SOURCE_TABLES = {
+    "tasks": ("tasks",),
+    "employees": ("employees",),
+    "direction_summary": ("tasks", "employees"),
+}
+
+
+class EntityRepository:
+    # Кэш задач, сотрудников и итогов по направлениям для интерфейса. Запись перечитывается, только если
+    # изменилась версия одной из ее таблиц (SOURCE_TABLES) в DatabaseManager (запись через его методы)
+    # или, при записи из другого соединения или процесса (PRAGMA data_version), в журнале change_log
+    # есть изменения строк этих таблиц.
+    # Обращения к кэшу - из одного (главного) потока; load_stale выполняется в потоке БД по снимку
+    # cache_state(), а результат передается в install
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._entries = {}
+        self._data_version = None
+        self._change_seq = None
+        self.loads = dict.fromkeys(SOURCE_TABLES, 0)
+
+    def tasks(self):
+        # TaskTable в порядке плановых дат начала
+        return self._entry("tasks")["table"]
+
+    def dependency_map(self):
+        return self._entry("tasks")["dependency_map"]
+
+    def employees(self):
+        return self._entry("employees")["rows"]
+
+    def employee_names(self):
+        return self._entry("employees")["names"]
+
+    def employee_name(self, employee_id):
+        return self.employee_names().get(employee_id, UNASSIGNED_EMPLOYEE)
+
+    def direction_summary(self):
+        # Итоги по направлениям из DatabaseManager.get_direction_summary()
+        return self._entry("direction_summary")["summary"]
+
+    def snapshot_token(self):
+        # Снимается до загрузки: запись, зафиксированная позже, будет замечена
+        return {
+            "change_seq": self.db_manager.last_change_seq(),
+            "versions": {table: self._version(table) for table in self.loads},
+        }
+
+    def cache_state(self):
+        # Снимок состояния кэша для load_stale(); к БД не обращается
+        return {
+            "change_seq": self._change_seq,
+            "versions": {table: entry["version"] for table, entry in self._entries.items()},
+        }
+
+    def load_stale(self, state):
+        # Выполняется в потоке БД и не трогает кэш. По журналу change_log определяются таблицы,
+        # измененные другими соединениями после снимка state, и перечитываются устаревшие записи.
+        # PRAGMA data_version у каждого соединения свой, поэтому здесь проверяется только журнал
+        token = self.snapshot_token()
+        if state["change_seq"] is None:
+            changed_tables = None
+        else:
+            changes = self.db_manager.changes_since(state["change_seq"])
+            changed_tables = None if changes is None else {change[1] for change in changes}
+        stale = tuple(
+            table for table in self.loads
+            if state["versions"].get(table) != token["versions"][table]
+            or changed_tables is None or changed_tables.intersection(SOURCE_TABLES[table])
+        )
+        return {"state": state, "token": token, "changed_tables": changed_tables, "entries": self.load_tables(stale)}
+
+    def load_tables(self, tables=tuple(SOURCE_TABLES)):
+        # Только читает БД и не трогает кэш, поэтому может выполняться в любом потоке
+        return {table: self._load(table) for table in tables}
+
+    def install(self, snapshot):
+        # Если кэш успел синхронизироваться сам, снимок устарел: записи перечитаются при обращении.
+        # Записи потока БД меняют data_version соединения главного потока, поэтому следующее
+        # обращение к кэшу проверит журнал с нового номера
+        if self._change_seq != snapshot["state"]["change_seq"]:
+            return
+        self._invalidate(snapshot["changed_tables"])
+        self._change_seq = snapshot["token"]["change_seq"]
+        for table, entry in snapshot["entries"].items():
+            entry["version"] = snapshot["token"]["versions"][table]
+            self._entries[table] = entry
+
+    def invalidate(self, table=None):
+        if table is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(table, None)
+
+    def _entry(self, table):
+        self._sync(self.db_manager.get_data_version())
+
+        # Версия запоминается до чтения: запись, зафиксированная во время чтения, сбросит кэш при следующем обращении
+        version = self._version(table)
+        entry = self._entries.get(table)
+        if entry is None or entry["version"] != version:
+            entry = self._load(table)
+            entry["version"] = version
+            self._entries[table] = entry
+        return entry
+
+    def _sync(self, data_version):
+        # Номер журнала запоминается до чтения таблиц, поэтому изменения, зафиксированные
+        # во время чтения, будут найдены в журнале при следующей проверке
+        if data_version == self._data_version:
+            return
+        change_seq = self.db_manager.last_change_seq()
+        changes = None if self._change_seq is None else self.db_manager.changes_since(self._change_seq)
+        self._invalidate(None if changes is None else {change[1] for change in changes})
+        self._data_version = data_version
+        self._change_seq = change_seq
+
+    def _invalidate(self, changed_tables):
+        # changed_tables - таблицы с изменениями в журнале, None - журнал неполон и кэш сбрасывается целиком
+        if changed_tables is None:
+            self._entries.clear()
+            return
+        for table, sources in SOURCE_TABLES.items():
+            if changed_tables.intersection(sources):
+                self._entries.pop(table, None)
+
+    def _version(self, table):
+        return tuple(self.db_manager.table_version(source) for source in SOURCE_TABLES[table])
+
+    def _load(self, table):
+        self.loads[table] += 1
+        if table == "tasks":
+            return self._load_tasks()
+        if table == "employees":
+            return self._load_employees()
+        return {"summary": self.db_manager.get_direction_summary()}
+
+    def _load_tasks(self):
+        table = self.db_manager.get_all_tasks()
+        return {"table": table, "dependency_map": table.dependency_map()}
+
+    def _load_employees(self):
+        rows = self.db_manager.get_all_employees()
+        return {
+            "rows": rows,
+            "names": {employee.id: employee.name for employee in rows},
+        }
@@ -0,0 +1,278 @@
+import os
+
+from scheduling.critical_path import parse_dependencies
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "create_tables.sql")
+
+
+def create_base_schema(db_manager):
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        sql_script = f.read()
+    for statement in sql_script.split(";"):
+        if statement.strip():
+            db_manager.exec_statement(statement)
+
+
+def copy_text_dependencies(db_manager):
+    # Перенос зависимостей из текстового столбца tasks.dependencies в task_dependencies
+    rows = db_manager.execute_query(
+        "SELECT id, dependencies FROM tasks WHERE dependencies IS NOT NULL AND dependencies != ''"
+    )
+    task_ids = {row[0] for row in db_manager.execute_query("SELECT id FROM tasks")}
+    edges = [
+        (dep_id, task_id)
+        for task_id, dependencies in rows
+        for dep_id in parse_dependencies(dependencies)
+        if dep_id in task_ids
+    ]
+    db_manager.exec_batch(
+        "INSERT OR IGNORE INTO task_dependencies (predecessor_id, successor_id) VALUES (?, ?)", edges
+    )
+
+
+def day_number(column):
+    # Дата в виде номера дня от 1970-01-01
+    return f"CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+
+
+# Столбцы, которые читает TASK_SELECT в DatabaseManager, в порядке индекса idx_tasks_planned_start
+TASK_SELECT_COLUMNS = (
+    "planned_start", "name", "description", "direction", "duration", "planned_end",
+    "actual_start", "actual_end", "actual_duration", "assigned_employee_id",
+)
+# Столбцы, изменение которых записывается в журнал change_log
+TASK_COLUMNS = (
+    "name", "description", "direction", "duration", "dependencies", "planned_start", "planned_end",
+    "actual_start", "actual_end", "actual_duration", "assigned_employee_id",
+)
+EMPLOYEE_COLUMNS = ("name", "direction")
+VISUALIZATION_COLUMNS = ("planned_start", "planned_end", "actual_start", "actual_end")
+
+
+def trigger(name, event, table, statements, changed_columns=None):
+    # Триггер на изменение строки; для UPDATE можно задать столбцы, изменение которых его запускает
+    when = ""
+    if changed_columns:
+        when = "WHEN " + " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in changed_columns)
+    return f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} {when} BEGIN {' '.join(statements)} END"
+
+
+def change_log_trigger(name, event, table, entries, changed_columns=None):
+    # entries: (таблица в журнале, выражение для ID строки, операция)
+    values = ", ".join(f"('{logged_table}', {row_id}, '{operation}')" for logged_table, row_id, operation in entries)
+    return trigger(
+        name, event, table,
+        [f"INSERT INTO change_log (table_name, row_id, operation) VALUES {values};"],
+        changed_columns,
+    )
+
+
+# Вклад строки ({row} - NEW, OLD или сама таблица) в итоги direction_summary по ее направлению.
+# Даты берутся из столбцов *_day; выполненной считается задача с фактическими датами начала и окончания,
+# отклонение считается для задач с плановой и фактической датами окончания
+TASK_SUMMARY_TERMS = {
+    "task_count": "1",
+    "duration_sum": "{row}.duration",
+    "actual_duration_sum": "COALESCE({row}.actual_duration, 0)",
+    "effective_duration_sum": "COALESCE({row}.actual_duration, {row}.duration)",
+    "span_days_sum": (
+        "CASE WHEN {row}.actual_start_day IS NOT NULL AND {row}.actual_end_day IS NOT NULL "
+        "THEN {row}.actual_end_day - {row}.actual_start_day + 1 "
+        "WHEN {row}.planned_start_day IS NOT NULL AND {row}.planned_end_day IS NOT NULL "
+        "THEN {row}.planned_end_day - {row}.planned_start_day + 1 ELSE 0 END"
+    ),
+    "completed_count": "{row}.actual_start_day IS NOT NULL AND {row}.actual_end_day IS NOT NULL",
+    "deviation_count": "{row}.planned_end_day IS NOT NULL AND {row}.actual_end_day IS NOT NULL",
+    "overdue_count": "COALESCE({row}.actual_end_day > {row}.planned_end_day, 0)",
+    "deviation_sum": "COALESCE({row}.actual_end_day - {row}.planned_end_day, 0)",
+}
+EMPLOYEE_SUMMARY_TERMS = {"employee_count": "1"}
+SUMMARY_TASK_COLUMNS = (
+    "direction", "duration", "actual_duration", "planned_start", "planned_end", "actual_start", "actual_end",
+)
+
+
+def summary_upsert(row, terms, sign=""):
+    # Добавляет (sign="-" - вычитает) вклад строки row в итоги ее направления; '' - направление не задано
+    values = ", ".join(f"{sign}({term.format(row=row)})" for term in terms.values())
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in terms)
+    return (
+        f"INSERT INTO direction_summary (direction, {', '.join(terms)}) "
+        f"VALUES (COALESCE({row}.direction, ''), {values}) "
+        f"ON CONFLICT(direction) DO UPDATE SET {updates};"
+    )
+
+
+def summary_triggers(table, terms, changed_columns):
+    return [
+        trigger(f"{table}_summary_insert", "INSERT", table, [summary_upsert("NEW", terms)]),
+        trigger(
+            f"{table}_summary_update", "UPDATE", table,
+            [summary_upsert("OLD", terms, "-"), summary_upsert("NEW", terms)], changed_columns,
+        ),
+        trigger(f"{table}_summary_delete", "DELETE", table, [summary_upsert("OLD", terms, "-")]),
+    ]
+
+
+def summary_fill(table, terms):
+    # Итоги по уже существующим строкам; WHERE true нужен SQLite для ON CONFLICT после SELECT
+    sums = ", ".join(f"SUM({term.format(row=table)})" for term in terms.values())
+    updates = ", ".join(f"{column} = excluded.{column}" for column in terms)
+    return (
+        f"INSERT INTO direction_summary (direction, {', '.join(terms)}) "
+        f"SELECT COALESCE(direction, ''), {sums} FROM {table} WHERE true GROUP BY 1 "
+        f"ON CONFLICT(direction) DO UPDATE SET {updates}"
+    )
+
+
+def search_text(value):
+    # unicode61 не считает "ё" буквой "е" с диакритикой, поэтому замена выполняется до индексации
+    return f"replace(replace({value}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def search_index(row, delete=False):
+    command = ("tasks_fts, ", "'delete', ") if delete else ("", "")
+    return (
+        f"INSERT INTO tasks_fts ({command[0]}rowid, name, description) "
+        f"VALUES ({command[1]}{row}.id, {search_text(f'{row}.name')}, {search_text(f'{row}.description')});"
+    )
+
+
+MIGRATIONS = [
+    (1, [create_base_schema]),
+    (2, [copy_text_dependencies]),
+    (3, [
+        "CREATE INDEX IF NOT EXISTS idx_tasks_planned_start ON tasks(planned_start, name)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_direction ON tasks("
+        "direction, duration, actual_duration, planned_start, planned_end, actual_start, actual_end)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_assigned_employee ON tasks(assigned_employee_id)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_direction ON employees(direction, name)",
+    ]),
+    # Даты для диаграммы Ганта (с исключающей датой окончания) вычисляются из tasks, а не дублируются.
+    # Таблица task_visualization_dates осталась только в БД, созданных до миграций
+    (4, [
+        "DROP TABLE IF EXISTS task_visualization_dates",
+        """
+        CREATE VIEW task_visualization_dates AS
+        SELECT
+            id AS task_id,
+            planned_start,
+            date(planned_end, '+1 day') AS planned_end,
+            actual_start,
+            date(actual_end, '+1 day') AS actual_end
+        FROM tasks
+        """,
+    ]),
+    # Даты задач в виде номера дня от 1970-01-01 для целочисленной арифметики в SQL и NumPy
+    (5, [
+        f"ALTER TABLE tasks ADD COLUMN {column}_day INTEGER GENERATED ALWAYS AS ({day_number(column)}) VIRTUAL"
+        for column in ("planned_start", "planned_end", "actual_start", "actual_end")
+    ]),
+    # Журнал изменений: триггеры записывают каждую вставку, изменение и удаление строки с растущим
+    # номером seq. Строки представления task_visualization_dates меняются вместе с датами задачи,
+    # а изменение связей task_dependencies - это изменение столбца dependencies задачи-последователя
+    (6, [
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            operation TEXT NOT NULL CHECK(operation IN ('INSERT', 'UPDATE', 'DELETE'))
+        )
+        """,
+        change_log_trigger("tasks_log_insert", "INSERT", "tasks", [
+            ("tasks", "NEW.id", "INSERT"), ("task_visualization_dates", "NEW.id", "INSERT"),
+        ]),
+        change_log_trigger("tasks_log_update", "UPDATE", "tasks", [("tasks", "NEW.id", "UPDATE")], TASK_COLUMNS),
+        change_log_trigger(
+            "tasks_log_update_dates", "UPDATE", "tasks",
+            [("task_visualization_dates", "NEW.id", "UPDATE")], VISUALIZATION_COLUMNS,
+        ),
+        change_log_trigger("tasks_log_delete", "DELETE", "tasks", [
+            ("tasks", "OLD.id", "DELETE"), ("task_visualization_dates", "OLD.id", "DELETE"),
+        ]),
+        change_log_trigger("employees_log_insert", "INSERT", "employees", [("employees", "NEW.id", "INSERT")]),
+        change_log_trigger(
+            "employees_log_update", "UPDATE", "employees", [("employees", "NEW.id", "UPDATE")], EMPLOYEE_COLUMNS,
+        ),
+        change_log_trigger("employees_log_delete", "DELETE", "employees", [("employees", "OLD.id", "DELETE")]),
+        change_log_trigger(
+            "task_dependencies_log_insert", "INSERT", "task_dependencies", [("tasks", "NEW.successor_id", "UPDATE")],
+        ),
+        change_log_trigger(
+            "task_dependencies_log_delete", "DELETE", "task_dependencies", [("tasks", "OLD.successor_id", "UPDATE")],
+        ),
+    ]),
+    # Базовые планы: снимки плановых дат (номер дня от 1970-01-01). Каждый план хранит только задачи,
+    # изменившиеся относительно родителя (parent_id), и отметки с NULL об удаленных задачах.
+    # Задачи не связаны внешним ключом: базовый план сохраняется и после удаления задачи
+    (7, [
+        """
+        CREATE TABLE IF NOT EXISTS baselines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            created_at TEXT NOT NULL,
+            parent_id INTEGER,
+            depth INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(parent_id) REFERENCES baselines(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS baseline_tasks (
+            baseline_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            planned_start_day INTEGER,
+            planned_end_day INTEGER,
+            PRIMARY KEY(baseline_id, task_id),
+            FOREIGN KEY(baseline_id) REFERENCES baselines(id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_baselines_parent ON baselines(parent_id)",
+    ]),
+    # Итоги по направлениям для аналитики: обновляются триггерами при каждом изменении задач и сотрудников,
+    # поэтому отчеты по направлениям читают по одной строке на направление вместо просмотра tasks
+    (8, [
+        """
+        CREATE TABLE IF NOT EXISTS direction_summary (
+            direction TEXT PRIMARY KEY,
+            employee_count INTEGER NOT NULL DEFAULT 0,
+            task_count INTEGER NOT NULL DEFAULT 0,
+            duration_sum INTEGER NOT NULL DEFAULT 0,
+            actual_duration_sum INTEGER NOT NULL DEFAULT 0,
+            effective_duration_sum INTEGER NOT NULL DEFAULT 0,
+            span_days_sum INTEGER NOT NULL DEFAULT 0,
+            completed_count INTEGER NOT NULL DEFAULT 0,
+            deviation_count INTEGER NOT NULL DEFAULT 0,
+            overdue_count INTEGER NOT NULL DEFAULT 0,
+            deviation_sum INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        summary_fill("tasks", TASK_SUMMARY_TERMS),
+        summary_fill("employees", EMPLOYEE_SUMMARY_TERMS),
+        *summary_triggers("tasks", TASK_SUMMARY_TERMS, SUMMARY_TASK_COLUMNS),
+        *summary_triggers("employees", EMPLOYEE_SUMMARY_TERMS, ("direction",)),
+    ]),
+    # Полнотекстовый индекс по названию и описанию задач. Индекс без копии текста (content=''),
+    # обновляется триггерами; 'delete' удаляет из индекса старые значения строки
+    (9, [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+        "name, description, content='', tokenize='unicode61 remove_diacritics 2')",
+        f"INSERT INTO tasks_fts (rowid, name, description) "
+        f"SELECT id, {search_text('name')}, {search_text('description')} FROM tasks",
+        trigger("tasks_fts_insert", "INSERT", "tasks", [search_index("NEW")]),
+        trigger("tasks_fts_update", "UPDATE", "tasks", [search_index("OLD", delete=True), search_index("NEW")],
+                ("name", "description")),
+        trigger("tasks_fts_delete", "DELETE", "tasks", [search_index("OLD", delete=True)]),
+    ]),
+    # Режим выравнивания загрузки сотрудников при расчете плановых дат (DatabaseManager.set_resource_leveling)
+    (10, [
+        "ALTER TABLE project_settings ADD COLUMN resource_leveling INTEGER NOT NULL DEFAULT 0",
+    ]),
+    # Индекс для get_all_tasks содержит все читаемые столбцы задачи, и список задач в порядке плановых дат
+    # читается только из индекса. Виртуальные столбцы *_day SQLite из индекса не берет, поэтому
+    # TASK_SELECT вычисляет номера дней из столбцов дат тем же выражением day_number()
+    (11, [
+        "DROP INDEX IF EXISTS idx_tasks_planned_start",
+        f"CREATE INDEX idx_tasks_planned_start ON tasks({', '.join(TASK_SELECT_COLUMNS)})",
+    ]),
+]
@@ -0,0 +1,55 @@
+from PySide6.QtCore import QMetaType
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+from database.connection_registry import BUSY_TIMEOUT_MS, ConnectionRegistry
+
+FIELD_TYPES = {
+    QMetaType.Type.Int.value: int,
+    QMetaType.Type.LongLong.value: int,
+    QMetaType.Type.Double.value: float,
+    QMetaType.Type.Bool.value: bool,
+}
+
+
+class QtConnectionRegistry(ConnectionRegistry):
+    # Соединения QSQLITE. Пустые значения (NULL) QSqlQuery.value() возвращает как пустую строку
+    def query(self, db):
+        return QSqlQuery(db)
+
+    def field_types(self, query):
+        record = query.record()
+        return [FIELD_TYPES.get(record.field(index).metaType().id()) for index in range(record.count())]
+
+    def _open(self, name, read_only):
+        db = QSqlDatabase.addDatabase("QSQLITE", name)
+        db.setDatabaseName(self.db_name)
+        options = [f"QSQLITE_BUSY_TIMEOUT={BUSY_TIMEOUT_MS}"]
+        if read_only:
+            options.append("QSQLITE_OPEN_READONLY")
+        db.setConnectOptions(";".join(options))
+        if not db.open():
+            error = db.lastError().text()
+            db = None
+            QSqlDatabase.removeDatabase(name)
+            raise Exception(f"Ошибка подключения к БД: {error}")
+        return db
+
+    def _remove(self, name):
+        QSqlDatabase.removeDatabase(name)
+
+    def _connection_name(self, db):
+        return db.connectionName()
+
+    def _begin(self, db):
+        # QSqlDatabase.transaction() открывает отложенную транзакцию (BEGIN): ее первое чтение фиксирует
+        # снимок БД, и запись после фиксации другим соединением завершается ошибкой без ожидания.
+        # BEGIN IMMEDIATE сразу занимает блокировку записи, ожидая ее не дольше BUSY_TIMEOUT_MS
+        query = QSqlQuery(db)
+        if not query.exec("BEGIN IMMEDIATE"):
+            raise Exception(f"Ошибка при открытии транзакции: {query.lastError().text()}")
+
+    def _commit(self, db):
+        db.commit()
+
+    def _rollback(self, db):
+        db.rollback()
@@ -0,0 +1,106 @@
+import numpy as np
+
+from scheduling.critical_path import parse_dependencies
+
+TASK_FIELDS = (
+    "id", "name", "description", "direction", "duration", "dependencies",
+    "planned_start", "planned_end", "actual_start", "actual_end", "actual_duration", "assigned_employee_id",
+)
+DATE_COLUMNS = ("planned_start", "planned_end", "actual_start", "actual_end")
+
+
+def format_date(value):
+    return value.isoformat() if value else ""
+
+
+def format_dependencies(dependencies):
+    return ",".join(str(dep_id) for dep_id in dependencies)
+
+
+class Employee:
+    __slots__ = ("id", "name", "direction")
+
+    def __init__(self, id, name, direction):
+        self.id = id
+        self.name = name
+        self.direction = direction
+
+    def __eq__(self, other):
+        return isinstance(other, Employee) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __repr__(self):
+        return f"Employee(id={self.id}, name={self.name!r}, direction={self.direction!r})"
+
+
+class Task:
+    # Даты - datetime.date, отсутствующие значения - None, dependencies - список ID предшественников
+    __slots__ = TASK_FIELDS
+
+    def __init__(self, id, name, description, direction, duration, dependencies,
+                 planned_start, planned_end, actual_start, actual_end, actual_duration, assigned_employee_id):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.direction = direction
+        self.duration = duration
+        self.dependencies = dependencies
+        self.planned_start = planned_start
+        self.planned_end = planned_end
+        self.actual_start = actual_start
+        self.actual_end = actual_end
+        self.actual_duration = actual_duration
+        self.assigned_employee_id = assigned_employee_id
+
+    def __eq__(self, other):
+        return isinstance(other, Task) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __repr__(self):
+        return f"Task(id={self.id}, name={self.name!r}, planned={self.planned_start}..{self.planned_end})"
+
+
+class TaskTable:
+    # Задачи по столбцам (struct of arrays): id и duration - int64, даты - datetime64[D] с NaT,
+    # actual_duration - float64 с NaN, текстовые поля, dependencies и assigned_employee_id - object с None.
+    # Аналитика работает со столбцами (table["planned_end"]), интерфейс перебирает записи Task
+    __slots__ = ("columns",)
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __iter__(self):
+        # Столбцы переводятся в объекты Python целиком, а не поэлементно
+        values = [self._python_values(field) for field in TASK_FIELDS]
+        for row in zip(*values):
+            yield Task(*row)
+
+    def row(self, index):
+        return Task(*(self._python_values(field, index) for field in TASK_FIELDS))
+
+    def dependency_map(self):
+        return {
+            task_id: parse_dependencies(dependencies)
+            for task_id, dependencies in zip(self.columns["id"].tolist(), self.columns["dependencies"])
+            if dependencies
+        }
+
+    def _python_values(self, field, index=None):
+        column = self.columns[field] if index is None else self.columns[field][index:index + 1]
+        if field in DATE_COLUMNS:
+            values = column.astype(object).tolist()
+        elif field == "actual_duration":
+            values = [None if np.isnan(value) else int(value) for value in column.tolist()]
+        elif field == "dependencies":
+            values = [parse_dependencies(value) for value in column]
+        else:
+            values = column.tolist()
+        return values if index is None else values[0]
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+from database.connection_registry import BUSY_TIMEOUT_MS, STATEMENT_CACHE_SIZE, ConnectionRegistry
+
+
+class SqliteError:
+    def __init__(self, message=""):
+        self.message = message
+
+    def text(self):
+        return self.message
+
+
+class SqliteConnection:
+    def __init__(self, name, connection):
+        self.name = name
+        self.connection = connection
+
+    def close(self):
+        self.connection.close()
+
+
+class SqliteQuery:
+    # Подмножество интерфейса QSqlQuery, которое использует DatabaseManager, поверх курсора sqlite3.
+    # В отличие от QtSql, NULL возвращается как None
+    def __init__(self, db):
+        self.db = db
+        self.sql = None
+        self.params = []
+        self.cursor = None
+        self.row = None
+        self.pending = []
+        self.error = SqliteError()
+
+    def setForwardOnly(self, forward_only):
+        pass
+
+    def prepare(self, sql):
+        # sqlite3 компилирует запрос при первом выполнении и хранит его в кэше соединения
+        self.finish()
+        self.sql = sql
+        self.params = []
+        return True
+
+    def bindValue(self, index, value):
+        if index >= len(self.params):
+            self.params.extend([None] * (index + 1 - len(self.params)))
+        self.params[index] = value
+
+    def addBindValue(self, value):
+        self.params.append(value)
+
+    def exec(self, sql=None):
+        self.finish()
+        try:
+            if sql is None:
+                self.cursor = self.db.connection.execute(self.sql, self.params)
+            else:
+                self.cursor = self.db.connection.execute(sql)
+        except sqlite3.Error as e:
+            self.error = SqliteError(str(e))
+            return False
+        self.error = SqliteError()
+        return True
+
+    def next(self):
+        if self.pending:
+            self.row = self.pending.pop()
+        else:
+            self.row = self.cursor.fetchone() if self.cursor is not None else None
+        return self.row is not None
+
+    def value(self, index):
+        return self.row[index]
+
+    def peek(self):
+        # Первая строка результата читается заранее и будет возвращена следующим next()
+        if not self.pending and self.cursor is not None:
+            row = self.cursor.fetchone()
+            if row is not None:
+                self.pending.append(row)
+        return self.pending[0] if self.pending else None
+
+    def record(self):
+        return SqliteRecord([column[0] for column in self.cursor.description or ()] if self.cursor else [])
+
+    def lastInsertId(self):
+        return self.cursor.lastrowid if self.cursor is not None else None
+
+    def lastError(self):
+        return self.error
+
+    def finish(self):
+        if self.cursor is not None:
+            self.cursor.close()
+        self.cursor = None
+        self.row = None
+        self.pending = []
+
+
+class SqliteRecord:
+    def __init__(self, names):
+        self.names = names
+
+    def count(self):
+        return len(self.names)
+
+    def fieldName(self, index):
+        return self.names[index]
+
+
+class SqliteConnectionRegistry(ConnectionRegistry):
+    # Соединения модуля sqlite3 из стандартной библиотеки: не требуют Qt и QCoreApplication
+    def __init__(self, db_name, profile):
+        super().__init__(db_name, profile)
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+
+    def query(self, db):
+        return SqliteQuery(db)
+
+    def field_types(self, query):
+        # sqlite3 не сообщает объявленные типы столбцов, поэтому тип определяется по первой строке.
+        # Если в следующих строках тип значений другой, DatabaseManager.fetch_columns расширяет тип столбца
+        row = query.peek()
+        if row is None:
+            return [None] * query.record().count()
+        return [type(value) if isinstance(value, (int, float)) else None for value in row]
+
+    def _open(self, name, read_only):
+        try:
+            if read_only:
+                uri = f"file:{quote(os.path.abspath(self.db_name))}?mode=ro"
+                connection = sqlite3.connect(
+                    uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                    check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+                )
+            else:
+                connection = sqlite3.connect(
+                    self.db_name, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                    check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+                )
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка подключения к БД: {e}")
+        db = SqliteConnection(name, connection)
+        with self._connections_lock:
+            self._connections[name] = db
+        return db
+
+    def _remove(self, name):
+        # Соединение другого потока, не освобожденное через release(), закрывается здесь
+        with self._connections_lock:
+            db = self._connections.pop(name, None)
+        if db is not None:
+            db.close()
+
+    def _connection_name(self, db):
+        return db.name
+
+    def _begin(self, db):
+        # Блокировка записи берется сразу, как в QtConnectionRegistry._begin
+        try:
+            db.connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при открытии транзакции: {e}")
+
+    def _commit(self, db):
+        db.connection.execute("COMMIT")
+
+    def _rollback(self, db):
+        if db.connection.in_transaction:
+            db.connection.execute("ROLLBACK")
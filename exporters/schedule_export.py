@@ -0,0 +1,134 @@
+import csv
+import os
+from datetime import date, timedelta
+
+from scheduling.schedule_graph import ScheduleGraph
+
+EPOCH = date(1970, 1, 1)
+DATE_COLUMNS = ("planned_start", "planned_end", "actual_start", "actual_end")
+CPM_COLUMNS = ("es", "ef", "ls", "lf", "slack", "is_critical")
+EXPORT_COLUMNS = (
+    "id", "name", "description", "direction", "duration", "dependencies",
+    *DATE_COLUMNS,
+    "actual_duration", "assigned_employee_id", "employee_name",
+    *CPM_COLUMNS,
+)
+
+
+def export_schedule(db_manager, path, schedule_graph=None, chunk_size=10000, progress=None):
+    # Формат определяется расширением файла: .csv, .parquet или .arrow/.feather (Arrow IPC)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        writer = CsvChunkWriter(path)
+    elif extension == ".parquet":
+        writer = ArrowChunkWriter(path, parquet=True)
+    elif extension in (".arrow", ".feather"):
+        writer = ArrowChunkWriter(path, parquet=False)
+    else:
+        raise Exception(f"Неподдерживаемый формат файла: {extension}")
+
+    if schedule_graph is None:
+        schedule_graph = build_schedule_graph(db_manager)
+
+    exported = 0
+    try:
+        for chunk in db_manager.iter_task_columns(chunk_size):
+            add_cpm_columns(chunk, schedule_graph)
+            writer.write(chunk)
+            exported += len(chunk["id"])
+            if progress:
+                progress(exported)
+    finally:
+        writer.close()
+    return exported
+
+
+def build_schedule_graph(db_manager):
+    # В граф попадают только ID, длительности и связи, без текстовых полей задач
+    dependency_map = db_manager.get_dependency_map()
+    rows = db_manager.execute_query("SELECT id, duration, actual_duration FROM tasks")
+    return ScheduleGraph(
+        (task_id, None, actual_duration or duration, dependency_map.get(task_id, []))
+        for task_id, duration, actual_duration in rows
+    )
+
+
+def add_cpm_columns(chunk, schedule_graph):
+    project_duration = schedule_graph.project_duration
+    critical_tasks = schedule_graph.critical_tasks()
+    for column in CPM_COLUMNS:
+        chunk[column] = []
+    for task_id in chunk["id"]:
+        if task_id not in schedule_graph.es:
+            for column in CPM_COLUMNS:
+                chunk[column].append(None)
+            continue
+        es = schedule_graph.es[task_id]
+        ls = project_duration - schedule_graph.tail[task_id]
+        chunk["es"].append(es)
+        chunk["ef"].append(schedule_graph.ef[task_id])
+        chunk["ls"].append(ls)
+        chunk["lf"].append(ls + schedule_graph.durations[task_id])
+        chunk["slack"].append(ls - es)
+        chunk["is_critical"].append(task_id in critical_tasks)
+
+
+class CsvChunkWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, chunk):
+        for column in DATE_COLUMNS:
+            chunk[column] = [
+                None if day is None else (EPOCH + timedelta(days=day)).isoformat()
+                for day in chunk.pop(f"{column}_day")
+            ]
+        self.writer.writerows(zip(*(chunk[column] for column in EXPORT_COLUMNS)))
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowChunkWriter:
+    def __init__(self, path, parquet):
+        try:
+            import pyarrow
+        except ImportError:
+            raise Exception("Для экспорта в Parquet и Arrow необходимо установить пакет pyarrow!")
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            ("id", pyarrow.int64()),
+            ("name", pyarrow.string()),
+            ("description", pyarrow.string()),
+            ("direction", pyarrow.string()),
+            ("duration", pyarrow.int64()),
+            ("dependencies", pyarrow.string()),
+            *((column, pyarrow.date32()) for column in DATE_COLUMNS),
+            ("actual_duration", pyarrow.int64()),
+            ("assigned_employee_id", pyarrow.int64()),
+            ("employee_name", pyarrow.string()),
+            *((column, pyarrow.int64()) for column in CPM_COLUMNS[:-1]),
+            ("is_critical", pyarrow.bool_()),
+        ])
+        if parquet:
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, chunk):
+        # Даты хранятся в БД как число дней от 1970-01-01 - это и есть представление date32
+        for column in DATE_COLUMNS:
+            chunk[column] = self.pyarrow.array(chunk.pop(f"{column}_day"), self.pyarrow.int32()).cast(
+                self.pyarrow.date32()
+            )
+        self.writer.write_batch(self.pyarrow.record_batch(
+            [chunk[column] for column in EXPORT_COLUMNS], schema=self.schema
+        ))
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,307 @@
+import csv
+import math
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+
+DIRECTIONS = ("ЭТО", "ТМО", "АСУ ТП")
+HOURS_PER_DAY = 8
+
+# Заголовки столбцов CSV/XLSX в нижнем регистре -> поле задачи
+HEADER_ALIASES = {
+    "id": "ref",
+    "№": "ref",
+    "номер": "ref",
+    "name": "name",
+    "название": "name",
+    "задача": "name",
+    "description": "description",
+    "описание": "description",
+    "direction": "direction",
+    "направление": "direction",
+    "специализация": "direction",
+    "duration": "duration",
+    "длительность": "duration",
+    "dependencies": "dependencies",
+    "predecessors": "dependencies",
+    "зависимости": "dependencies",
+    "предшественники": "dependencies",
+    "employee": "employee",
+    "исполнитель": "employee",
+    "сотрудник": "employee",
+}
+
+DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?")
+
+
+def read_task_file(path):
+    # Записи выдаются по одной: ("task", dict) или ("assignment", (ref, employee, direction))
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_csv_records(path)
+    if extension == ".xlsx":
+        return read_xlsx_records(path)
+    if extension == ".xml":
+        return read_msproject_records(path)
+    raise Exception(f"Неподдерживаемый формат файла: {extension}")
+
+
+def read_csv_records(path):
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        sample = file.read(4096)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from _table_records(csv.reader(file, dialect))
+
+
+def read_xlsx_records(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise Exception("Для импорта XLSX необходимо установить пакет openpyxl!")
+
+    # В режиме read_only строки читаются с диска по мере обхода, а не загружаются целиком
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from _table_records(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def read_msproject_records(path):
+    resources = {}
+    container = None
+    namespace = None
+    for event, element in ElementTree.iterparse(path, events=("start", "end")):
+        if namespace is None:
+            namespace = element.tag[:element.tag.index("}") + 1] if element.tag.startswith("{") else ""
+        tag = element.tag[len(namespace):]
+        if event == "start":
+            if tag in ("Tasks", "Resources", "Assignments"):
+                container = element
+            continue
+
+        if tag == "Task" and container is not None:
+            record = _msproject_task(element, namespace)
+            if record:
+                yield "task", record
+        elif tag == "Resource" and container is not None:
+            uid = _child_text(element, namespace, "UID")
+            name = _child_text(element, namespace, "Name")
+            if uid and name:
+                group = _child_text(element, namespace, "Group")
+                resources[uid] = (name, group if group in DIRECTIONS else None)
+        elif tag == "Assignment" and container is not None:
+            resource = resources.get(_child_text(element, namespace, "ResourceUID"))
+            task_uid = _child_text(element, namespace, "TaskUID")
+            if resource and task_uid:
+                yield "assignment", (task_uid, resource[0], resource[1])
+        else:
+            continue
+        # Разобранные элементы удаляются из дерева, чтобы память не росла с размером файла
+        container.clear()
+
+
+def import_tasks(db_manager, records, chunk_size=1000, progress=None, cancelled=None):
+    # Задачи записываются пакетами по chunk_size в отдельных транзакциях. Зависимости на задачи,
+    # которые встретятся в файле позже, и назначения откладываются до конца импорта,
+    # после чего плановые даты пересчитываются один раз. Зависимости, замыкающие цикл, пропускаются.
+    # При ошибке в файле уже записанные задачи получают свои связи, назначения и плановые даты
+    previous_profile = db_manager.connection_profile
+    db_manager.apply_connection_profile("bulk-load")
+    try:
+        return _import_tasks(db_manager, records, chunk_size, progress, cancelled)
+    finally:
+        db_manager.apply_connection_profile(previous_profile)
+
+
+def _import_tasks(db_manager, records, chunk_size, progress, cancelled):
+    employees = {}
+    for employee in db_manager.get_all_employees():
+        employees.setdefault(employee.name, (employee.id, employee.direction))
+
+    task_ids = {}
+    chunk = []
+    chunk_refs = set()
+    deferred_edges = []
+    assignments = []
+    result = {"imported": 0, "skipped_dependencies": 0, "cancelled": False}
+
+    def flush():
+        _add_missing_employees(
+            db_manager, employees, ((task["employee"], task["direction"]) for task in chunk if task["employee"])
+        )
+
+        # Сразу записываются только связи с задачами выше по файлу, они не могут образовать цикл
+        bulk = []
+        earlier_refs = set()
+        for task in chunk:
+            dependencies = []
+            for dep_ref in task["dependencies"]:
+                if dep_ref in task_ids:
+                    dependencies.append(task_ids[dep_ref])
+                elif dep_ref in earlier_refs:
+                    dependencies.append(dep_ref)
+                else:
+                    deferred_edges.append((dep_ref, task["ref"]))
+            earlier_refs.add(task["ref"])
+            employee = employees.get(task["employee"])
+            bulk.append({
+                "ref": task["ref"],
+                "name": task["name"],
+                "description": task["description"],
+                "direction": task["direction"] or (employee[1] if employee else None),
+                "duration": task["duration"],
+                "dependencies": dependencies,
+                "assigned_employee_id": employee[0] if employee else None,
+            })
+
+        task_ids.update(zip(
+            (task["ref"] for task in chunk), db_manager.add_tasks_bulk(bulk)
+        ))
+        result["imported"] += len(chunk)
+        chunk.clear()
+        chunk_refs.clear()
+        if progress:
+            progress(result["imported"])
+
+    try:
+        for kind, record in records:
+            if cancelled and cancelled():
+                result["cancelled"] = True
+                chunk.clear()
+                break
+            if kind == "assignment":
+                assignments.append(record)
+                continue
+            if record["ref"] in task_ids or record["ref"] in chunk_refs:
+                raise Exception(f"Задача {record['ref']} встречается в файле несколько раз!")
+            chunk.append(record)
+            chunk_refs.add(record["ref"])
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    finally:
+        _link_imported_tasks(db_manager, employees, task_ids, deferred_edges, assignments, result)
+    return result
+
+
+def _link_imported_tasks(db_manager, employees, task_ids, deferred_edges, assignments, result):
+    edges = []
+    for dep_ref, task_ref in deferred_edges:
+        if dep_ref in task_ids and task_ref in task_ids:
+            edges.append((task_ids[dep_ref], task_ids[task_ref]))
+        else:
+            result["skipped_dependencies"] += 1
+    if edges:
+        result["skipped_dependencies"] += len(db_manager.add_task_dependencies(edges))
+
+    if assignments:
+        _add_missing_employees(db_manager, employees, (assignment[1:] for assignment in assignments))
+        db_manager.assign_tasks_bulk(
+            (task_ids[task_ref], employees[name][0], employees[name][1])
+            for task_ref, name, _ in assignments if task_ref in task_ids
+        )
+
+    if task_ids:
+        db_manager.reschedule_tasks(list(task_ids.values()))
+
+
+def parse_duration(value):
+    if isinstance(value, (int, float)):
+        return max(math.ceil(value), 1)
+    value = str(value).strip()
+    match = DURATION_PATTERN.fullmatch(value) if value.startswith("P") else None
+    if match:
+        days, hours, minutes, seconds = (float(part or 0) for part in match.groups())
+        hours += days * HOURS_PER_DAY + minutes / 60 + seconds / 3600
+        return max(math.ceil(hours / HOURS_PER_DAY), 1)
+    return max(math.ceil(float(value.replace(",", "."))), 1)
+
+
+def _add_missing_employees(db_manager, employees, candidates):
+    new_employees = {}
+    for name, direction in candidates:
+        if name not in employees:
+            new_employees.setdefault(name, direction)
+    employee_ids = db_manager.add_employees_bulk(list(new_employees.items()))
+    for (name, direction), employee_id in zip(new_employees.items(), employee_ids):
+        employees[name] = (employee_id, direction)
+
+
+def _table_records(rows):
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = {}
+    for index, title in enumerate(header):
+        field = HEADER_ALIASES.get(str(title or "").strip().lower())
+        if field and field not in columns:
+            columns[field] = index
+    for field in ("name", "duration"):
+        if field not in columns:
+            raise Exception(f"В файле нет обязательного столбца: {field}")
+
+    for row_number, row in enumerate(rows, start=2):
+        values = {field: _cell(row, index) for field, index in columns.items()}
+        if not values["name"]:
+            continue
+        direction = values.get("direction") or None
+        if direction and direction not in DIRECTIONS:
+            raise Exception(f"Строка {row_number}: неизвестное направление {direction}")
+        try:
+            duration = parse_duration(values["duration"])
+        except ValueError:
+            raise Exception(f"Строка {row_number}: некорректная длительность {values['duration']}")
+        yield "task", {
+            "ref": values.get("ref") or str(row_number - 1),
+            "name": values["name"],
+            "description": values.get("description") or "",
+            "direction": direction,
+            "duration": duration,
+            "dependencies": [ref for ref in re.split(r"[,;\s]+", values.get("dependencies") or "") if ref],
+            "employee": values.get("employee") or None,
+        }
+
+
+def _cell(row, index):
+    value = row[index] if index < len(row) else None
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _msproject_task(element, namespace):
+    uid = _child_text(element, namespace, "UID")
+    name = _child_text(element, namespace, "Name")
+    # UID 0 - сводная задача проекта, суммарные задачи в план не переносятся
+    if not uid or uid == "0" or not name or _child_text(element, namespace, "Summary") == "1":
+        return None
+    dependencies = []
+    for link in element.iter(f"{namespace}PredecessorLink"):
+        predecessor_uid = _child_text(link, namespace, "PredecessorUID")
+        if predecessor_uid:
+            dependencies.append(predecessor_uid)
+    return {
+        "ref": uid,
+        "name": name,
+        "description": _child_text(element, namespace, "Notes") or "",
+        "direction": None,
+        "duration": parse_duration(_child_text(element, namespace, "Duration") or 1),
+        "dependencies": dependencies,
+        "employee": None,
+    }
+
+
+def _child_text(element, namespace, tag):
+    child = element.find(f"{namespace}{tag}")
+    if child is None or child.text is None:
+        return None
+    return child.text.strip()
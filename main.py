@@ -1,23 +1,61 @@
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from PySide6.QtWidgets import QApplication, QMainWindow, QTableWidgetItem, QMessageBox
 from PySide6.QtCore import QDate
+from database.async_database import AsyncDatabase
 from database.db_manager import DatabaseManager
+from database.entity_repository import NO_DIRECTION, UNASSIGNED_EMPLOYEE, EntityRepository
+from database.records import format_date, format_dependencies
 from gui.main_window import Ui_MainWindow
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from PySide6.QtWidgets import QListWidgetItem
-from PySide6.QtCore import Qt
-from datetime import timedelta
+from PySide6.QtWidgets import QListWidgetItem, QPushButton, QFileDialog, QProgressDialog, QLineEdit, QLabel, QCheckBox
+from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtGui import QIcon
+from analytics import task_statistics
+from exporters.schedule_export import export_schedule
+from importers.task_import import read_task_file, import_tasks
+from scheduling import critical_path
+from scheduling.risk_analysis import analyze_task_table, most_critical_tasks
+from scheduling.schedule_graph import ScheduleGraph
+
+# Поиск задач запускается после паузы в наборе текста и показывает не больше SEARCH_LIMIT задач
+SEARCH_DELAY_MS = 250
+SEARCH_LIMIT = 200
+# Число прогонов моделирования сроков методом Монте-Карло на вкладке анализа
+RISK_ITERATIONS = 10000
+# Постоянное зерно: на неизменном плане процентили не меняются от расчета к расчету
+RISK_SEED = 0
+# Сколько задач, чаще других попадающих на критический путь, показывается на вкладке анализа
+RISK_CRITICAL_TASKS = 3
 
 class MainWindow(QMainWindow, Ui_MainWindow):
+    # Завершение моделирования сроков: (номер запроса, Future); передается из потока моделирования в GUI
+    risk_forecast_finished = Signal(int, object)
+    # Число импортированных задач; передается из потока БД в диалог прогресса импорта
+    import_progress = Signal(int)
+
     def __init__(self, db_manager):
         super().__init__()
         self.setupUi(self)
         self.db_manager = db_manager
+        # Все чтения задач и сотрудников для экранов идут через кэш, сбрасываемый при записи
+        self.repository = EntityRepository(db_manager)
+        # Записи и перечитывание данных после них выполняются в потоке БД, чтобы окно не зависало
+        self.async_db = AsyncDatabase(db_manager, self)
+        # Моделирование сроков выполняется в своем потоке, чтобы не задерживать очередь запросов к БД.
+        # Одновременно идет один расчет; запрошенный во время него выполняется после по последним данным
+        self.risk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="risk-forecast")
+        self.risk_generation = 0
+        self.risk_running = False
+        self.risk_tasks = None
+        self.risk_forecast_finished.connect(self.on_risk_forecast_finished)
         self.setWindowTitle("Ресурсное планирование при ПНР")
         self.setWindowIcon(QIcon("logo.png"))
+        self.schedule_graph = ScheduleGraph()
 
         self.stackedWidget.setCurrentIndex(0)
         self.pushButtonEmployee.clicked.connect(lambda: self.stackedWidget.setCurrentIndex(0))
@@ -29,6 +67,16 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.pushButtonGantt.clicked.connect(self.build_gantt_chart_tasks)
         self.pushButtonAdd.clicked.connect(self.add_employee)
         self.chooseDirection_2.currentTextChanged.connect(self.update_employee_list)
+        self.lineEditSearchTasks = QLineEdit(self.Tasks)
+        self.lineEditSearchTasks.setObjectName("lineEditSearchTasks")
+        self.lineEditSearchTasks.setGeometry(370, 630, 380, 31)
+        self.lineEditSearchTasks.setPlaceholderText("Поиск задач по названию и описанию")
+        self.lineEditSearchTasks.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.search_tasks)
+        self.lineEditSearchTasks.textChanged.connect(self.search_timer.start)
         self.load_employees()
         self.load_tasks()
         self.load_tasks_to_list()
@@ -42,7 +90,39 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.pushButtonAddDateProject.clicked.connect(self.save_project_start_date)
         self.load_project_start_date()
         self.pushButtonAddTask.clicked.connect(self.add_task_to_db)
+        self.pushButtonImportTasks = QPushButton("Импорт", self.Tasks)
+        self.pushButtonImportTasks.setObjectName("pushButtonImportTasks")
+        self.pushButtonImportTasks.setGeometry(90, 630, 131, 31)
+        self.pushButtonImportTasks.setStyleSheet(
+            self.pushButtonAddTask.styleSheet().replace("pushButtonAddTask", "pushButtonImportTasks")
+        )
+        self.pushButtonImportTasks.clicked.connect(self.import_tasks_from_file)
+        self.pushButtonExportTasks = QPushButton("Экспорт", self.Tasks)
+        self.pushButtonExportTasks.setObjectName("pushButtonExportTasks")
+        self.pushButtonExportTasks.setGeometry(230, 630, 131, 31)
+        self.pushButtonExportTasks.setStyleSheet(
+            self.pushButtonAddTask.styleSheet().replace("pushButtonAddTask", "pushButtonExportTasks")
+        )
+        self.pushButtonExportTasks.clicked.connect(self.export_tasks_to_file)
+        self.checkBoxResourceLeveling = QCheckBox("Выравнивать загрузку сотрудников", self.Tasks)
+        self.checkBoxResourceLeveling.setObjectName("checkBoxResourceLeveling")
+        self.checkBoxResourceLeveling.setGeometry(370, 15, 321, 24)
+        self.checkBoxResourceLeveling.setToolTip(
+            "Задачи одного сотрудника не пересекаются: плановые даты сдвигаются с учетом его занятости"
+        )
+        self.checkBoxResourceLeveling.toggled.connect(self.set_resource_leveling)
+        self.load_resource_leveling()
         self.pushButtonSaveActualDuration.clicked.connect(self.save_actual_duration)
+        self.labelRiskTitle = QLabel("Срок завершения P50 / P80 / P95:", self.Analysis)
+        self.labelRiskTitle.setObjectName("labelRiskTitle")
+        self.labelRiskTitle.setGeometry(790, 50, 231, 16)
+        self.labelRiskCompletion = QLabel(self.Analysis)
+        self.labelRiskCompletion.setObjectName("labelRiskCompletion")
+        self.labelRiskCompletion.setGeometry(790, 70, 341, 16)
+        self.labelRiskCritical = QLabel(self.Analysis)
+        self.labelRiskCritical.setObjectName("labelRiskCritical")
+        self.labelRiskCritical.setGeometry(790, 90, 341, 16)
+        self.load_schedule_graph()
         self.update_analysis_tab()
         self.stackedWidgetDiagrams.setCurrentIndex(0)
         self.pushButtonDiagram1.clicked.connect(self.switch_to_previous_diagram)
@@ -72,76 +152,116 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.stackedWidgetPieCharts.setCurrentIndex(index)
 
     def load_employees_to_delete(self):
-        employees = self.db_manager.get_all_employees()
+        employees = self.repository.employees()
         self.deleteEmployee.clear()
         for employee in employees:
-            employee_id, name, direction = employee
-            self.deleteEmployee.addItem(f"{name} ({direction})", userData=employee_id)
+            self.deleteEmployee.addItem(f"{employee.name} ({employee.direction or ''})", userData=employee.id)
 
     def load_tasks_to_delete(self):
         try:
-            tasks = self.db_manager.get_tasks_for_deletion()
+            tasks = self.repository.tasks()
             self.deleteTask.clear()
-            for task in tasks:
-                (
-                    task_id,
-                    name,
-                    planned_start,
-                    planned_end,
-                    assigned_employee_id,
-                    actual_start,
-                    actual_end,
-                ) = task
+            for task_id, name in zip(tasks["id"].tolist(), tasks["name"]):
                 self.deleteTask.addItem(f"{name}", userData=task_id)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить задачи: {e}")
 
     def delete_employee(self):
         employee_id = self.deleteEmployee.currentData()
-        self.db_manager.delete_employee(employee_id)
+        self.async_db.submit(
+            self.db_manager.delete_employee, employee_id,
+            on_result=lambda _: self.refresh_views(self.on_employee_deleted),
+            on_error=self.error_handler("Не удалось удалить сотрудника"),
+        )
+
+    def on_employee_deleted(self):
         self.load_employees_to_delete()
         self.load_employees()
+        self.load_schedule_graph()
         self.update_analysis_tab()
 
-
     def delete_task(self):
         task_id = self.deleteTask.currentData()
+        self.async_db.submit(
+            self.db_manager.delete_task, task_id,
+            on_result=lambda _: self.on_task_deleted(task_id),
+            on_error=self.error_handler("Не удалось удалить задачу"),
+        )
+
+    def on_task_deleted(self, task_id):
+        self.schedule_graph.remove_task(task_id)
+        self.refresh_views(self.show_task_changes)
+
+    def show_task_changes(self):
+        self.load_tasks()
+        self.load_tasks_to_table()
+        self.update_analysis_tab()
+
+    def refresh_views(self, show):
+        # Изменившиеся таблицы перечитываются в потоке БД и подставляются в кэш, после чего show()
+        # строит экраны из кэша без обращений к БД
+        state = self.repository.cache_state()
+
+        def install(snapshot):
+            self.repository.install(snapshot)
+            show()
+
+        self.async_db.submit(
+            self.repository.load_stale, state,
+            on_result=install,
+            on_error=self.error_handler("Не удалось загрузить данные"),
+        )
+
+    def error_handler(self, message):
+        return lambda e: QMessageBox.critical(self, "Ошибка", f"{message}: {e}")
+
+    def closeEvent(self, event):
+        self.risk_executor.shutdown(wait=False, cancel_futures=True)
+        self.async_db.close()
+        super().closeEvent(event)
+
+    def load_tasks(self):
         try:
-            self.db_manager.delete_task(task_id)
+            if self.lineEditSearchTasks.text().strip():
+                self.search_tasks()
+            else:
+                self.fill_tasks_table(self.repository.tasks())
+
             self.load_tasks_to_delete()
-            self.load_tasks()
-            self.load_tasks_to_table()
-            self.update_analysis_tab()
+            self.load_tasks_to_list()
+
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось удалить задачу: {e}")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить задачи: {e}")
 
-    def load_tasks(self):
+    def search_tasks(self):
+        # Полнотекстовый поиск выполняется в потоке БД; пустая строка возвращает полный список задач
+        text = self.lineEditSearchTasks.text().strip()
+        if not text:
+            self.fill_tasks_table(self.repository.tasks())
+            return
+        self.async_db.submit(
+            self.db_manager.search_tasks, text, SEARCH_LIMIT,
+            on_result=lambda tasks: self.show_search_results(text, tasks),
+            on_error=self.error_handler("Не удалось выполнить поиск задач"),
+        )
+
+    def show_search_results(self, text, tasks):
+        # Результат запроса, после которого текст поиска уже изменился, не показывается
+        if text == self.lineEditSearchTasks.text().strip():
+            self.fill_tasks_table(tasks)
+
+    def fill_tasks_table(self, tasks):
         try:
-            tasks = self.db_manager.get_all_tasks()
             self.tableWidgetTasks.setRowCount(0)
             for row_number, task in enumerate(tasks):
-                (
-                    id,
-                    name,
-                    description,
-                    direction,
-                    duration,
-                    dependencies,
-                    planned_start,
-                    planned_end,
-                    actual_start,
-                    actual_end,
-                    actual_duration,
-                    assigned_employee_id,
-                ) = task
                 self.tableWidgetTasks.insertRow(row_number)
-                self.tableWidgetTasks.setItem(row_number, 0, QTableWidgetItem(str(id)))
-                self.tableWidgetTasks.setItem(row_number, 1, QTableWidgetItem(name))
-                self.tableWidgetTasks.setItem(row_number, 2, QTableWidgetItem(direction))
-                self.tableWidgetTasks.setItem(row_number, 3, QTableWidgetItem(planned_start))
-                self.tableWidgetTasks.setItem(row_number, 4, QTableWidgetItem(planned_end))
-                self.tableWidgetTasks.setItem(row_number, 5, QTableWidgetItem(str(duration)))
-                self.tableWidgetTasks.setItem(row_number, 6, QTableWidgetItem(dependencies))
+                self.tableWidgetTasks.setItem(row_number, 0, QTableWidgetItem(str(task.id)))
+                self.tableWidgetTasks.setItem(row_number, 1, QTableWidgetItem(task.name))
+                self.tableWidgetTasks.setItem(row_number, 2, QTableWidgetItem(task.direction or ""))
+                self.tableWidgetTasks.setItem(row_number, 3, QTableWidgetItem(format_date(task.planned_start)))
+                self.tableWidgetTasks.setItem(row_number, 4, QTableWidgetItem(format_date(task.planned_end)))
+                self.tableWidgetTasks.setItem(row_number, 5, QTableWidgetItem(str(task.duration)))
+                self.tableWidgetTasks.setItem(row_number, 6, QTableWidgetItem(format_dependencies(task.dependencies)))
 
             centered_columns = [0, 2, 3, 4, 5, 6]
             for row in range(self.tableWidgetTasks.rowCount()):
@@ -157,19 +277,16 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.tableWidgetTasks.setColumnWidth(5, 110)
             self.tableWidgetTasks.setColumnWidth(6, 30)
 
-            self.load_tasks_to_delete()
-            self.load_tasks_to_list()
-
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить задачи: {e}")
 
     def load_employees(self):
-        employees = self.db_manager.get_all_employees()
+        employees = self.repository.employees()
         self.tableWidget.setRowCount(0)
         for row_number, employee in enumerate(employees):
             self.tableWidget.insertRow(row_number)
-            self.tableWidget.setItem(row_number, 0, QTableWidgetItem(employee[1]))
-            self.tableWidget.setItem(row_number, 1, QTableWidgetItem(employee[2]))
+            self.tableWidget.setItem(row_number, 0, QTableWidgetItem(employee.name))
+            self.tableWidget.setItem(row_number, 1, QTableWidgetItem(employee.direction or ""))
         self.tableWidget.setColumnWidth(0, 250)
         self.tableWidget.setColumnWidth(1, 50)
         centered_columns = [0, 1]
@@ -182,10 +299,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         direction = self.chooseDirection_2.currentText()
         if not direction:
             return
-        employees = self.db_manager.get_employees_by_direction(direction)
+        self.async_db.submit(
+            self.db_manager.get_employees_by_direction, direction,
+            on_result=lambda employees: self.show_direction_employees(direction, employees),
+            on_error=self.error_handler("Не удалось загрузить сотрудников"),
+        )
+
+    def show_direction_employees(self, direction, employees):
+        # Список для направления, которое уже сменили, не показывается
+        if direction != self.chooseDirection_2.currentText():
+            return
         self.chooseEmployee.clear()
         for employee in employees:
-            self.chooseEmployee.addItem(employee[1], userData=employee[0])
+            self.chooseEmployee.addItem(employee.name, userData=employee.id)
 
     def add_employee(self):
         name = self.addEmployee.text().strip()
@@ -197,21 +323,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         if not direction or direction == "":
             QMessageBox.warning(self, "Ошибка", "Выберите специализацию!")
             return
-        try:
-            self.db_manager.add_employee(name, direction)
-            self.addEmployee.clear()
-            self.load_employees()
-            self.load_employees_to_delete()
-            self.update_analysis_tab()
+        self.async_db.submit(
+            self.db_manager.add_employee, name, direction,
+            on_result=lambda _: self.refresh_views(self.on_employee_added),
+            on_error=self.error_handler("Не удалось добавить сотрудника"),
+        )
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось добавить сотрудника: {e}")
+    def on_employee_added(self):
+        self.addEmployee.clear()
+        self.load_employees()
+        self.load_employees_to_delete()
+        self.update_analysis_tab()
 
     def load_tasks_to_list(self):
-        tasks = self.db_manager.get_tasks_for_list()
+        tasks = self.repository.tasks()
         self.listWidgetTasks.clear()
-        for task in tasks:
-            task_id, name = task
+        for task_id, name in zip(tasks["id"].tolist(), tasks["name"]):
             item = QListWidgetItem(f"{task_id}: {name}")
             self.listWidgetTasks.addItem(item)
 
@@ -223,51 +350,47 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
             item_text = current_item.text()
             task_id = int(item_text.split(":")[0])
-            task = self.db_manager.get_task_by_id(task_id)
-            if not task:
-                QMessageBox.warning(self, "Ошибка", "Задача не найдена!")
-                return
-
-            self.actualDurationInput.setValue(1)
+            self.async_db.submit(
+                self.db_manager.get_task_by_id, task_id,
+                on_result=lambda task: self.on_task_loaded(current_item, task),
+                on_error=self.error_handler("Не удалось загрузить данные задачи"),
+            )
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить данные задачи: {e}")
 
+    def on_task_loaded(self, item, task):
+        # Пока задача читалась, могли выбрать другую
+        if item is not self.listWidgetTasks.currentItem():
+            return
+        if not task:
+            QMessageBox.warning(self, "Ошибка", "Задача не найдена!")
+            return
+
+        self.actualDurationInput.setValue(1)
+
     def load_tasks_to_table(self):
         try:
             self.tableWidgetActualDates.clearContents()
             self.tableWidgetActualDates.setRowCount(0)
 
-            tasks = self.db_manager.get_all_tasks()
+            tasks = self.repository.tasks()
 
             self.tableWidgetActualDates.setRowCount(len(tasks))
 
             for row, task in enumerate(tasks):
-                (
-                    task_id,
-                    name,
-                    description,
-                    direction,
-                    duration,
-                    dependencies,
-                    planned_start,
-                    planned_end,
-                    actual_start,
-                    actual_end,
-                    actual_duration,
-                    assigned_employee_id,
-                ) = task
-
-                self.tableWidgetActualDates.setItem(row, 0, QTableWidgetItem(str(task_id)))
-                self.tableWidgetActualDates.setItem(row, 1, QTableWidgetItem(name))
-                self.tableWidgetActualDates.setItem(row, 2, QTableWidgetItem(direction))
-                self.tableWidgetActualDates.setItem(row, 3, QTableWidgetItem(planned_start or ""))
-                self.tableWidgetActualDates.setItem(row, 4, QTableWidgetItem(planned_end or ""))
-                self.tableWidgetActualDates.setItem(row, 5, QTableWidgetItem(actual_start or ""))
-                self.tableWidgetActualDates.setItem(row, 6, QTableWidgetItem(actual_end or ""))
-                self.tableWidgetActualDates.setItem(row, 7, QTableWidgetItem(str(duration) or ""))
-                self.tableWidgetActualDates.setItem(row, 8, QTableWidgetItem(str(actual_duration) or ""))
-                self.tableWidgetActualDates.setItem(row, 9, QTableWidgetItem(dependencies))
+                self.tableWidgetActualDates.setItem(row, 0, QTableWidgetItem(str(task.id)))
+                self.tableWidgetActualDates.setItem(row, 1, QTableWidgetItem(task.name))
+                self.tableWidgetActualDates.setItem(row, 2, QTableWidgetItem(task.direction or ""))
+                self.tableWidgetActualDates.setItem(row, 3, QTableWidgetItem(format_date(task.planned_start)))
+                self.tableWidgetActualDates.setItem(row, 4, QTableWidgetItem(format_date(task.planned_end)))
+                self.tableWidgetActualDates.setItem(row, 5, QTableWidgetItem(format_date(task.actual_start)))
+                self.tableWidgetActualDates.setItem(row, 6, QTableWidgetItem(format_date(task.actual_end)))
+                self.tableWidgetActualDates.setItem(row, 7, QTableWidgetItem(str(task.duration)))
+                self.tableWidgetActualDates.setItem(row, 8, QTableWidgetItem(
+                    "" if task.actual_duration is None else str(task.actual_duration)
+                ))
+                self.tableWidgetActualDates.setItem(row, 9, QTableWidgetItem(format_dependencies(task.dependencies)))
 
             centered_columns = [0, 2, 3, 4, 5, 6, 7, 8, 9]
             for row in range(self.tableWidgetActualDates.rowCount()):
@@ -297,7 +420,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                     item.setFlags(Qt.ItemIsEnabled)
 
     def load_project_start_date(self):
-        start_date = self.db_manager.get_project_start_date()
+        self.async_db.submit(
+            self.db_manager.get_project_start_date,
+            on_result=self.show_project_start_date,
+            on_error=self.error_handler("Не удалось загрузить дату начала проекта"),
+        )
+
+    def show_project_start_date(self, start_date):
         if start_date:
             date_object = datetime.strptime(start_date, "%Y-%m-%d")
             formatted_date = date_object.strftime("%d-%m-%Y")
@@ -305,70 +434,54 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         else:
             self.labelStartDate.setText("Не задана")
 
+    def load_resource_leveling(self):
+        self.async_db.submit(
+            self.db_manager.get_resource_leveling,
+            on_result=self.show_resource_leveling,
+            on_error=self.error_handler("Не удалось загрузить режим выравнивания загрузки"),
+        )
+
+    def show_resource_leveling(self, enabled):
+        self.checkBoxResourceLeveling.blockSignals(True)
+        self.checkBoxResourceLeveling.setChecked(enabled)
+        self.checkBoxResourceLeveling.blockSignals(False)
+
+    def set_resource_leveling(self, enabled):
+        def fail(e):
+            self.show_resource_leveling(not enabled)
+            QMessageBox.critical(self, "Ошибка", f"Не удалось изменить режим выравнивания загрузки: {e}")
+
+        self.async_db.submit(
+            self.db_manager.set_resource_leveling, enabled,
+            on_result=lambda _: self.refresh_views(self.on_schedule_changed),
+            on_error=fail,
+        )
+
+    def on_schedule_changed(self):
+        self.show_task_changes()
+        self.build_gantt_chart()
+        self.build_gantt_chart_tasks()
+
     def save_project_start_date(self):
         selected_date = self.dateStartProject.date()
         start_date = selected_date.toString("yyyy-MM-dd")
-        self.db_manager.save_project_start_date(start_date)
-        self.labelStartDate.setText(start_date)
+        self.async_db.submit(
+            self.db_manager.save_project_start_date, start_date,
+            on_result=lambda _: self.labelStartDate.setText(start_date),
+            on_error=self.error_handler("Не удалось сохранить дату начала проекта"),
+        )
 
     def build_gantt_chart(self):
         try:
-            query = """
-                SELECT 
-                    tvd.task_id,
-                    t.name,
-                    tvd.planned_start,
-                    tvd.planned_end,
-                    tvd.actual_start,
-                    tvd.actual_end,
-                    t.assigned_employee_id
-                FROM 
-                    task_visualization_dates tvd
-                JOIN 
-                    tasks t ON tvd.task_id = t.id
-            """
-            tasks = self.db_manager.execute_query(query)
-
-            chart_data = []
-            for task in tasks:
-                task_id = task[0]
-                name = task[1]
-                planned_start = task[2]
-                planned_end = task[3]
-                actual_start = task[4]
-                actual_end = task[5]
-                assigned_employee_id = task[6]
-
-                planned_start_dt = datetime.strptime(planned_start, "%Y-%m-%d")
-                planned_end_dt = datetime.strptime(planned_end, "%Y-%m-%d")
-
-                employee_name = self.db_manager.get_employee_name(assigned_employee_id)
-
-                chart_data.append((
-                    employee_name,
-                    planned_start_dt,
-                    planned_end_dt,
-                    name,
-                    "Planned"
-                ))
-                if actual_start and actual_end:
-                    actual_start_dt = datetime.strptime(actual_start, "%Y-%m-%d")
-                    actual_end_dt = datetime.strptime(actual_end, "%Y-%m-%d")
-
-                    if actual_end_dt > planned_end_dt:
-                        task_type = "ActualLate"
-                    else:
-                        task_type = "Actual"
-
-                    chart_data.append((
-                        employee_name,
-                        actual_start_dt,
-                        actual_end_dt,
-                        name,
-                        task_type
-                    ))
+            tasks = self.repository.tasks()
+            names = self.repository.employee_names()
+            employee_names = np.array(
+                [names.get(employee_id, UNASSIGNED_EMPLOYEE) for employee_id in tasks["assigned_employee_id"]],
+                dtype=object
+            )
+            chart_data = self.gantt_chart_rows(tasks, {"Employee": employee_names, "Task": tasks["name"]})
 
-            df = pd.DataFrame(chart_data, columns=["Employee", "Start", "Finish", "Task", "Type"])
+            df = chart_data[["Employee", "Start", "Finish", "Task", "Type"]]
 
             min_start_dates = df.groupby("Employee")["Start"].min().reset_index()
             min_start_dates.columns = ["Employee", "MinStart"]
@@ -452,58 +565,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             print("")
 
     def build_gantt_chart_tasks(self):
-        query = """
-               SELECT 
-                   tvd.task_id,
-                   t.name,
-                   tvd.planned_start,
-                   tvd.planned_end,
-                   tvd.actual_start,
-                   tvd.actual_end
-               FROM 
-                   task_visualization_dates tvd
-               JOIN 
-                   tasks t ON tvd.task_id = t.id
-           """
-        tasks = self.db_manager.execute_query(query)
-
-        chart_data = []
-        for task in tasks:
-            task_id = task[0]
-            name = task[1]
-            planned_start = task[2]
-            planned_end = task[3]
-            actual_start = task[4]
-            actual_end = task[5]
-
-            planned_start_dt = datetime.strptime(planned_start, "%Y-%m-%d")
-            planned_end_dt = datetime.strptime(planned_end, "%Y-%m-%d")
-
-            name = task[1][:20] + "..." if len(task[1]) > 20 else task[1]
-            chart_data.append((
-                name,
-                planned_start_dt,
-                planned_end_dt,
-                "Planned"
-            ))
-
-            if actual_start and actual_end:
-                actual_start_dt = datetime.strptime(actual_start, "%Y-%m-%d")
-                actual_end_dt = datetime.strptime(actual_end, "%Y-%m-%d")
-
-                if actual_end_dt > planned_end_dt:
-                    task_type = "ActualLate"
-                else:
-                    task_type = "Actual"
-
-                chart_data.append((
-                    name,
-                    actual_start_dt,
-                    actual_end_dt,
-                    task_type
-                ))
+        tasks = self.repository.tasks()
+        names = np.array([name[:20] + "..." if len(name) > 20 else name for name in tasks["name"]], dtype=object)
+        chart_data = self.gantt_chart_rows(tasks, {"Task": names})
 
-        df = pd.DataFrame(chart_data, columns=["Task", "Start", "Finish", "Type"])
+        df = chart_data[["Task", "Start", "Finish", "Type"]]
         df = df.sort_values(by="Start", ascending=False)
 
         fig = px.timeline(
@@ -575,28 +641,37 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         html_content = fig.to_html(include_plotlyjs="cdn", config={"scrollZoom": True})
         self.webEngineViewDiagramTasks.setHtml(html_content)
 
+    def gantt_chart_rows(self, tasks, labels):
+        # Окончание на диаграмме Ганта исключающее, поэтому к датам окончания прибавляется один день
+        planned = task_statistics.has_dates(tasks["planned_start"], tasks["planned_end"])
+        planned_rows = pd.DataFrame({
+            **{column: values[planned] for column, values in labels.items()},
+            "Start": tasks["planned_start"][planned],
+            "Finish": tasks["planned_end"][planned] + 1,
+            "Type": "Planned",
+        })
+
+        actual = planned & task_statistics.has_dates(tasks["actual_start"], tasks["actual_end"])
+        actual_rows = pd.DataFrame({
+            **{column: values[actual] for column, values in labels.items()},
+            "Start": tasks["actual_start"][actual],
+            "Finish": tasks["actual_end"][actual] + 1,
+            "Type": np.where(tasks["actual_end"][actual] > tasks["planned_end"][actual], "ActualLate", "Actual"),
+        })
+        return pd.concat([planned_rows, actual_rows], ignore_index=True)
+
     def prepare_gantt_data(self):
-        tasks = self.db_manager.get_all_tasks()
-
-        critical_data = self.calculate_critical_path()
-        critical_path_ids = critical_data.get("critical_path", [])
-
-        chart_data = []
-        for task in tasks:
-            task_id = task[0]
-            name = task[1]
-            planned_start = datetime.strptime(task[6], "%Y-%m-%d")
-            planned_end = datetime.strptime(task[7], "%Y-%m-%d")
-
-            task_type = "Critical" if task_id in critical_path_ids else "Normal"
-
-            chart_data.append((
-                name,
-                planned_start,
-                planned_end,
-                task_type
-            ))
-        df = pd.DataFrame(chart_data, columns=["Task", "Start", "Finish", "Type"])
+        tasks = self.repository.tasks()
+        critical_path_ids = self.schedule_graph.critical_tasks()
+
+        planned = task_statistics.has_dates(tasks["planned_start"], tasks["planned_end"])
+        is_critical = np.isin(tasks["id"][planned], list(critical_path_ids))
+        df = pd.DataFrame({
+            "Task": tasks["name"][planned],
+            "Start": tasks["planned_start"][planned],
+            "Finish": tasks["planned_end"][planned],
+            "Type": np.where(is_critical, "Critical", "Normal"),
+        })
         return df
 
     def build_gantt_with_critical_path(self):
@@ -682,7 +757,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 QMessageBox.warning(self, "Ошибка", "Выберите сотрудника!")
                 return
 
-            tasks_in_db = self.db_manager.get_all_tasks()
+            tasks_in_db = self.repository.tasks()
             if tasks_in_db:
                 if not dependencies_str.strip():
                     QMessageBox.warning(self, "Ошибка", "Укажите зависимости для задачи!")
@@ -690,58 +765,101 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             else:
                 dependencies_str = ""
 
-            self.db_manager.add_task_with_calculated_dates(
+            self.async_db.submit(
+                self.db_manager.add_task_with_calculated_dates,
                 task_name,
                 description,
                 direction,
                 duration,
                 dependencies_str,
-                assigned_employee_id
+                assigned_employee_id,
+                on_result=lambda task_id: self.on_task_added(task_id, task_name, duration, dependencies_str),
+                on_error=self.error_handler("Не удалось добавить задачу"),
             )
 
-            self.addTask.clear()
-            self.taskDescription.clear()
-            self.durationInput.setValue(1)
-            self.dependenciesInput.clear()
-            self.load_tasks()
-            self.load_tasks_to_table()
-            self.update_analysis_tab()
-
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось добавить задачу: {e}")
 
-    def calculate_actual_dates(self, task_id, actual_duration):
-        task = self.db_manager.get_task_by_id(task_id)
-        if not task:
-            raise Exception("Задача не найдена!")
+    def on_task_added(self, task_id, task_name, duration, dependencies_str):
+        self.schedule_graph.add_task(
+            task_id, task_name, duration, critical_path.parse_dependencies(dependencies_str)
+        )
 
-        dependencies_str = task[5]
-        project_start_date = self.db_manager.get_project_start_date()
+        self.addTask.clear()
+        self.taskDescription.clear()
+        self.durationInput.setValue(1)
+        self.dependenciesInput.clear()
+        self.refresh_views(self.show_task_changes)
 
-        project_start_dt = datetime.strptime(project_start_date, "%Y-%m-%d")
+    def import_tasks_from_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Импорт задач", "", "Планы (*.csv *.xlsx *.xml);;CSV (*.csv);;Excel (*.xlsx);;MS Project XML (*.xml)"
+        )
+        if not path:
+            return
 
-        if not dependencies_str or dependencies_str.strip() == "":
-            actual_start_dt = project_start_dt
-        else:
-            dependency_ids = [int(dep.strip()) for dep in dependencies_str.split(",") if dep.strip()]
+        # Импорт идет в потоке БД: прогресс приходит сигналом import_progress,
+        # а отмена передается через флаг, который поток БД проверяет между пачками
+        progress_dialog = QProgressDialog("Импорт задач...", "Отмена", 0, 0, self)
+        progress_dialog.setWindowTitle("Импорт задач")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        cancelled = threading.Event()
+        progress_dialog.canceled.connect(cancelled.set)
+        self.import_progress.connect(
+            lambda imported: progress_dialog.setLabelText(f"Импортировано задач: {imported}")
+        )
+        self.pushButtonImportTasks.setEnabled(False)
 
-            latest_dependency_end_dt = None
-            for dep_id in dependency_ids:
-                dep_task = self.db_manager.get_task_by_id(dep_id)
-                if dep_task and dep_task[9]:
-                    dep_end_dt = datetime.strptime(dep_task[9], "%Y-%m-%d")
-                    if latest_dependency_end_dt is None or dep_end_dt > latest_dependency_end_dt:
-                        latest_dependency_end_dt = dep_end_dt
+        def finish(result):
+            self.import_progress.disconnect()
+            progress_dialog.close()
+            self.pushButtonImportTasks.setEnabled(True)
+            self.refresh_views(lambda: self.on_tasks_imported(result))
 
-            if latest_dependency_end_dt is None:
-                raise Exception("Необходимо задать фактические даты для всех зависимых задач!")
+        def fail(e):
+            finish(None)
+            QMessageBox.critical(self, "Ошибка", f"Не удалось импортировать задачи: {e}")
 
-            actual_start_dt = latest_dependency_end_dt + timedelta(days=1)
+        self.async_db.submit(
+            lambda: import_tasks(
+                self.db_manager, read_task_file(path), progress=self.import_progress.emit, cancelled=cancelled.is_set
+            ),
+            on_result=finish,
+            on_error=fail,
+        )
 
-        actual_end_dt = actual_start_dt + timedelta(days=actual_duration - 1)
+    def on_tasks_imported(self, result):
+        self.load_employees()
+        self.load_employees_to_delete()
+        self.load_tasks()
         self.load_tasks_to_table()
+        self.load_schedule_graph()
+        self.update_analysis_tab()
 
-        return actual_start_dt.strftime("%Y-%m-%d"), actual_end_dt.strftime("%Y-%m-%d")
+        if result:
+            message = f"Импортировано задач: {result['imported']}"
+            if result["skipped_dependencies"]:
+                message += f"\nПропущено зависимостей на отсутствующие задачи: {result['skipped_dependencies']}"
+            if result["cancelled"]:
+                message += "\nИмпорт прерван пользователем"
+            QMessageBox.information(self, "Импорт задач", message)
+
+    def export_tasks_to_file(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт плана", "", "CSV (*.csv);;Parquet (*.parquet);;Arrow IPC (*.arrow)"
+        )
+        if not path:
+            return
+        # Выгрузка идет в потоке БД; граф задач окна меняется в главном потоке, поэтому
+        # export_schedule строит свой граф по данным БД
+        self.async_db.submit(
+            export_schedule, self.db_manager, path,
+            on_result=lambda exported: QMessageBox.information(
+                self, "Экспорт плана", f"Выгружено задач: {exported}"
+            ),
+            on_error=self.error_handler("Не удалось экспортировать план"),
+        )
 
     def save_actual_duration(self):
         try:
@@ -756,48 +874,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
             actual_duration = self.actualDurationInput.value()
 
-            self.db_manager.update_task_actual_duration(task_id, actual_duration)
-
-            actual_start, actual_end = self.calculate_actual_dates(task_id, actual_duration)
-
-            self.db_manager.update_task_actual_dates(task_id, actual_start, actual_end)
-            self.db_manager.update_task_visualization_dates(task_id, actual_start, actual_end)
-
-            self.load_tasks()
-            self.load_tasks_to_table()
-            self.update_analysis_tab()
+            self.async_db.submit(
+                self.db_manager.save_actual_duration, task_id, actual_duration,
+                on_result=lambda _: self.on_actual_duration_saved(task_id, actual_duration),
+                on_error=self.error_handler("Не удалось сохранить фактическую длительность"),
+            )
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить фактическую длительность: {e}")
 
-    def calculate_task_status_statistics(self):
-        tasks = self.db_manager.get_all_tasks()
-        completed_on_time = 0
-        overdue = 0
-        not_completed = 0
-
-        for task in tasks:
-            planned_end = task[7]
-            actual_start = task[8]
-            actual_end = task[9]
-
-            if not actual_start or not actual_end:
-                not_completed += 1
-                continue
+    def on_actual_duration_saved(self, task_id, actual_duration):
+        self.schedule_graph.update_task(task_id, duration=actual_duration)
+        self.refresh_views(self.show_task_changes)
 
-            planned_end_dt = datetime.strptime(planned_end, "%Y-%m-%d")
-            actual_end_dt = datetime.strptime(actual_end, "%Y-%m-%d")
-
-            if actual_end_dt <= planned_end_dt:
-                completed_on_time += 1
-            else:
-                overdue += 1
-
-        return {
-            "completed_on_time": completed_on_time,
-            "overdue": overdue,
-            "not_completed": not_completed,
-        }
+    def calculate_task_status_statistics(self):
+        tasks = self.repository.tasks()
+        return task_statistics.task_status_statistics(tasks)
 
     def display_pie_chart(self):
         stats = self.calculate_task_status_statistics()
@@ -834,23 +926,25 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.display_average_durations()
             self.update_task_quantity_label()
             self.update_employee_quantity_label()
-            self.build_bar_chart_quantity_employee()
-            self.build_bar_chart_duration()
-            self.fill_direction_analysis_table()
-            self.build_pie_chart_completed_tasks_by_direction()
+            # Итоги по направлениям берутся из кэша один раз для всех диаграмм и таблиц
+            summary = self.repository.direction_summary()
+            self.build_bar_chart_quantity_employee(summary)
+            self.build_bar_chart_duration(summary)
+            self.fill_direction_analysis_table(summary)
+            self.build_pie_chart_completed_tasks_by_direction(summary)
             self.build_gantt_with_critical_path()
-            self.fill_direction_quality_table()
+            self.fill_direction_quality_table(summary)
             self.calculate_and_display_project_deviation()
-            critical_data = self.calculate_critical_path()
-            self.labelProjectDuration.setText(str(critical_data["project_duration"]) + " дней")
+            self.update_risk_forecast()
+            self.labelProjectDuration.setText(str(self.schedule_graph.project_duration) + " дней")
         except Exception as e:
             print("")
 
     def update_progress_bar(self):
-        tasks = self.db_manager.get_all_tasks()
+        tasks = self.repository.tasks()
 
         total_tasks = len(tasks)
-        completed_tasks = sum(1 for task in tasks if task[8] and task[9])
+        completed_tasks = int(task_statistics.has_dates(tasks["actual_start"], tasks["actual_end"]).sum())
 
         completion_percentage = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
 
@@ -881,43 +975,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
     def calculate_average_durations(self):
         try:
-            tasks = self.db_manager.get_all_tasks()
-
-            total_planned_duration = 0
-            total_tasks_with_planned = 0
-
-            for task in tasks:
-                planned_start, planned_end = task[6], task[7]
-                if planned_start and planned_end:
-                    planned_start_dt = datetime.strptime(planned_start, "%Y-%m-%d")
-                    planned_end_dt = datetime.strptime(planned_end, "%Y-%m-%d")
-                    duration = (planned_end_dt - planned_start_dt).days + 1
-                    total_planned_duration += duration
-                    total_tasks_with_planned += 1
-
-            avg_planned_duration = (
-                total_planned_duration / total_tasks_with_planned if total_tasks_with_planned > 0 else 0
-            )
-            total_actual_duration = 0
-            total_tasks_with_actual = 0
-
-            for task in tasks:
-                actual_start, actual_end = task[8], task[9]
-                if actual_start and actual_end:
-                    actual_start_dt = datetime.strptime(actual_start, "%Y-%m-%d")
-                    actual_end_dt = datetime.strptime(actual_end, "%Y-%m-%d")
-                    duration = (actual_end_dt - actual_start_dt).days + 1
-                    total_actual_duration += duration
-                    total_tasks_with_actual += 1
-
-            avg_actual_duration = (
-                total_actual_duration / total_tasks_with_actual if total_tasks_with_actual > 0 else 0
-            )
-
-            return {
-                "avg_planned_duration": avg_planned_duration,
-                "avg_actual_duration": avg_actual_duration,
-            }
+            tasks = self.repository.tasks()
+            return task_statistics.average_durations(tasks)
 
         except Exception as e:
             print(f"Ошибка при расчете средних длительностей: {e}")
@@ -933,93 +992,38 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         )
 
     def update_task_quantity_label(self):
-        tasks = self.db_manager.get_all_tasks()
+        tasks = self.repository.tasks()
         total_tasks = len(tasks)
         self.labelQuantityTasks.setText(f"{total_tasks}")
 
     def update_employee_quantity_label(self):
-        query = "SELECT COUNT(*) FROM employees"
-        result = self.db_manager.execute_query(query)
-        employee_count = result[0][0]
+        employee_count = len(self.repository.employees())
         self.labelQuantityEmployees.setText(str(employee_count))
 
-    def calculate_critical_path(self):
+    def load_schedule_graph(self):
         try:
-            tasks = self.db_manager.get_all_tasks()
-
-            task_map = {}
-            for task in tasks:
-                task_id = task[0]
-                name = task[1]
-                duration = task[4]
-                dependencies = task[5]
-
-                task_map[task_id] = {
-                    "name": name,
-                    "duration": duration,
-                    "dependencies": [int(dep.strip()) for dep in dependencies.split(",")] if dependencies else [],
-                    "es": 0,
-                    "ef": 0,
-                    "ls": 0,
-                    "lf": 0,
-                    "slack": 0,
-                }
+            tasks = self.repository.tasks()
+            dependency_map = self.repository.dependency_map()
+            # Для выполненных задач в расчет идет фактическая длительность
+            self.schedule_graph.rebuild(
+                (task.id, task.name, task.actual_duration or task.duration, dependency_map.get(task.id, []))
+                for task in tasks
+            )
+        except Exception as e:
+            print(f"Ошибка при построении графа задач: {e}")
 
-            def calculate_es_ef(task_id):
-                task = task_map[task_id]
-                if task["es"] != 0 and task["ef"] != 0:
-                    return task["ef"]
-                if not task["dependencies"]:
-                    task["es"] = 0
-                    task["ef"] = task["duration"]
-                else:
-                    max_ef = max(calculate_es_ef(dep) for dep in task["dependencies"])
-                    task["es"] = max_ef
-                    task["ef"] = task["es"] + task["duration"]
-                return task["ef"]
-
-            for task_id in task_map:
-                calculate_es_ef(task_id)
-
-            project_duration = max(task["ef"] for task in task_map.values())
-            for task_id in reversed(list(task_map.keys())):
-                task = task_map[task_id]
-                if not any(task_id in task_map[tid]["dependencies"] for tid in task_map):
-                    task["lf"] = project_duration
-                    task["ls"] = task["lf"] - task["duration"]
-                else:
-                    min_ls = min(task_map[tid]["ls"] for tid in task_map if task_id in task_map[tid]["dependencies"])
-                    task["lf"] = min_ls
-                    task["ls"] = task["lf"] - task["duration"]
-
-            for task in task_map.values():
-                task["slack"] = task["ls"] - task["es"]
-
-            critical_path = [task_id for task_id, task in task_map.items() if task["slack"] == 0]
-            critical_path_names = [task_map[tid]["name"] for tid in critical_path]
-
-            return {
-                "critical_path": critical_path,
-                "critical_path_names": critical_path_names,
-                "project_duration": project_duration,
-                "tasks": task_map,
-            }
+    def calculate_critical_path(self):
+        try:
+            return self.schedule_graph.result()
 
         except Exception as e:
             print("")
             return {}
 
-    def build_bar_chart_quantity_employee(self):
+    def build_bar_chart_quantity_employee(self, summary):
         try:
-            query = """
-                SELECT direction, COUNT(*) AS count
-                FROM employees
-                GROUP BY direction
-            """
-            result = self.db_manager.execute_query(query)
-
-            directions = [row[0] for row in result]
-            counts = [row[1] for row in result]
+            directions = [direction or NO_DIRECTION for direction, data in summary.items() if data["employee_count"]]
+            counts = [data["employee_count"] for data in summary.values() if data["employee_count"]]
 
             fig = px.bar(
                 x=directions,
@@ -1055,45 +1059,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         except Exception as e:
             print("")
 
-    def build_bar_chart_duration(self):
+    def build_bar_chart_duration(self, summary):
         try:
-            query = """
-                SELECT 
-                    direction,
-                    planned_start,
-                    planned_end,
-                    actual_start,
-                    actual_end
-                FROM 
-                    tasks
-            """
-            result = self.db_manager.execute_query(query)
-
-            duration_by_direction = {}
-            for row in result:
-                direction = row[0]
-                planned_start = row[1]
-                planned_end = row[2]
-                actual_start = row[3]
-                actual_end = row[4]
-
-                if actual_start and actual_end:
-                    start_date = datetime.strptime(actual_start, "%Y-%m-%d")
-                    end_date = datetime.strptime(actual_end, "%Y-%m-%d")
-                    duration = (end_date - start_date).days + 1
-                elif planned_start and planned_end:
-                    start_date = datetime.strptime(planned_start, "%Y-%m-%d")
-                    end_date = datetime.strptime(planned_end, "%Y-%m-%d")
-                    duration = (end_date - start_date).days + 1
-                else:
-                    continue
-
-                if direction not in duration_by_direction:
-                    duration_by_direction[direction] = 0
-                duration_by_direction[direction] += duration
-
-            directions = list(duration_by_direction.keys())
-            durations = list(duration_by_direction.values())
+            # Для выполненных задач берется фактическая длительность, для остальных - плановая
+            directions = [direction or NO_DIRECTION for direction, data in summary.items() if data["task_count"]]
+            durations = [data["span_days_sum"] for data in summary.values() if data["task_count"]]
 
             fig = px.bar(
                 x=directions,
@@ -1129,68 +1099,34 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         except Exception as e:
             print("")
 
-    def fill_direction_analysis_table(self):
+    def fill_direction_analysis_table(self, summary):
         try:
-            query_directions = "SELECT DISTINCT direction FROM employees"
-            directions = self.db_manager.execute_query(query_directions)
-
+            # Направления, в которых есть сотрудники; длительность - фактическая, если задана, иначе плановая
             self.tableWidgetDirectionAnalysis.clearContents()
             self.tableWidgetDirectionAnalysis.setRowCount(0)
-            for row_number, direction_row in enumerate(directions):
-                direction = direction_row[0]
-
-                query_employees = "SELECT COUNT(*) FROM employees WHERE direction = ?"
-                employee_count = self.db_manager.execute_query(query_employees, (direction,))[0][0]
-                query_tasks = "SELECT COUNT(*) FROM tasks WHERE direction = ?"
-                task_count = self.db_manager.execute_query(query_tasks, (direction,))[0][0]
-
-                query_duration = """
-                    SELECT SUM(
-                        CASE 
-                            WHEN actual_duration IS NOT NULL THEN actual_duration
-                            ELSE duration
-                        END
-                    )
-                    FROM tasks
-                    WHERE direction = ?
-                """
-                total_duration = self.db_manager.execute_query(query_duration, (direction,))[0][0]
-                total_duration = total_duration if total_duration else 0  # Если нет задач, длительность = 0
-
+            rows = [(direction, data) for direction, data in summary.items() if data["employee_count"]]
+            for row_number, (direction, data) in enumerate(rows):
                 self.tableWidgetDirectionAnalysis.insertRow(row_number)
-                self.tableWidgetDirectionAnalysis.setItem(row_number, 0, QTableWidgetItem(direction))  # Специализация
-                self.tableWidgetDirectionAnalysis.setItem(row_number, 1, QTableWidgetItem(str(employee_count)))  # Количество сотрудников
-                self.tableWidgetDirectionAnalysis.setItem(row_number, 2, QTableWidgetItem(str(task_count)))  # Количество заданий
-                self.tableWidgetDirectionAnalysis.setItem(row_number, 3, QTableWidgetItem(str(total_duration)))  # Общая длительность
-                self.tableWidgetDirectionAnalysis.setColumnWidth(0, 100)
-                self.tableWidgetDirectionAnalysis.setColumnWidth(1, 145)
-                self.tableWidgetDirectionAnalysis.setColumnWidth(2, 120)
-                self.tableWidgetDirectionAnalysis.setColumnWidth(3, 200)
-                centered_columns = [0, 1, 2, 3]
-                for row in range(self.tableWidgetDirectionAnalysis.rowCount()):
-                    for col in centered_columns:
-                        item = self.tableWidgetDirectionAnalysis.item(row, col)
-                        item.setTextAlignment(Qt.AlignCenter)
+                self.tableWidgetDirectionAnalysis.setItem(row_number, 0, QTableWidgetItem(direction or NO_DIRECTION))  # Специализация
+                self.tableWidgetDirectionAnalysis.setItem(row_number, 1, QTableWidgetItem(str(data["employee_count"])))  # Количество сотрудников
+                self.tableWidgetDirectionAnalysis.setItem(row_number, 2, QTableWidgetItem(str(data["task_count"])))  # Количество заданий
+                self.tableWidgetDirectionAnalysis.setItem(row_number, 3, QTableWidgetItem(str(data["effective_duration_sum"])))  # Общая длительность
+            self.tableWidgetDirectionAnalysis.setColumnWidth(0, 100)
+            self.tableWidgetDirectionAnalysis.setColumnWidth(1, 145)
+            self.tableWidgetDirectionAnalysis.setColumnWidth(2, 120)
+            self.tableWidgetDirectionAnalysis.setColumnWidth(3, 200)
+            centered_columns = [0, 1, 2, 3]
+            for row in range(self.tableWidgetDirectionAnalysis.rowCount()):
+                for col in centered_columns:
+                    item = self.tableWidgetDirectionAnalysis.item(row, col)
+                    item.setTextAlignment(Qt.AlignCenter)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось заполнить таблицу анализа направлений: {e}")
 
-    def build_pie_chart_completed_tasks_by_direction(self):
+    def build_pie_chart_completed_tasks_by_direction(self, summary):
         try:
-            query = """
-                SELECT 
-                    direction, 
-                    COUNT(*) AS completed_count
-                FROM 
-                    tasks
-                WHERE 
-                    actual_start IS NOT NULL AND actual_end IS NOT NULL
-                GROUP BY 
-                    direction
-            """
-            result = self.db_manager.execute_query(query)
-
-            directions = [row[0] for row in result]
-            completed_counts = [row[1] for row in result]
+            directions = [direction or NO_DIRECTION for direction, data in summary.items() if data["completed_count"]]
+            completed_counts = [data["completed_count"] for data in summary.values() if data["completed_count"]]
 
             fig = px.pie(
                 values=completed_counts,
@@ -1214,42 +1150,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         except Exception as e:
             print("")
 
-    def fill_direction_quality_table(self):
+    def fill_direction_quality_table(self, summary):
         try:
-            tasks = self.db_manager.get_all_tasks()
-            direction_data = {}
-
-            for task in tasks:
-                direction = task[3]
-                planned_end = task[7]
-                actual_end = task[9]
-
-                if not planned_end or not actual_end:
-                    continue
-
-                planned_end_dt = datetime.strptime(planned_end, "%Y-%m-%d")
-                actual_end_dt = datetime.strptime(actual_end, "%Y-%m-%d")
-                deviation = (actual_end_dt - planned_end_dt).days
-
-                if direction not in direction_data:
-                    direction_data[direction] = {
-                        "total_completed": 0,
-                        "overdue_count": 0,
-                        "total_deviation": 0,
-                    }
-
-                direction_data[direction]["total_completed"] += 1
-                if actual_end_dt > planned_end_dt:
-                    direction_data[direction]["overdue_count"] += 1
-                direction_data[direction]["total_deviation"] += deviation
+            # Учитываются задачи с плановой и фактической датами окончания
+            direction_data = {direction: data for direction, data in summary.items() if data["deviation_count"]}
 
             self.tableWidgetDirectionQuality.clearContents()
             self.tableWidgetDirectionQuality.setRowCount(0)
 
             for row_number, (direction, data) in enumerate(direction_data.items()):
-                total_completed = data["total_completed"]
+                total_completed = data["deviation_count"]
                 overdue_count = data["overdue_count"]
-                total_deviation = data["total_deviation"]
+                total_deviation = data["deviation_sum"]
 
                 overdue_percentage = (
                     (overdue_count / total_completed) * 100 if total_completed > 0 else 0
@@ -1258,7 +1170,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                     total_deviation / total_completed if total_completed > 0 else 0
                 )
                 self.tableWidgetDirectionQuality.insertRow(row_number)
-                self.tableWidgetDirectionQuality.setItem(row_number, 0, QTableWidgetItem(direction))
+                self.tableWidgetDirectionQuality.setItem(row_number, 0, QTableWidgetItem(direction or NO_DIRECTION))
                 self.tableWidgetDirectionQuality.setItem(row_number, 1, QTableWidgetItem(f"{overdue_percentage:.2f}%"))
                 self.tableWidgetDirectionQuality.setItem(row_number, 2, QTableWidgetItem(f"{average_deviation:.2f} дней"))
 
@@ -1277,24 +1189,72 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
     def calculate_and_display_project_deviation(self):
         try:
-            tasks = self.db_manager.get_all_tasks()
-            total_deviation = 0
-            completed_tasks_count = 0
-            for task in tasks:
-                planned_duration = task[4]
-                actual_duration = task[10]
-                if not actual_duration:
-                    continue
-                deviation = actual_duration - planned_duration
-                total_deviation += deviation
-                completed_tasks_count += 1
-            average_deviation = total_deviation / completed_tasks_count if completed_tasks_count > 0 else 0
+            tasks = self.repository.tasks()
+            average_deviation = task_statistics.average_duration_deviation(tasks)
             self.labelProjectDeviation.setText(f"{average_deviation:.2f} дней")
 
         except Exception as e:
             print(f"Ошибка при расчете среднего отклонения: {e}")
             self.labelProjectDeviation.setText("Не удалось рассчитать")
 
+    def update_risk_forecast(self):
+        # Задачи берутся из кэша, в потоке БД читаются только дата начала и календарь проекта
+        self.risk_generation += 1
+        self.risk_tasks = self.repository.tasks()
+        self.labelRiskCompletion.setText("Расчет...")
+        if not self.risk_running:
+            self.start_risk_forecast()
+
+    def start_risk_forecast(self):
+        self.risk_running = True
+        generation = self.risk_generation
+        tasks = self.risk_tasks
+
+        def simulate(project_calendar):
+            future = self.risk_executor.submit(
+                analyze_task_table, tasks, *project_calendar, iterations=RISK_ITERATIONS, seed=RISK_SEED
+            )
+            future.add_done_callback(lambda future: self.risk_forecast_finished.emit(generation, future))
+
+        def fail(error):
+            failed = Future()
+            failed.set_exception(error)
+            self.on_risk_forecast_finished(generation, failed)
+
+        self.async_db.submit(self.db_manager.get_project_calendar, on_result=simulate, on_error=fail)
+
+    def on_risk_forecast_finished(self, generation, future):
+        self.risk_running = False
+        # Результат по устаревшим данным не показывается, вместо него считается последний запрос
+        if generation != self.risk_generation:
+            self.start_risk_forecast()
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Ошибка при моделировании сроков: {e}")
+            self.labelRiskCompletion.setText("Не удалось рассчитать")
+            self.labelRiskCritical.setText("")
+            return
+        self.show_risk_forecast(result)
+
+    def show_risk_forecast(self, result):
+        if not result["criticality"]:
+            self.labelRiskCompletion.setText("Нет задач")
+            self.labelRiskCritical.setText("")
+            return
+        self.labelRiskCompletion.setText(" / ".join(
+            completion_date.strftime("%d.%m.%Y") for completion_date in result["completion_dates"].values()
+        ))
+        critical_tasks = most_critical_tasks(result["criticality"], RISK_CRITICAL_TASKS)
+        self.labelRiskCritical.setText("Чаще на критическом пути: " + ", ".join(
+            f"{task_id} ({share:.0%})" for task_id, share in critical_tasks
+        ))
+        names = dict(zip(self.risk_tasks["id"].tolist(), self.risk_tasks["name"]))
+        self.labelRiskCritical.setToolTip("\n".join(
+            f"{task_id}: {names.get(task_id, '')} - {share:.0%}" for task_id, share in critical_tasks
+        ))
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon("logo.png"))
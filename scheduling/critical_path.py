@@ -0,0 +1,149 @@
+from collections import deque
+
+
+def parse_dependencies(dependencies):
+    if not dependencies:
+        return []
+    return [int(dep.strip()) for dep in str(dependencies).split(",") if dep.strip()]
+
+
+def topological_order(task_ids, predecessors):
+    successors = {task_id: [] for task_id in task_ids}
+    in_degree = dict.fromkeys(task_ids, 0)
+    for task_id in task_ids:
+        for dep_id in predecessors[task_id]:
+            # Ссылки на удаленные задачи игнорируются, как и при расчете плановых дат
+            if dep_id in successors:
+                successors[dep_id].append(task_id)
+                in_degree[task_id] += 1
+
+    queue = deque(task_id for task_id in task_ids if in_degree[task_id] == 0)
+    order = []
+    while queue:
+        task_id = queue.popleft()
+        order.append(task_id)
+        for succ_id in successors[task_id]:
+            in_degree[succ_id] -= 1
+            if in_degree[succ_id] == 0:
+                queue.append(succ_id)
+
+    if len(order) != len(in_degree):
+        raise Exception("Обнаружена циклическая зависимость между задачами!")
+    return order, successors
+
+
+def acyclic_edges(predecessors, edges):
+    # predecessors: {task_id: [dep_id, ...]} без циклов; edges - новые связи (predecessor_id, successor_id).
+    # Связи принимаются по порядку, кроме тех, что замкнули бы цикл. Возвращает (принятые, пропущенные)
+    combined = {task_id: list(deps) for task_id, deps in predecessors.items()}
+    for predecessor_id, successor_id in edges:
+        combined.setdefault(successor_id, []).append(predecessor_id)
+    successors = {}
+    in_degree = {}
+    for task_id, deps in combined.items():
+        in_degree[task_id] = in_degree.get(task_id, 0) + len(deps)
+        for dep_id in deps:
+            successors.setdefault(dep_id, []).append(task_id)
+            in_degree.setdefault(dep_id, 0)
+
+    # После сортировки Кана остаются задачи на циклах и после них; только между ними связь может замкнуть цикл
+    queue = deque(task_id for task_id, degree in in_degree.items() if degree == 0)
+    while queue:
+        task_id = queue.popleft()
+        del in_degree[task_id]
+        for succ_id in successors.get(task_id, ()):
+            in_degree[succ_id] -= 1
+            if in_degree[succ_id] == 0:
+                queue.append(succ_id)
+    if not in_degree:
+        return list(edges), []
+
+    residual = {task_id: [] for task_id in in_degree}
+    for task_id in residual:
+        for dep_id in predecessors.get(task_id, ()):
+            if dep_id in residual:
+                residual[dep_id].append(task_id)
+    accepted = []
+    skipped = []
+    for predecessor_id, successor_id in edges:
+        if predecessor_id in residual and successor_id in residual:
+            if _reachable(residual, successor_id, predecessor_id):
+                skipped.append((predecessor_id, successor_id))
+                continue
+            residual[predecessor_id].append(successor_id)
+        accepted.append((predecessor_id, successor_id))
+    return accepted, skipped
+
+
+def _reachable(successors, start, target):
+    seen = {start}
+    stack = [start]
+    while stack:
+        task_id = stack.pop()
+        if task_id == target:
+            return True
+        for succ_id in successors[task_id]:
+            if succ_id not in seen:
+                seen.add(succ_id)
+                stack.append(succ_id)
+    return False
+
+
+def calculate_critical_path(tasks):
+    names = {}
+    durations = {}
+    predecessors = {}
+    for task_id, name, duration, dependencies in tasks:
+        names[task_id] = name
+        durations[task_id] = duration
+        predecessors[task_id] = dependencies
+
+    task_ids = list(names)
+    order, successors = topological_order(task_ids, predecessors)
+
+    es = {}
+    ef = {}
+    for task_id in order:
+        start = 0
+        for dep_id in predecessors[task_id]:
+            dep_ef = ef.get(dep_id)
+            if dep_ef is not None and dep_ef > start:
+                start = dep_ef
+        es[task_id] = start
+        ef[task_id] = start + durations[task_id]
+
+    project_duration = max(ef.values(), default=0)
+
+    ls = {}
+    lf = {}
+    for task_id in reversed(order):
+        finish = project_duration
+        for succ_id in successors[task_id]:
+            if ls[succ_id] < finish:
+                finish = ls[succ_id]
+        lf[task_id] = finish
+        ls[task_id] = finish - durations[task_id]
+
+    task_map = {}
+    critical_path = []
+    for task_id in task_ids:
+        slack = ls[task_id] - es[task_id]
+        task_map[task_id] = {
+            "name": names[task_id],
+            "duration": durations[task_id],
+            "dependencies": predecessors[task_id],
+            "es": es[task_id],
+            "ef": ef[task_id],
+            "ls": ls[task_id],
+            "lf": lf[task_id],
+            "slack": slack,
+        }
+        if slack == 0:
+            critical_path.append(task_id)
+
+    return {
+        "critical_path": critical_path,
+        "critical_path_names": [names[task_id] for task_id in critical_path],
+        "project_duration": project_duration,
+        "tasks": task_map,
+    }
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from scheduling.critical_path import topological_order
+
+
+def calculate_task_dates(duration, dependency_ends, project_start, calendar):
+    planned_start = calendar.next_working_day(project_start)
+    if dependency_ends:
+        latest_dependency_end = max(project_start, max(dependency_ends))
+        planned_start = calendar.next_working_day(latest_dependency_end + timedelta(days=1))
+    planned_end = calendar.finish_date(planned_start, duration)
+    return planned_start, planned_end
+
+
+def reflow_planned_dates(tasks, changed_ids, project_start, calendar):
+    # tasks: {task_id: (duration, dependencies, planned_start, planned_end, assigned_employee_id)}
+    # Возвращает только задачи, у которых изменились плановые даты, в топологическом порядке
+    predecessors = {task_id: task[1] for task_id, task in tasks.items()}
+    order, successors = topological_order(list(tasks), predecessors)
+
+    ends = {}
+    for task_id, task in tasks.items():
+        ends[task_id] = date.fromisoformat(task[3]) if task[3] else None
+
+    dirty = {task_id for task_id in changed_ids if task_id in tasks}
+    changes = []
+    for task_id in order:
+        if task_id not in dirty:
+            continue
+        duration, dependencies, old_start, old_end, employee_id = tasks[task_id]
+        dependency_ends = [ends[dep_id] for dep_id in dependencies if ends.get(dep_id)]
+        planned_start, planned_end = calculate_task_dates(
+            duration, dependency_ends, project_start, calendar.for_employee(employee_id)
+        )
+        planned_start_str = planned_start.isoformat()
+        planned_end_str = planned_end.isoformat()
+        if planned_start_str == old_start and planned_end_str == old_end:
+            continue
+        ends[task_id] = planned_end
+        changes.append((task_id, planned_start_str, planned_end_str))
+        dirty.update(successors[task_id])
+    return changes
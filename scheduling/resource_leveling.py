@@ -0,0 +1,96 @@
+import heapq
+from datetime import date, timedelta
+
+from scheduling.critical_path import calculate_critical_path, topological_order
+
+
+def level_resources(tasks, project_start, calendar):
+    # tasks: iterable of (task_id, duration, dependencies, employee_id)
+    # Параллельная схема: в каждый рабочий день сотрудника свободный сотрудник берет готовую задачу
+    # с наименьшим резервом времени по методу критического пути. Время - номер дня (date.toordinal()),
+    # длительность задачи отсчитывается в рабочих днях календаря ее сотрудника (calendar.for_employee)
+    durations = {}
+    predecessors = {}
+    employees = {}
+    for task_id, duration, dependencies, employee_id in tasks:
+        durations[task_id] = duration
+        predecessors[task_id] = dependencies
+        employees[task_id] = employee_id or None
+
+    order, successors = topological_order(list(durations), predecessors)
+    position = {task_id: index for index, task_id in enumerate(order)}
+    cpm = calculate_critical_path(
+        (task_id, None, durations[task_id], predecessors[task_id]) for task_id in order
+    )["tasks"]
+
+    remaining = {task_id: 0 for task_id in order}
+    for task_id in order:
+        for succ_id in successors[task_id]:
+            remaining[succ_id] += 1
+
+    # События: (день, вид, позиция, задача или сотрудник); вид 0 - завершение задачи (день после
+    # ее окончания), 1 - готовность задачи к началу, 2 - начало рабочего дня занятого ожиданием сотрудника
+    start_day = project_start.toordinal()
+    events = [(start_day, 1, position[task_id], task_id) for task_id in order if remaining[task_id] == 0]
+    heapq.heapify(events)
+    queues = {}
+    busy_until = {}
+    schedule = {}
+
+    def start_task(task_id, day):
+        start = date.fromordinal(day)
+        end = calendar.for_employee(employees[task_id]).finish_date(start, durations[task_id])
+        schedule[task_id] = (start, end)
+        free_day = max(end.toordinal() + 1, day)
+        heapq.heappush(events, (free_day, 0, position[task_id], task_id))
+        return free_day
+
+    while events:
+        current_day = events[0][0]
+        waiting = set()
+        while events and events[0][0] == current_day:
+            _, kind, _, item_id = heapq.heappop(events)
+            if kind == 2:
+                waiting.add(item_id)
+                continue
+            employee_id = employees[item_id]
+            if kind == 0:
+                for succ_id in successors[item_id]:
+                    remaining[succ_id] -= 1
+                    if remaining[succ_id] == 0:
+                        heapq.heappush(events, (current_day, 1, position[succ_id], succ_id))
+                if employee_id is not None:
+                    waiting.add(employee_id)
+            elif employee_id is None:
+                start_task(item_id, calendar.next_working_day(date.fromordinal(current_day)).toordinal())
+            else:
+                task = cpm[item_id]
+                heapq.heappush(
+                    queues.setdefault(employee_id, []),
+                    (task["slack"], task["es"], position[item_id], item_id)
+                )
+                waiting.add(employee_id)
+
+        for employee_id in waiting:
+            queue = queues.get(employee_id)
+            if not queue or busy_until.get(employee_id, start_day) > current_day:
+                continue
+            # В нерабочий день сотрудника выбор откладывается до его рабочего дня:
+            # к нему могут стать готовыми задачи с меньшим резервом
+            working_day = calendar.for_employee(employee_id).next_working_day(date.fromordinal(current_day))
+            if working_day.toordinal() > current_day:
+                heapq.heappush(events, (working_day.toordinal(), 2, -1, employee_id))
+                continue
+            task_id = heapq.heappop(queue)[3]
+            busy_until[employee_id] = start_task(task_id, current_day)
+
+    project_end = max((end for _, end in schedule.values()), default=None)
+    project_duration = 0
+    if project_end is not None:
+        first_day = calendar.next_working_day(project_start)
+        project_duration = max(calendar.working_days_between(first_day, project_end + timedelta(days=1)), 0)
+    return {
+        "schedule": schedule,
+        "project_end": project_end,
+        "project_duration": project_duration,
+    }
@@ -0,0 +1,175 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from scheduling.critical_path import topological_order
+
+PERCENTILES = (50, 80, 95)
+
+
+def fit_deviation_distributions(history, min_samples=3):
+    # history: iterable of (direction, duration, actual_duration)
+    # Отклонение моделируется логнормальным множителем actual / planned отдельно по каждому направлению
+    log_ratios = {}
+    for direction, duration, actual_duration in history:
+        if duration and actual_duration and duration > 0 and actual_duration > 0:
+            log_ratios.setdefault(direction, []).append(math.log(actual_duration / duration))
+
+    all_ratios = [ratio for ratios in log_ratios.values() for ratio in ratios]
+    if len(all_ratios) >= min_samples:
+        default = (float(np.mean(all_ratios)), float(np.std(all_ratios, ddof=1)))
+    else:
+        default = (0.0, 0.0)
+
+    distributions = {None: default}
+    for direction, ratios in log_ratios.items():
+        if len(ratios) >= min_samples:
+            distributions[direction] = (float(np.mean(ratios)), float(np.std(ratios, ddof=1)))
+    return distributions
+
+
+def build_simulation_model(tasks, distributions):
+    # tasks: iterable of (task_id, direction, duration, actual_duration, dependencies)
+    task_ids = []
+    predecessors = {}
+    base_durations = {}
+    mu = {}
+    sigma = {}
+    for task_id, direction, duration, actual_duration, dependencies in tasks:
+        task_ids.append(task_id)
+        predecessors[task_id] = dependencies
+        if actual_duration is not None and not np.isnan(actual_duration) and actual_duration != 0:
+            # Для выполненных задач длительность известна и не разыгрывается (NULL в TaskTable - NaN)
+            base_durations[task_id] = actual_duration
+            mu[task_id], sigma[task_id] = 0.0, 0.0
+        else:
+            base_durations[task_id] = duration
+            mu[task_id], sigma[task_id] = distributions.get(direction, distributions[None])
+
+    order, successors = topological_order(task_ids, predecessors)
+    index = {task_id: position for position, task_id in enumerate(order)}
+    count = len(order)
+
+    levels = [0] * count
+    for task_id in order:
+        for succ_id in successors[task_id]:
+            levels[index[succ_id]] = max(levels[index[succ_id]], levels[index[task_id]] + 1)
+    levels = np.array(levels, dtype=np.int64)
+
+    forward = []
+    backward = []
+    for level in range(int(levels.max()) + 1 if count else 0):
+        members = np.flatnonzero(levels == level)
+        forward.append((members, _padded([
+            [index[dep_id] for dep_id in predecessors[order[member]] if dep_id in index] for member in members
+        ], count)))
+        backward.append((members, _padded([
+            [index[succ_id] for succ_id in successors[order[member]]] for member in members
+        ], count)))
+
+    return {
+        "task_ids": order,
+        "base_durations": np.array([base_durations[task_id] for task_id in order], dtype=np.float64),
+        "mu": np.array([mu[task_id] for task_id in order], dtype=np.float64),
+        "sigma": np.array([sigma[task_id] for task_id in order], dtype=np.float64),
+        "forward": forward,
+        "backward": backward[::-1],
+    }
+
+
+def simulate_chunk(model, iterations, seed):
+    count = len(model["task_ids"])
+    rng = np.random.default_rng(seed)
+    durations = rng.standard_normal((iterations, count))
+    durations *= model["sigma"]
+    durations += model["mu"]
+    np.exp(durations, out=durations)
+    durations *= model["base_durations"]
+
+    # Последний столбец - фиктивная задача: для прямого прохода ее окончание 0,
+    # для обратного - ее позднее начало равно длительности проекта в данной реализации
+    finish = np.zeros((iterations, count + 1))
+    start = np.zeros((iterations, count))
+    for members, predecessors in model["forward"]:
+        start[:, members] = finish[:, predecessors].max(axis=2)
+        finish[:, members] = start[:, members] + durations[:, members]
+
+    project_durations = finish[:, :count].max(axis=1) if count else np.zeros(iterations)
+    late_start = np.empty((iterations, count + 1))
+    late_start[:, count] = project_durations
+    for members, successors in model["backward"]:
+        late_start[:, members] = late_start[:, successors].min(axis=2) - durations[:, members]
+
+    slack = late_start[:, :count] - start
+    critical_counts = (slack <= 1e-9 * np.maximum(project_durations, 1)[:, None]).sum(axis=0)
+    return project_durations, critical_counts
+
+
+def run_risk_analysis(tasks, history, iterations=10000, chunk_size=1000, workers=None, seed=None):
+    if iterations < 1:
+        raise Exception("Число прогонов моделирования должно быть не меньше 1!")
+    model = build_simulation_model(tasks, fit_deviation_distributions(history))
+    chunks = [chunk_size] * (iterations // chunk_size)
+    if iterations % chunk_size:
+        chunks.append(iterations % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(simulate_chunk, [model] * len(chunks), chunks, seeds))
+    else:
+        results = [simulate_chunk(model, size, chunk_seed) for size, chunk_seed in zip(chunks, seeds)]
+
+    project_durations = np.concatenate([result[0] for result in results])
+    critical_counts = sum(result[1] for result in results)
+    return {
+        "iterations": iterations,
+        "percentiles": {
+            percentile: float(np.percentile(project_durations, percentile)) for percentile in PERCENTILES
+        },
+        "criticality": {
+            task_id: float(critical_counts[position]) / iterations
+            for position, task_id in enumerate(model["task_ids"])
+        },
+    }
+
+
+def analyze_task_table(tasks, project_start, calendar, iterations=10000, workers=None, seed=None):
+    # tasks: TaskTable. Отклонения длительностей по направлениям оцениваются по выполненным задачам
+    # (actual_duration), у остальных NaN. К результату run_risk_analysis добавляются даты завершения
+    # проекта для процентилей: {"completion_dates": {50: date, ...}, ...}
+    dependency_map = tasks.dependency_map()
+    task_ids = tasks["id"].tolist()
+    directions = tasks["direction"].tolist()
+    durations = tasks["duration"].tolist()
+    actual_durations = tasks["actual_duration"].tolist()
+    result = run_risk_analysis(
+        zip(task_ids, directions, durations, actual_durations,
+            (dependency_map.get(task_id, []) for task_id in task_ids)),
+        zip(directions, durations, actual_durations),
+        iterations=iterations, workers=workers, seed=seed,
+    )
+    result["completion_dates"] = completion_dates(result["percentiles"], project_start, calendar)
+    return result
+
+
+def most_critical_tasks(criticality, count):
+    # [(task_id, доля прогонов на критическом пути)] по убыванию доли
+    return sorted(criticality.items(), key=lambda item: (-item[1], item[0]))[:count]
+
+
+def completion_dates(percentiles, project_start, calendar):
+    first_day = calendar.next_working_day(project_start)
+    return {
+        percentile: calendar.finish_date(first_day, max(math.ceil(duration - 1e-9), 1))
+        for percentile, duration in percentiles.items()
+    }
+
+
+def _padded(rows, sentinel):
+    width = max((len(row) for row in rows), default=0) or 1
+    matrix = np.full((len(rows), width), sentinel, dtype=np.int64)
+    for position, row in enumerate(rows):
+        matrix[position, :len(row)] = row
+    return matrix
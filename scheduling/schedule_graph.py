@@ -0,0 +1,259 @@
+import heapq
+
+from scheduling.critical_path import topological_order
+
+
+class ScheduleGraph:
+    # Вместо LS/LF хранится tail - длина самого длинного пути от начала задачи до конца проекта:
+    # LS = T - tail, LF = LS + duration, slack = T - es - tail. Так изменение длительности
+    # проекта не требует пересчета LS/LF всех задач, а tail зависит только от последователей.
+    def __init__(self, tasks=()):
+        self.names = {}
+        self.durations = {}
+        self.predecessors = {}
+        self.successors = {}
+        self.position = {}
+        self.es = {}
+        self.ef = {}
+        self.tail = {}
+        self.project_duration = 0
+        self._next_position = 0
+        self._length = {}
+        self._by_length = {}
+        self._length_heap = []
+        self.rebuild(tasks)
+
+    def rebuild(self, tasks):
+        self.names.clear()
+        self.durations.clear()
+        self.predecessors.clear()
+        for task_id, name, duration, dependencies in tasks:
+            self.names[task_id] = name
+            self.durations[task_id] = duration
+            self.predecessors[task_id] = list(dependencies)
+
+        order, successors = topological_order(list(self.names), self.predecessors)
+        for task_id, deps in self.predecessors.items():
+            deps[:] = [dep_id for dep_id in deps if dep_id in self.names]
+        self.successors = successors
+        self.position = {task_id: index for index, task_id in enumerate(order)}
+        self._next_position = len(order)
+
+        self.es.clear()
+        self.ef.clear()
+        for task_id in order:
+            start = max((self.ef[dep_id] for dep_id in self.predecessors[task_id]), default=0)
+            self.es[task_id] = start
+            self.ef[task_id] = start + self.durations[task_id]
+
+        self.tail.clear()
+        for task_id in reversed(order):
+            self.tail[task_id] = self.durations[task_id] + max(
+                (self.tail[succ_id] for succ_id in self.successors[task_id]), default=0
+            )
+
+        self._length.clear()
+        self._by_length.clear()
+        for task_id in order:
+            self._set_length(task_id)
+        self._length_heap = [-length for length in self._by_length]
+        heapq.heapify(self._length_heap)
+        self.project_duration = self._max_length()
+
+    def add_task(self, task_id, name, duration, dependencies=()):
+        if task_id in self.names:
+            raise Exception(f"Задача с ID {task_id} уже есть в графе!")
+        dependencies = [dep_id for dep_id in dependencies if dep_id in self.names]
+        before = self.critical_tasks()
+
+        self.names[task_id] = name
+        self.durations[task_id] = duration
+        self.predecessors[task_id] = dependencies
+        self.successors[task_id] = []
+        self.position[task_id] = self._next_position
+        self._next_position += 1
+        for dep_id in dependencies:
+            self.successors[dep_id].append(task_id)
+        self.es[task_id] = 0
+        self.ef[task_id] = 0
+        self.tail[task_id] = 0
+
+        return self._propagate([task_id], [task_id], before)
+
+    def remove_task(self, task_id):
+        if task_id not in self.names:
+            return set()
+        before = self.critical_tasks()
+
+        predecessors = self.predecessors.pop(task_id)
+        successors = self.successors.pop(task_id)
+        for dep_id in predecessors:
+            self.successors[dep_id].remove(task_id)
+        for succ_id in successors:
+            self.predecessors[succ_id].remove(task_id)
+        self._discard_length(task_id)
+        for mapping in (self.names, self.durations, self.position, self.es, self.ef, self.tail):
+            del mapping[task_id]
+
+        before.discard(task_id)
+        return self._propagate(successors, predecessors, before)
+
+    def update_task(self, task_id, duration=None, dependencies=None):
+        if task_id not in self.names:
+            raise Exception(f"Задача с ID {task_id} не найдена!")
+        before = self.critical_tasks()
+        backward = [task_id]
+
+        if duration is not None:
+            self.durations[task_id] = duration
+
+        if dependencies is not None:
+            dependencies = [dep_id for dep_id in dict.fromkeys(dependencies) if dep_id in self.names]
+            old_dependencies = self.predecessors[task_id]
+            added = [dep_id for dep_id in dependencies if dep_id not in old_dependencies]
+            self._reorder_for(task_id, added)
+            for dep_id in old_dependencies:
+                if dep_id not in dependencies:
+                    self.successors[dep_id].remove(task_id)
+                    backward.append(dep_id)
+            for dep_id in added:
+                self.successors[dep_id].append(task_id)
+            self.predecessors[task_id] = dependencies
+
+        return self._propagate([task_id], backward, before)
+
+    def critical_tasks(self):
+        return set(self._by_length.get(self.project_duration, ()))
+
+    def critical_path(self):
+        return sorted(self.critical_tasks(), key=self.position.__getitem__)
+
+    def slack(self, task_id):
+        return self.project_duration - self.es[task_id] - self.tail[task_id]
+
+    def result(self):
+        task_map = {}
+        for task_id in sorted(self.names, key=self.position.__getitem__):
+            ls = self.project_duration - self.tail[task_id]
+            task_map[task_id] = {
+                "name": self.names[task_id],
+                "duration": self.durations[task_id],
+                "dependencies": self.predecessors[task_id],
+                "es": self.es[task_id],
+                "ef": self.ef[task_id],
+                "ls": ls,
+                "lf": ls + self.durations[task_id],
+                "slack": ls - self.es[task_id],
+            }
+        critical_path = self.critical_path()
+        return {
+            "critical_path": critical_path,
+            "critical_path_names": [self.names[task_id] for task_id in critical_path],
+            "project_duration": self.project_duration,
+            "tasks": task_map,
+        }
+
+    def _propagate(self, forward_ids, backward_ids, before):
+        touched = set()
+
+        # Прямой проход только по нисходящему конусу, в топологическом порядке
+        heap = [(self.position[task_id], task_id) for task_id in set(forward_ids)]
+        heapq.heapify(heap)
+        forced = set(forward_ids)
+        visited = set()
+        while heap:
+            _, task_id = heapq.heappop(heap)
+            if task_id in visited:
+                continue
+            visited.add(task_id)
+            start = max((self.ef[dep_id] for dep_id in self.predecessors[task_id]), default=0)
+            finish = start + self.durations[task_id]
+            if task_id not in forced and start == self.es[task_id]:
+                continue
+            self.es[task_id] = start
+            self.ef[task_id] = finish
+            touched.add(task_id)
+            for succ_id in self.successors[task_id]:
+                heapq.heappush(heap, (self.position[succ_id], succ_id))
+
+        # Обратный проход только по восходящему конусу, в обратном топологическом порядке
+        heap = [(-self.position[task_id], task_id) for task_id in set(backward_ids)]
+        heapq.heapify(heap)
+        forced = set(backward_ids)
+        visited = set()
+        while heap:
+            _, task_id = heapq.heappop(heap)
+            if task_id in visited:
+                continue
+            visited.add(task_id)
+            tail = self.durations[task_id] + max(
+                (self.tail[succ_id] for succ_id in self.successors[task_id]), default=0
+            )
+            if task_id not in forced and tail == self.tail[task_id]:
+                continue
+            self.tail[task_id] = tail
+            touched.add(task_id)
+            for dep_id in self.predecessors[task_id]:
+                heapq.heappush(heap, (-self.position[dep_id], dep_id))
+
+        for task_id in touched:
+            self._discard_length(task_id)
+            self._set_length(task_id)
+        self.project_duration = self._max_length()
+        return before ^ self.critical_tasks()
+
+    def _set_length(self, task_id):
+        length = self.es[task_id] + self.tail[task_id]
+        self._length[task_id] = length
+        bucket = self._by_length.get(length)
+        if bucket is None:
+            bucket = self._by_length[length] = set()
+            heapq.heappush(self._length_heap, -length)
+        bucket.add(task_id)
+
+    def _discard_length(self, task_id):
+        length = self._length.pop(task_id, None)
+        if length is None:
+            return
+        bucket = self._by_length[length]
+        bucket.discard(task_id)
+        if not bucket:
+            del self._by_length[length]
+
+    def _max_length(self):
+        while self._length_heap and -self._length_heap[0] not in self._by_length:
+            heapq.heappop(self._length_heap)
+        return -self._length_heap[0] if self._length_heap else 0
+
+    def _reorder_for(self, task_id, new_dependencies):
+        # Локальное восстановление топологического порядка (Pearce-Kelly):
+        # затрагиваются только задачи между task_id и новой зависимостью
+        upper = max((self.position[dep_id] for dep_id in new_dependencies), default=-1)
+        lower = self.position[task_id]
+        if upper < lower:
+            return
+
+        forward = set()
+        stack = [task_id]
+        while stack:
+            node = stack.pop()
+            if node in forward:
+                continue
+            if node in new_dependencies:
+                raise Exception("Обнаружена циклическая зависимость между задачами!")
+            forward.add(node)
+            stack.extend(succ_id for succ_id in self.successors[node] if self.position[succ_id] <= upper)
+
+        backward = set()
+        stack = [dep_id for dep_id in new_dependencies if self.position[dep_id] > lower]
+        while stack:
+            node = stack.pop()
+            if node in backward:
+                continue
+            backward.add(node)
+            stack.extend(dep_id for dep_id in self.predecessors[node] if self.position[dep_id] >= lower)
+
+        ordered = sorted(backward, key=self.position.__getitem__) + sorted(forward, key=self.position.__getitem__)
+        positions = sorted(self.position[node] for node in ordered)
+        for node, position in zip(ordered, positions):
+            self.position[node] = position
@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta
+
+DEFAULT_WORKDAYS = (0, 1, 2, 3, 4)
+
+
+def to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+class WorkCalendar:
+    # Таблицы строятся один раз на диапазон дат: ordinals[i] - число рабочих дней до дня origin + i,
+    # working[k] - смещение k-го рабочего дня. Сдвиг на N рабочих дней - два обращения к спискам.
+    def __init__(self, workdays=DEFAULT_WORKDAYS, holidays=(), employee_exceptions=None, overrides=None, origin=None):
+        self.workdays = frozenset(workdays)
+        if not self.workdays:
+            raise Exception("В календаре должен быть хотя бы один рабочий день недели!")
+        self.holidays = frozenset(to_date(day) for day in holidays)
+        self.employee_exceptions = employee_exceptions or {}
+        self.overrides = overrides or {}
+        self._employee_calendars = {}
+        self._build(origin or date.today().replace(month=1, day=1), 4 * 366)
+
+    def for_employee(self, employee_id):
+        exceptions = self.employee_exceptions.get(employee_id)
+        if not exceptions:
+            return self
+        calendar = self._employee_calendars.get(employee_id)
+        if calendar is None:
+            calendar = WorkCalendar(self.workdays, self.holidays, overrides=exceptions, origin=self._origin)
+            self._employee_calendars[employee_id] = calendar
+        return calendar
+
+    def is_working_day(self, day):
+        day = to_date(day)
+        override = self.overrides.get(day)
+        if override is not None:
+            return override
+        return day.weekday() in self.workdays and day not in self.holidays
+
+    def next_working_day(self, day):
+        return self.add_working_days(day, 0)
+
+    def add_working_days(self, day, count):
+        # Отсчет ведется от ближайшего рабочего дня, не раньше day
+        day = to_date(day)
+        while True:
+            ordinal = self._ordinal(day) + count
+            if ordinal < 0:
+                self._build(self._origin - timedelta(days=self._span), self._span * 2)
+            elif ordinal >= len(self._working):
+                self._build(self._origin, self._span * 2)
+            else:
+                return self._origin + timedelta(days=self._working[ordinal])
+
+    def finish_date(self, start, duration):
+        return self.add_working_days(start, duration - 1)
+
+    def working_days_between(self, start, end):
+        start = to_date(start)
+        end = to_date(end)
+        self._ordinal(min(start, end))
+        self._ordinal(max(start, end))
+        return self._ordinal(end) - self._ordinal(start)
+
+    def _ordinal(self, day):
+        index = (day - self._origin).days
+        if index < 0:
+            self._build(day - timedelta(days=366), self._span - index + 366)
+        elif index >= self._span:
+            self._build(self._origin, max(self._span * 2, index + 366))
+        return self._ordinals[(day - self._origin).days]
+
+    def _build(self, origin, span):
+        self._origin = origin
+        self._span = span
+        ordinals = [0] * (span + 1)
+        working = []
+        day = origin
+        one_day = timedelta(days=1)
+        for index in range(span):
+            ordinals[index] = len(working)
+            if self.is_working_day(day):
+                working.append(index)
+            day += one_day
+        ordinals[span] = len(working)
+        self._ordinals = ordinals
+        self._working = working
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_manager import DatabaseManager
+
+# Схема БД первой версии приложения, до миграций: зависимости хранятся текстом в tasks.dependencies,
+# даты для диаграммы Ганта дублируются в таблице task_visualization_dates
+LEGACY_SCHEMA = """
+CREATE TABLE project_settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    start_date DATE NOT NULL
+);
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    direction TEXT CHECK(direction IN ('ЭТО', 'ТМО', 'АСУ ТП'))
+);
+CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    direction TEXT CHECK(direction IN ('ЭТО', 'ТМО', 'АСУ ТП')),
+    duration INTEGER NOT NULL,
+    dependencies TEXT,
+    planned_start DATE,
+    planned_end DATE,
+    actual_start DATE,
+    actual_end DATE,
+    actual_duration INTEGER,
+    assigned_employee_id INTEGER,
+    FOREIGN KEY(assigned_employee_id) REFERENCES employees(id)
+);
+CREATE TABLE task_visualization_dates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id INTEGER NOT NULL,
+    planned_start DATE,
+    planned_end DATE,
+    actual_start DATE,
+    actual_end DATE,
+    FOREIGN KEY(task_id) REFERENCES tasks(id)
+);
+"""
+# (id, name, description, direction, duration, dependencies, planned_start, planned_end,
+#  actual_start, actual_end, actual_duration, assigned_employee_id); задачи 99 в БД нет
+LEGACY_TASKS = [
+    (1, "Монтаж насоса", "Насос Н-101", "ТМО", 3, "", "2025-01-06", "2025-01-08",
+     "2025-01-06", "2025-01-09", 4, 2),
+    (2, "Прокладка кабеля", "Кабель к насосу", "ЭТО", 2, "1", "2025-01-09", "2025-01-10", None, None, None, 1),
+    (3, "Проверка цепей", "Ёмкость и изоляция", "ЭТО", 1, "1, 2,99", "2025-01-13", "2025-01-13",
+     None, None, None, 1),
+    (4, "Документация", "Исполнительная", None, 2, None, "2025-01-06", "2025-01-07", None, None, None, None),
+]
+
+
+def available_backends():
+    # Драйвер QtSql проверяется, только если установлен PySide6
+    try:
+        import PySide6.QtSql  # noqa: F401
+    except ImportError:
+        return ["sqlite"]
+    return ["sqlite", "qt"]
+
+
+def query_plan(db_manager, sql, params=()):
+    # Строки detail плана запроса (EXPLAIN QUERY PLAN) через соединение DatabaseManager
+    query = db_manager.query(db_manager.reader())
+    query.prepare(f"EXPLAIN QUERY PLAN {sql}")
+    for index, param in enumerate(params):
+        query.bindValue(index, param)
+    if not query.exec():
+        raise Exception(query.lastError().text())
+    details = []
+    while query.next():
+        details.append(query.value(3))
+    query.finish()
+    return details
+
+
+@pytest.fixture(scope="session")
+def qt_application():
+    # QSqlDatabase требует экземпляр приложения Qt
+    from PySide6.QtCore import QCoreApplication
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    # Файл БД первой версии приложения с данными; DatabaseManager применяет к нему все миграции
+    path = str(tmp_path / "legacy.db")
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.execute("INSERT INTO project_settings (start_date) VALUES ('2025-01-06')")
+    connection.executemany(
+        "INSERT INTO employees (id, name, direction) VALUES (?, ?, ?)", [(1, "Иванов", "ЭТО"), (2, "Петров", "ТМО")]
+    )
+    connection.executemany(f"INSERT INTO tasks VALUES ({', '.join('?' * 12)})", LEGACY_TASKS)
+    connection.executemany(
+        "INSERT INTO task_visualization_dates (task_id, planned_start, planned_end, actual_start, actual_end) "
+        "VALUES (?, ?, date(?, '+1 day'), ?, date(?, '+1 day'))",
+        [(task[0], task[6], task[7], task[8], task[9]) for task in LEGACY_TASKS],
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture(params=available_backends())
+def legacy_db_manager(request, legacy_database):
+    if request.param == "qt":
+        request.getfixturevalue("qt_application")
+    manager = DatabaseManager(legacy_database, backend=request.param)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture(params=available_backends())
+def db_manager(request, tmp_path):
+    if request.param == "qt":
+        request.getfixturevalue("qt_application")
+    manager = DatabaseManager(str(tmp_path / "planner.db"), backend=request.param)
+    yield manager
+    manager.close()
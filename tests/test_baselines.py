@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from database.db_manager import BASELINE_CHAIN_LIMIT
+
+
+def add_plan(db_manager, count):
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    return db_manager.add_tasks_bulk([
+        {"name": f"Задача {ref}", "duration": 2, "dependencies": [ref - 1] if ref > 1 else [],
+         "assigned_employee_id": 1, "ref": ref}
+        for ref in range(1, count + 1)
+    ])
+
+
+def current_plan(db_manager):
+    return {task.id: (task.planned_start, task.planned_end) for task in db_manager.get_all_tasks()}
+
+
+def baseline_plan(db_manager, baseline_id):
+    # Полный снимок базового плана, восстановленный по цепочке отличий
+    diff = db_manager.diff_baselines(baseline_id, changed_only=False)
+    return {
+        task_id: (start.astype(object), end.astype(object))
+        for task_id, start, end in zip(diff["task_id"].tolist(), diff["base_start"], diff["base_end"])
+        if not np.isnat(start)
+    }
+
+
+def stored_rows(db_manager):
+    return {row[0]: row[3] for row in db_manager.get_baselines()}
+
+
+def test_baselines_store_only_changes_and_diff_against_plan(db_manager):
+    first, second, third = add_plan(db_manager, 3)
+    initial = db_manager.create_baseline("Исходный")
+    db_manager.update_task_duration(second, 4)
+    db_manager.delete_task(third)
+    changed = db_manager.create_baseline("После изменений")
+    assert stored_rows(db_manager) == {initial: 3, changed: 2}
+
+    diff = db_manager.diff_baselines(initial)
+    assert diff["task_id"].tolist() == [second, third]
+    # Сдвиг в календарных днях: два рабочих дня с четверга - это понедельник
+    assert diff["end_slip"][0] == 4
+    assert np.isnan(diff["end_slip"][1]) and np.isnat(diff["plan_start"][1])
+    assert len(db_manager.diff_baselines(changed)["task_id"]) == 0
+    assert db_manager.diff_baselines(initial, changed)["task_id"].tolist() == [second, third]
+    assert len(db_manager.diff_baselines(initial, changed_only=False)["task_id"]) == 3
+
+    added = db_manager.add_tasks_bulk([{"name": "Новая", "duration": 1, "dependencies": [], "assigned_employee_id": 1}])
+    diff = db_manager.diff_baselines(changed)
+    assert diff["task_id"].tolist() == added
+    assert np.isnat(diff["base_start"][0])
+
+
+def test_deleting_baselines_keeps_other_snapshots(db_manager):
+    generator = random.Random(3)
+    task_ids = add_plan(db_manager, 12)
+    snapshots = {}
+    for index in range(8):
+        for task_id in generator.sample(task_ids, 3):
+            db_manager.update_task_duration(task_id, generator.randint(1, 5))
+        if index == 4:
+            db_manager.delete_task(task_ids.pop())
+        snapshots[db_manager.create_baseline(f"План {index}")] = current_plan(db_manager)
+
+    for baseline_id in (list(snapshots)[0], list(snapshots)[3], list(snapshots)[-1], list(snapshots)[4]):
+        db_manager.delete_baseline(baseline_id)
+        del snapshots[baseline_id]
+        for other_id, snapshot in snapshots.items():
+            assert baseline_plan(db_manager, other_id) == snapshot
+    assert set(stored_rows(db_manager)) == set(snapshots)
+
+
+def test_baseline_chain_is_limited(db_manager):
+    add_plan(db_manager, 2)
+    baseline_ids = [db_manager.create_baseline(f"План {index}") for index in range(BASELINE_CHAIN_LIMIT + 1)]
+    rows = stored_rows(db_manager)
+    # Без изменений план хранит только ссылку на родителя, пока цепочка не достигнет предела
+    assert [rows[baseline_id] for baseline_id in baseline_ids] == [2] + [0] * (BASELINE_CHAIN_LIMIT - 1) + [2]
+
+
+def test_baseline_names_are_required_and_unique(db_manager):
+    add_plan(db_manager, 1)
+    db_manager.create_baseline("Исходный")
+    with pytest.raises(Exception):
+        db_manager.create_baseline(" Исходный ")
+    with pytest.raises(Exception):
+        db_manager.create_baseline("  ")
+    assert len(db_manager.get_baselines()) == 1
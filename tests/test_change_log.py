@@ -0,0 +1,57 @@
+def test_writes_are_journaled_in_order(db_manager):
+    start = db_manager.last_change_seq()
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    employee_id = 1
+    first, second = db_manager.add_tasks_bulk([
+        {"name": "Монтаж", "duration": 2, "dependencies": [], "assigned_employee_id": employee_id, "ref": 1},
+        {"name": "Проверка", "duration": 1, "dependencies": [1], "assigned_employee_id": employee_id, "ref": 2},
+    ])
+    changes = db_manager.changes_since(start)
+    assert [change[0] for change in changes] == sorted(change[0] for change in changes)
+    assert [change[1:] for change in changes] == [
+        ("employees", employee_id, "INSERT"),
+        ("tasks", first, "INSERT"), ("task_visualization_dates", first, "INSERT"),
+        ("tasks", second, "INSERT"), ("task_visualization_dates", second, "INSERT"),
+        # Новая связь - изменение столбца dependencies задачи-последователя
+        ("tasks", second, "UPDATE"),
+    ]
+
+    seq = db_manager.last_change_seq()
+    db_manager.update_task_duration(first, 3)
+    assert [change[1:] for change in db_manager.changes_since(seq)] == [
+        ("tasks", first, "UPDATE"),
+        # Триггеры одной команды срабатывают в порядке, обратном созданию
+        ("task_visualization_dates", first, "UPDATE"), ("tasks", first, "UPDATE"),
+        ("task_visualization_dates", second, "UPDATE"), ("tasks", second, "UPDATE"),
+    ]
+
+    seq = db_manager.last_change_seq()
+    db_manager.delete_task(second)
+    assert [change[1:] for change in db_manager.changes_since(seq)] == [
+        ("tasks", second, "UPDATE"),
+        ("tasks", second, "DELETE"), ("task_visualization_dates", second, "DELETE"),
+    ]
+
+
+def test_unchanged_values_are_not_journaled(db_manager):
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    seq = db_manager.last_change_seq()
+    db_manager.execute_query("UPDATE employees SET name = name, direction = direction")
+    db_manager.execute_query("UPDATE project_settings SET start_date = start_date")
+    assert db_manager.changes_since(seq) == []
+    assert db_manager.last_change_seq() == seq
+
+
+def test_pruned_journal_reports_missing_changes(db_manager):
+    for index in range(5):
+        db_manager.add_employee(f"Сотрудник {index}", "ТМО")
+    last_seq = db_manager.last_change_seq()
+    db_manager.prune_changes(keep=2)
+    assert [change[0] for change in db_manager.changes_since(last_seq - 2)] == [last_seq - 1, last_seq]
+    # Записи до seq удалены: изменения неизвестны, и читатель перечитывает данные целиком
+    assert db_manager.changes_since(last_seq - 4) is None
+    db_manager.prune_changes(keep=0)
+    assert db_manager.changes_since(last_seq) == []
+    assert db_manager.last_change_seq() == last_seq
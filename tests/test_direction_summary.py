@@ -0,0 +1,82 @@
+import random
+from datetime import timedelta
+
+
+def expected_summary(db_manager):
+    # Итоги, посчитанные по строкам задач и сотрудников, для сравнения с direction_summary
+    summary = {}
+
+    def totals(direction):
+        return summary.setdefault(direction, {
+            "employee_count": 0, "task_count": 0, "duration_sum": 0, "actual_duration_sum": 0,
+            "effective_duration_sum": 0, "span_days_sum": 0, "completed_count": 0, "deviation_count": 0,
+            "overdue_count": 0, "deviation_sum": 0,
+        })
+
+    for employee in db_manager.get_all_employees():
+        totals(employee.direction)["employee_count"] += 1
+    for task in db_manager.get_all_tasks():
+        row = totals(task.direction)
+        actual_duration = None if task.actual_duration != task.actual_duration else task.actual_duration
+        row["task_count"] += 1
+        row["duration_sum"] += task.duration
+        row["actual_duration_sum"] += actual_duration or 0
+        row["effective_duration_sum"] += task.duration if actual_duration is None else actual_duration
+        if task.actual_start and task.actual_end:
+            row["completed_count"] += 1
+            row["span_days_sum"] += (task.actual_end - task.actual_start).days + 1
+        elif task.planned_start and task.planned_end:
+            row["span_days_sum"] += (task.planned_end - task.planned_start).days + 1
+        if task.planned_end and task.actual_end:
+            deviation = (task.actual_end - task.planned_end).days
+            row["deviation_count"] += 1
+            row["overdue_count"] += deviation > 0
+            row["deviation_sum"] += deviation
+    return summary
+
+
+def test_summary_follows_random_writes(db_manager):
+    generator = random.Random(5)
+    directions = ["ЭТО", "ТМО", "АСУ ТП"]
+    db_manager.save_project_start_date("2025-01-06")
+    for index in range(6):
+        db_manager.add_employee(f"Сотрудник {index}", directions[index % 3])
+    task_ids = db_manager.add_tasks_bulk([
+        {"name": f"Задача {ref}", "direction": generator.choice(directions + [None]),
+         "duration": generator.randint(1, 6), "dependencies": [ref - 1] if ref > 1 and generator.random() < 0.5 else [],
+         "assigned_employee_id": generator.randint(1, 6), "ref": ref}
+        for ref in range(1, 31)
+    ])
+    assert db_manager.get_direction_summary() == expected_summary(db_manager)
+
+    for _ in range(40):
+        task_id = generator.choice(task_ids)
+        operation = generator.random()
+        if operation < 0.3:
+            db_manager.update_task_duration(task_id, generator.randint(1, 6))
+        elif operation < 0.5:
+            db_manager.save_actual_duration(task_id, generator.randint(1, 8))
+        elif operation < 0.65:
+            task = next(task for task in db_manager.get_all_tasks() if task.id == task_id)
+            start = task.planned_start + timedelta(days=generator.randint(-2, 2))
+            db_manager.update_task_actual_dates(
+                task_id, start.isoformat(), (start + timedelta(days=generator.randint(0, 5))).isoformat()
+            )
+        elif operation < 0.8:
+            db_manager.execute_query(
+                "UPDATE tasks SET direction = ? WHERE id = ?", (generator.choice(directions + [None]), task_id)
+            )
+        else:
+            db_manager.delete_task(task_id)
+            task_ids.remove(task_id)
+        assert db_manager.get_direction_summary() == expected_summary(db_manager)
+
+    db_manager.delete_employee(2)
+    assert db_manager.get_direction_summary() == expected_summary(db_manager)
+
+
+def test_summary_is_filled_for_existing_rows(legacy_db_manager):
+    summary = legacy_db_manager.get_direction_summary()
+    assert summary == expected_summary(legacy_db_manager)
+    assert summary["ТМО"]["overdue_count"] == 1
+    assert set(summary) == {"ЭТО", "ТМО", None}
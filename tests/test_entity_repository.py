@@ -0,0 +1,66 @@
+import subprocess
+import sys
+import threading
+
+from database.entity_repository import EntityRepository
+
+
+def in_worker(db_manager, function, *args):
+    # Выполняет function в отдельном потоке со своими соединениями, как поток БД AsyncDatabase
+    result = {}
+
+    def run():
+        try:
+            result["value"] = function(*args)
+        finally:
+            db_manager.release_thread_connections()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    return result["value"]
+
+
+def add_external_employee(db_manager, name):
+    # Запись из другого процесса: версии таблиц DatabaseManager не меняются, остается только журнал.
+    # Отдельный процесс нужен и потому, что QtSql использует свою копию SQLite, а две копии
+    # в одном процессе снимают блокировки файла друг у друга
+    script = (
+        "import sqlite3, sys\n"
+        "connection = sqlite3.connect(sys.argv[1])\n"
+        "connection.execute('INSERT INTO employees (name, direction) VALUES (?, ?)', (sys.argv[2], 'ЭТО'))\n"
+        "connection.commit()\n"
+    )
+    subprocess.run([sys.executable, "-c", script, db_manager.connections.db_name, name], check=True)
+
+
+def test_load_stale_reloads_tables_changed_by_other_connections(db_manager):
+    db_manager.add_employee("Иванов", "ЭТО")
+    repository = EntityRepository(db_manager)
+    assert [employee.name for employee in repository.employees()] == ["Иванов"]
+    repository.tasks()
+
+    add_external_employee(db_manager, "Петров")
+    snapshot = in_worker(db_manager, repository.load_stale, repository.cache_state())
+    assert set(snapshot["entries"]) == {"employees", "direction_summary"}
+
+    repository.install(snapshot)
+    loads = dict(repository.loads)
+    assert [employee.name for employee in repository.employees()] == ["Иванов", "Петров"]
+    repository.tasks()
+    assert repository.loads == loads
+
+
+def test_install_skips_snapshot_older_than_cache(db_manager):
+    repository = EntityRepository(db_manager)
+    repository.employees()
+    state = repository.cache_state()
+
+    add_external_employee(db_manager, "Петров")
+    snapshot = in_worker(db_manager, repository.load_stale, state)
+    db_manager.add_employee("Сидоров", "ЭТО")
+    add_external_employee(db_manager, "Козлов")
+    # Кэш синхронизировался сам после снятия state, поэтому снимок не подставляется
+    assert len(repository.employees()) == 3
+    repository.install(snapshot)
+    assert [employee.name for employee in repository.employees()] == ["Петров", "Сидоров", "Козлов"]
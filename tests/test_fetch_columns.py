@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def test_int_column_promoted_to_float(db_manager):
+    columns = db_manager.fetch_columns("SELECT 1 AS a UNION ALL SELECT 2.5 UNION ALL SELECT 3")
+    assert columns["a"].dtype == np.float64
+    assert columns["a"].tolist() == [1.0, 2.5, 3.0]
+
+
+def test_int_column_with_null_promoted_to_float(db_manager):
+    columns = db_manager.fetch_columns("SELECT 1 AS a UNION ALL SELECT NULL UNION ALL SELECT 2.5")
+    values = columns["a"]
+    assert values.dtype == np.float64
+    assert values[0] == 1.0 and np.isnan(values[1]) and values[2] == 2.5
+
+
+def test_numeric_columns_promoted_to_object_by_text(db_manager):
+    columns = db_manager.fetch_columns("SELECT 1 AS a, 'x' AS b UNION ALL SELECT 'abc', 2")
+    assert columns["a"].dtype == object
+    assert columns["a"].tolist() == [1, "abc"]
+    assert columns["b"].tolist() == ["x", 2]
+
+
+def test_float_column_with_null_promoted_to_object(db_manager):
+    columns = db_manager.fetch_columns("SELECT 1.5 AS a UNION ALL SELECT NULL UNION ALL SELECT 'abc'")
+    assert columns["a"].dtype == object
+    assert columns["a"].tolist() == [1.5, None, "abc"]
+
+
+def test_null_mask_after_growth(db_manager):
+    # Строка с NULL до расширения массивов не должна отмечать NULL в строках после него
+    columns = db_manager.fetch_columns("""
+        WITH RECURSIVE numbers(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM numbers WHERE n < 2999)
+        SELECT CASE WHEN n = 1 THEN NULL ELSE n END AS a FROM numbers
+    """)
+    values = columns["a"]
+    assert np.isnan(values[1])
+    assert np.isnan(values).sum() == 1
+    assert values[2:].tolist() == list(range(2, 3000))
+
+
+def test_explicit_dtype_is_kept(db_manager):
+    columns = db_manager.fetch_columns("SELECT 1 AS a UNION ALL SELECT 2", dtypes={"a": np.float64})
+    assert columns["a"].dtype == np.float64
+    assert columns["a"].tolist() == [1.0, 2.0]
@@ -0,0 +1,62 @@
+from datetime import date
+
+import pytest
+
+import database.db_manager as db_manager_module
+from conftest import LEGACY_TASKS, query_plan
+from database.db_manager import TASK_SELECT
+from database.migrations import MIGRATIONS
+
+
+def schema_objects(db_manager):
+    return db_manager.execute_query("SELECT type, name FROM sqlite_master ORDER BY type, name")
+
+
+def test_legacy_database_is_migrated_in_place(legacy_db_manager):
+    assert legacy_db_manager.get_schema_version() == MIGRATIONS[-1][0]
+    objects = set(schema_objects(legacy_db_manager))
+    for index in ("idx_tasks_planned_start", "idx_tasks_direction", "idx_tasks_assigned_employee",
+                  "idx_employees_direction", "idx_task_dependencies_successor"):
+        assert ("index", index) in objects
+    for table in ("task_dependencies", "change_log", "baselines", "baseline_tasks", "direction_summary",
+                  "tasks_fts"):
+        assert ("table", table) in objects
+    assert ("view", "task_visualization_dates") in objects
+
+    tasks = {task.id: task for task in legacy_db_manager.get_all_tasks()}
+    assert [task.name for task in tasks.values()] == [
+        "Документация", "Монтаж насоса", "Прокладка кабеля", "Проверка цепей",
+    ]
+    assert (tasks[1].planned_start, tasks[1].actual_end) == (date(2025, 1, 6), date(2025, 1, 9))
+    assert legacy_db_manager.execute_query(
+        "SELECT planned_start_day, actual_end_day FROM tasks WHERE id = 1"
+    ) == [(20094, 20097)]
+    # Представление отдает дату окончания как исключающую, как раньше таблица
+    assert legacy_db_manager.execute_query(
+        "SELECT planned_end, actual_end FROM task_visualization_dates WHERE task_id = 1"
+    ) == [("2025-01-09", "2025-01-10")]
+    assert legacy_db_manager.get_project_start_date() == "2025-01-06"
+    assert not legacy_db_manager.get_resource_leveling()
+
+
+def test_task_list_is_read_from_covering_index(legacy_db_manager):
+    plan = query_plan(legacy_db_manager, TASK_SELECT + " ORDER BY tasks.planned_start ASC")
+    assert plan[0] == "SCAN tasks USING COVERING INDEX idx_tasks_planned_start", plan
+
+
+def test_applied_migrations_are_not_repeated(legacy_db_manager):
+    objects = schema_objects(legacy_db_manager)
+    legacy_db_manager.apply_migrations()
+    assert schema_objects(legacy_db_manager) == objects
+    assert len(legacy_db_manager.get_all_tasks()) == len(LEGACY_TASKS)
+
+
+def test_failed_migration_is_rolled_back(legacy_db_manager, monkeypatch):
+    version = legacy_db_manager.get_schema_version()
+    monkeypatch.setattr(db_manager_module, "MIGRATIONS", MIGRATIONS + [
+        (version + 1, ["CREATE TABLE unfinished (id INTEGER)", "ALTER TABLE missing ADD COLUMN value INTEGER"]),
+    ])
+    with pytest.raises(Exception):
+        legacy_db_manager.apply_migrations()
+    assert legacy_db_manager.get_schema_version() == version
+    assert ("table", "unfinished") not in schema_objects(legacy_db_manager)
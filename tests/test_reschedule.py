@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def plan(db_manager):
+    # 1 -> 2 -> 3, 4 -> 2 и независимая задача 5; проект начинается в понедельник
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    task_ids = db_manager.add_tasks_bulk([
+        {"name": "Монтаж", "duration": 2, "dependencies": [], "assigned_employee_id": 1, "ref": 1},
+        {"name": "Прокладка", "duration": 1, "dependencies": [1, 4], "assigned_employee_id": 1, "ref": 2},
+        {"name": "Проверка", "duration": 3, "dependencies": [2], "assigned_employee_id": 1, "ref": 3},
+        {"name": "Поставка", "duration": 4, "dependencies": [], "assigned_employee_id": 1, "ref": 4},
+        {"name": "Документация", "duration": 2, "dependencies": [], "assigned_employee_id": 1, "ref": 5},
+    ])
+    return db_manager, task_ids
+
+
+def planned_dates(db_manager):
+    return {task.id: (task.planned_start, task.planned_end) for task in db_manager.get_all_tasks()}
+
+
+def test_duration_change_moves_only_downstream_tasks(plan):
+    db_manager, (first, second, third, supply, other) = plan
+    before = planned_dates(db_manager)
+    # Вторая задача ждет более длинную поставку: 6-9 января, затем 10 и 13-15 января
+    assert before[second] == (date(2025, 1, 10), date(2025, 1, 10))
+    assert before[third] == (date(2025, 1, 13), date(2025, 1, 15))
+
+    changed = db_manager.update_task_duration(first, 6)
+    after = planned_dates(db_manager)
+    assert set(changed) == {first, second, third}
+    assert after[first] == (date(2025, 1, 6), date(2025, 1, 13))
+    assert after[second] == (date(2025, 1, 14), date(2025, 1, 14))
+    assert after[third] == (date(2025, 1, 15), date(2025, 1, 17))
+    assert after[supply] == before[supply]
+    assert after[other] == before[other]
+
+
+def test_shorter_duration_keeps_other_predecessor_constraint(plan):
+    db_manager, (first, second, third, supply, other) = plan
+    before = planned_dates(db_manager)
+    assert db_manager.update_task_duration(first, 1) == [first]
+    after = planned_dates(db_manager)
+    assert after[first] == (date(2025, 1, 6), date(2025, 1, 6))
+    assert after[second] == before[second]
+    assert after[third] == before[third]
+
+
+def test_full_reschedule_of_consistent_plan_changes_nothing(plan):
+    db_manager, _ = plan
+    before = planned_dates(db_manager)
+    assert db_manager.reschedule_tasks() == []
+    assert db_manager.reschedule_tasks([]) == []
+    assert planned_dates(db_manager) == before
+
+
+def test_deleted_predecessor_releases_successors(plan):
+    db_manager, (first, second, third, supply, other) = plan
+    db_manager.delete_task(supply)
+    after = planned_dates(db_manager)
+    assert after[second] == (date(2025, 1, 8), date(2025, 1, 8))
+    assert after[third] == (date(2025, 1, 9), date(2025, 1, 13))
+
+
+def test_failed_write_rolls_back_rescheduled_dates(plan, monkeypatch):
+    db_manager, (first, second, third, supply, other) = plan
+    before = planned_dates(db_manager)
+
+    def fail(*args):
+        raise Exception("Сбой записи")
+
+    monkeypatch.setattr(db_manager, "exec_batch", fail)
+    with pytest.raises(Exception):
+        db_manager.update_task_duration(first, 6)
+    monkeypatch.undo()
+    assert planned_dates(db_manager) == before
+    assert {task.id: task.duration for task in db_manager.get_all_tasks()}[first] == 2
@@ -0,0 +1,103 @@
+import random
+from datetime import date
+
+from scheduling.resource_leveling import level_resources
+from scheduling.work_calendar import WorkCalendar
+
+PROJECT_START = date(2025, 1, 6)
+
+
+def assert_levelled(tasks, schedule, calendar):
+    # tasks: [(task_id, duration, dependencies, employee_id)], schedule: {task_id: (start, end)}
+    by_employee = {}
+    for task_id, duration, dependencies, employee_id in tasks:
+        start, end = schedule[task_id]
+        employee_calendar = calendar.for_employee(employee_id)
+        assert employee_calendar.is_working_day(start)
+        assert end == employee_calendar.finish_date(start, duration)
+        for dep_id in dependencies:
+            assert start > schedule[dep_id][1], (dep_id, task_id)
+        if employee_id is not None:
+            by_employee.setdefault(employee_id, []).append((start, end))
+    for intervals in by_employee.values():
+        intervals.sort()
+        for (_, previous_end), (start, _) in zip(intervals, intervals[1:]):
+            assert start > previous_end
+
+
+def random_plan(count, employees, seed):
+    generator = random.Random(seed)
+    tasks = []
+    for task_id in range(1, count + 1):
+        dependencies = generator.sample(range(1, task_id), min(task_id - 1, generator.randint(0, 3)))
+        employee_id = generator.choice(employees + [None])
+        tasks.append((task_id, generator.randint(1, 8), dependencies, employee_id))
+    return tasks
+
+
+def test_parallel_tasks_of_one_employee_are_serialized():
+    tasks = [(1, 3, [], 1), (2, 2, [], 1), (3, 1, [1, 2], 2)]
+    calendar = WorkCalendar(origin=PROJECT_START)
+    result = level_resources(tasks, PROJECT_START, calendar)
+    assert_levelled(tasks, result["schedule"], calendar)
+    assert result["project_end"] == date(2025, 1, 13)
+    assert result["project_duration"] == 6
+
+
+def test_random_plan_keeps_precedence_and_employee_calendars():
+    calendar = WorkCalendar(
+        holidays=[date(2025, 1, 8)],
+        employee_exceptions={1: {date(2025, 1, 11): True}, 2: {date(2025, 1, 7): False, date(2025, 1, 9): False}},
+        origin=PROJECT_START,
+    )
+    tasks = random_plan(400, [1, 2, 3, 4, 5], seed=7)
+    result = level_resources(tasks, PROJECT_START, calendar)
+    assert_levelled(tasks, result["schedule"], calendar)
+
+
+def test_employee_day_off_delays_only_that_employee():
+    calendar = WorkCalendar(employee_exceptions={2: {PROJECT_START: False}}, origin=PROJECT_START)
+    schedule = level_resources([(1, 2, [], 1), (2, 2, [], 2)], PROJECT_START, calendar)["schedule"]
+    assert schedule[1] == (date(2025, 1, 6), date(2025, 1, 7))
+    assert schedule[2] == (date(2025, 1, 7), date(2025, 1, 8))
+
+
+def db_plan(db_manager):
+    tasks = db_manager.get_all_tasks()
+    dependency_map = db_manager.get_dependency_map()
+    return [
+        (task.id, task.duration, dependency_map.get(task.id, []), task.assigned_employee_id or None)
+        for task in tasks
+    ], {task.id: (task.planned_start, task.planned_end) for task in tasks}
+
+
+def test_leveling_mode_reschedules_plan(db_manager):
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    db_manager.add_employee("Петров", "ЭТО")
+    db_manager.set_employee_calendar_exception(2, "2025-01-06", False)
+    db_manager.add_tasks_bulk([
+        {"name": "Монтаж", "duration": 3, "dependencies": [], "assigned_employee_id": 1, "ref": 1},
+        {"name": "Прокладка", "duration": 2, "dependencies": [], "assigned_employee_id": 1, "ref": 2},
+        {"name": "Проверка", "duration": 1, "dependencies": [1, 2], "assigned_employee_id": 2, "ref": 3},
+    ])
+    dependency_dates = db_plan(db_manager)[1]
+    assert dependency_dates[1][0] == dependency_dates[2][0]
+
+    assert db_manager.set_resource_leveling(True)
+    assert db_manager.get_resource_leveling()
+    tasks, schedule = db_plan(db_manager)
+    assert_levelled(tasks, schedule, db_manager.get_work_calendar())
+
+    # Новая задача того же сотрудника и удаление задачи выравниваются в том же режиме
+    db_manager.add_tasks_bulk([{"name": "Наладка", "duration": 2, "dependencies": [], "assigned_employee_id": 1}])
+    tasks, schedule = db_plan(db_manager)
+    assert_levelled(tasks, schedule, db_manager.get_work_calendar())
+    db_manager.delete_task(1)
+    tasks, schedule = db_plan(db_manager)
+    assert_levelled(tasks, schedule, db_manager.get_work_calendar())
+
+    db_manager.set_resource_leveling(False)
+    assert not db_manager.get_resource_leveling()
+    schedule = db_plan(db_manager)[1]
+    assert schedule[2][0] == schedule[4][0] == date(2025, 1, 6)
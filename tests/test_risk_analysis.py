@@ -0,0 +1,68 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from scheduling.risk_analysis import (
+    build_simulation_model, fit_deviation_distributions, most_critical_tasks, run_risk_analysis,
+)
+
+
+def add_chain(db_manager, durations):
+    # Цепочка задач: каждая следующая зависит от предыдущей
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    return db_manager.add_tasks_bulk([
+        {
+            "name": f"Задача {ref}", "description": "", "direction": "ЭТО", "duration": duration,
+            "dependencies": [ref - 1] if ref > 1 else [], "assigned_employee_id": 1, "ref": ref,
+        }
+        for ref, duration in enumerate(durations, start=1)
+    ])
+
+
+def test_model_ignores_nan_actual_durations():
+    distributions = fit_deviation_distributions([("ЭТО", 2, np.nan), ("ЭТО", 3, None)])
+    model = build_simulation_model(
+        [(1, "ЭТО", 2, np.nan, []), (2, "ЭТО", 3, 5.0, [1]), (3, "ЭТО", 4, None, [2])], distributions
+    )
+    assert model["base_durations"].tolist() == [2.0, 5.0, 4.0]
+
+
+def test_analysis_with_null_actual_durations(db_manager):
+    add_chain(db_manager, [2, 3, 4])
+
+    result = db_manager.analyze_schedule_risk(db_manager.get_all_tasks(), iterations=200, seed=1)
+
+    # Без истории отклонений длительности не разыгрываются: срок равен сумме плановых длительностей
+    assert result["percentiles"] == {50: 9.0, 80: 9.0, 95: 9.0}
+    assert result["completion_dates"] == dict.fromkeys((50, 80, 95), date(2025, 1, 16))
+    assert set(result["criticality"].values()) == {1.0}
+
+
+def test_analysis_uses_recorded_actual_durations(db_manager):
+    task_ids = add_chain(db_manager, [2, 3, 4])
+    db_manager.update_task_actual_duration(task_ids[1], 6)
+
+    result = db_manager.analyze_schedule_risk(db_manager.get_all_tasks(), iterations=200, seed=1)
+
+    assert result["percentiles"][50] > 2 + 6 + 4 - 1e-9
+    assert all(not np.isnan(value) for value in result["percentiles"].values())
+    assert result["completion_dates"][50] <= result["completion_dates"][95]
+
+
+def test_iterations_must_be_positive():
+    with pytest.raises(Exception, match="не меньше 1"):
+        run_risk_analysis([(1, "ЭТО", 2, np.nan, [])], [], iterations=0)
+
+
+def test_fixed_seed_repeats_forecast():
+    tasks = [(1, "ЭТО", 2, np.nan, []), (2, "ЭТО", 3, np.nan, [1]), (3, "ТМО", 4, np.nan, [1])]
+    history = [("ЭТО", 2, 3.0), ("ЭТО", 4, 5.0), ("ЭТО", 3, 2.0), ("ТМО", 5, 9.0)]
+    first = run_risk_analysis(tasks, history, iterations=500, chunk_size=100, seed=7)
+    second = run_risk_analysis(tasks, history, iterations=500, chunk_size=100, seed=7)
+    assert first == second
+
+
+def test_most_critical_tasks():
+    assert most_critical_tasks({1: 0.2, 2: 1.0, 3: 0.6, 4: 0.6}, 3) == [(2, 1.0), (3, 0.6), (4, 0.6)]
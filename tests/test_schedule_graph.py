@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from scheduling.critical_path import calculate_critical_path
+from scheduling.schedule_graph import ScheduleGraph
+
+
+def assert_matches_full_recompute(graph):
+    expected = calculate_critical_path(
+        (task_id, graph.names[task_id], graph.durations[task_id], list(graph.predecessors[task_id]))
+        for task_id in graph.names
+    )
+    result = graph.result()
+    assert result["project_duration"] == expected["project_duration"]
+    assert set(result["critical_path"]) == set(expected["critical_path"])
+    for task_id, task in expected["tasks"].items():
+        for key in ("es", "ef", "ls", "lf", "slack"):
+            assert result["tasks"][task_id][key] == task[key], (task_id, key)
+    for task_id, dependencies in graph.predecessors.items():
+        for dep_id in dependencies:
+            assert graph.position[dep_id] < graph.position[task_id]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_updates_match_full_recompute(seed):
+    generator = random.Random(seed)
+    tasks = [
+        (task_id, f"Задача {task_id}", generator.randint(0, 6),
+         generator.sample(range(task_id), min(task_id, generator.randint(0, 3))))
+        for task_id in range(generator.randint(1, 25))
+    ]
+    graph = ScheduleGraph(tasks)
+    assert_matches_full_recompute(graph)
+    next_id = len(tasks)
+    for _ in range(40):
+        task_ids = list(graph.names)
+        before = graph.critical_tasks()
+        operation = generator.random()
+        if operation < 0.25 or not task_ids:
+            dependencies = generator.sample(task_ids, min(len(task_ids), generator.randint(0, 3)))
+            changed = graph.add_task(next_id, f"Задача {next_id}", generator.randint(0, 6), dependencies)
+            next_id += 1
+        elif operation < 0.45:
+            task_id = generator.choice(task_ids)
+            changed = graph.remove_task(task_id)
+            before.discard(task_id)
+        elif operation < 0.7:
+            changed = graph.update_task(generator.choice(task_ids), duration=generator.randint(0, 6))
+        else:
+            dependencies = generator.sample(task_ids, min(len(task_ids), generator.randint(0, 3)))
+            try:
+                changed = graph.update_task(generator.choice(task_ids), dependencies=dependencies)
+            except Exception:
+                # Связь, образующая цикл, отклоняется, а граф остается согласованным
+                assert_matches_full_recompute(graph)
+                continue
+        assert_matches_full_recompute(graph)
+        # Возвращаются задачи, которые вошли в критический путь или вышли из него
+        assert changed == before ^ graph.critical_tasks()
+
+
+def test_graph_follows_database_changes(db_manager):
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    task_ids = db_manager.add_tasks_bulk([
+        {"name": "Монтаж", "duration": 3, "dependencies": [], "assigned_employee_id": 1, "ref": 1},
+        {"name": "Прокладка", "duration": 2, "dependencies": [], "assigned_employee_id": 1, "ref": 2},
+        {"name": "Проверка", "duration": 1, "dependencies": [1, 2], "assigned_employee_id": 1, "ref": 3},
+    ])
+    dependency_map = db_manager.get_dependency_map()
+    graph = ScheduleGraph(
+        (task.id, task.name, task.duration, dependency_map.get(task.id, [])) for task in db_manager.get_all_tasks()
+    )
+    assert graph.critical_path() == [task_ids[0], task_ids[2]]
+
+    db_manager.update_task_duration(task_ids[1], 5)
+    assert graph.update_task(task_ids[1], duration=5) == {task_ids[0], task_ids[1]}
+    assert graph.critical_path() == [task_ids[1], task_ids[2]]
+    assert graph.project_duration == 6
+    assert_matches_full_recompute(graph)
@@ -0,0 +1,61 @@
+def add_tasks(db_manager, tasks):
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ТМО")
+    return db_manager.add_tasks_bulk([
+        {"name": name, "description": description, "duration": 1, "dependencies": [], "assigned_employee_id": 1}
+        for name, description in tasks
+    ])
+
+
+def found(db_manager, text, limit=100):
+    return db_manager.search_tasks(text, limit)["id"].tolist()
+
+
+def test_words_match_as_prefixes_in_any_case(db_manager):
+    pump, cable, _ = add_tasks(db_manager, [
+        ("Монтаж насоса Н-101", "Обвязка и центровка"),
+        ("Прокладка кабеля", "Кабель питания насосной станции"),
+        ("Документация", "Исполнительная"),
+    ])
+    assert found(db_manager, "нас 10") == [pump]
+    assert found(db_manager, "КАБЕЛ") == [cable]
+    assert found(db_manager, "центр обвяз") == [pump]
+    assert found(db_manager, "кабель отсутствует") == []
+
+
+def test_name_matches_rank_above_description_matches(db_manager):
+    in_description, in_name = add_tasks(db_manager, [
+        ("Прокладка трассы", "Кабель для насоса"),
+        ("Ревизия насоса", "Разборка и осмотр"),
+    ])
+    assert found(db_manager, "насос") == [in_name, in_description]
+    assert found(db_manager, "насос", limit=1) == [in_name]
+
+
+def test_yo_is_searched_as_ye(db_manager):
+    (tank,) = add_tasks(db_manager, [("Промывка ёмкости", "Ёмкость Е-2")])
+    assert found(db_manager, "емкост") == [tank]
+    assert found(db_manager, "Ёмкость") == [tank]
+
+
+def test_tasks_from_before_migration_are_indexed(legacy_db_manager):
+    assert found(legacy_db_manager, "емкость") == [3]
+    assert found(legacy_db_manager, "насос") == [1, 2]
+
+
+def test_query_operators_and_quotes_are_plain_text(db_manager):
+    (task,) = add_tasks(db_manager, [("Проверка AND NEAR", "Описание")])
+    assert found(db_manager, 'and "near') == [task]
+    assert found(db_manager, 'OR "*') == []
+    assert found(db_manager, "  ") == []
+    assert found(db_manager, None) == []
+
+
+def test_index_follows_task_changes(db_manager):
+    pump, cable = add_tasks(db_manager, [("Монтаж насоса", "Н-101"), ("Прокладка кабеля", "Питание")])
+    db_manager.execute_query("UPDATE tasks SET name = ?, description = ? WHERE id = ?", ("Монтаж задвижки", "З-5", pump))
+    assert found(db_manager, "насос") == []
+    assert found(db_manager, "задвиж") == [pump]
+    db_manager.delete_task(cable)
+    assert found(db_manager, "кабел") == []
+    assert found(db_manager, "монтаж") == [pump]
@@ -0,0 +1,34 @@
+from conftest import LEGACY_TASKS, query_plan
+
+
+def test_text_dependencies_are_moved_to_edge_table(legacy_db_manager):
+    # Ссылка на отсутствующую задачу 99 при переносе отбрасывается
+    assert legacy_db_manager.get_dependency_map() == {2: [1], 3: [1, 2]}
+    assert sorted(legacy_db_manager.get_successors(1)) == [2, 3]
+    assert sorted(legacy_db_manager.get_predecessors(3)) == [1, 2]
+    assert len(legacy_db_manager.get_all_tasks()) == len(LEGACY_TASKS)
+
+
+def test_dependency_lookups_use_indexes(db_manager):
+    successors = query_plan(db_manager, "SELECT successor_id FROM task_dependencies WHERE predecessor_id = ?", (1,))
+    assert any("USING PRIMARY KEY" in detail for detail in successors), successors
+    predecessors = query_plan(db_manager, "SELECT predecessor_id FROM task_dependencies WHERE successor_id = ?", (1,))
+    assert any("idx_task_dependencies_successor" in detail for detail in predecessors), predecessors
+
+
+def test_edges_follow_task_and_dependency_changes(db_manager):
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    first, second, third = db_manager.add_tasks_bulk([
+        {"name": "Монтаж", "duration": 2, "dependencies": [], "assigned_employee_id": 1, "ref": 1},
+        {"name": "Прокладка", "duration": 1, "dependencies": "1", "assigned_employee_id": 1, "ref": 2},
+        {"name": "Проверка", "duration": 1, "dependencies": [1, 2, 2], "assigned_employee_id": 1, "ref": 3},
+    ])
+    assert db_manager.get_dependency_map() == {second: [first], third: [first, second]}
+
+    db_manager.set_task_dependencies(third, [second])
+    assert db_manager.get_predecessors(third) == [second]
+
+    db_manager.delete_task(second)
+    assert db_manager.get_dependency_map() == {}
+    assert db_manager.execute_query("SELECT COUNT(*) FROM task_dependencies") == [(0,)]
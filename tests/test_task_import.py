@@ -0,0 +1,67 @@
+import pytest
+
+from importers.task_import import import_tasks, read_task_file
+
+
+def write_plan(tmp_path, rows):
+    path = tmp_path / "plan.csv"
+    lines = ["id;name;duration;dependencies;employee"] + [";".join(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def assert_consistent(db_manager):
+    # Плановые даты записанных задач соответствуют их зависимостям
+    assert db_manager.reschedule_tasks() == []
+
+
+def test_cyclic_dependencies_are_skipped(db_manager, tmp_path):
+    db_manager.save_project_start_date("2025-01-06")
+    path = write_plan(tmp_path, [
+        ("1", "Монтаж", "2", "3", "Иванов"),
+        ("2", "Наладка", "3", "1", "Петров"),
+        ("3", "Испытания", "1", "2", "Иванов"),
+    ])
+
+    # Пакеты по одной задаче: цикл 1 -> 2 -> 3 -> 1 замыкается между пакетами
+    result = import_tasks(db_manager, read_task_file(path), chunk_size=1)
+
+    assert result == {"imported": 3, "skipped_dependencies": 1, "cancelled": False}
+    tasks = {task.name: task for task in db_manager.get_all_tasks()}
+    assert tasks["Наладка"].dependencies == [tasks["Монтаж"].id]
+    assert tasks["Испытания"].dependencies == [tasks["Наладка"].id]
+    assert tasks["Монтаж"].dependencies == []
+    assert all(task.assigned_employee_id is not None for task in tasks.values())
+    assert tasks["Испытания"].planned_start > tasks["Наладка"].planned_end > tasks["Монтаж"].planned_end
+    assert_consistent(db_manager)
+
+
+def test_self_dependency_is_skipped(db_manager, tmp_path):
+    db_manager.save_project_start_date("2025-01-06")
+    path = write_plan(tmp_path, [("1", "Монтаж", "2", "1", "")])
+
+    result = import_tasks(db_manager, read_task_file(path))
+
+    assert result["skipped_dependencies"] == 1
+    assert db_manager.get_all_tasks().row(0).dependencies == []
+
+
+def test_duplicate_ref_keeps_imported_tasks_consistent(db_manager, tmp_path):
+    db_manager.save_project_start_date("2025-01-06")
+    path = write_plan(tmp_path, [
+        ("1", "Монтаж", "2", "2", "Иванов"),
+        ("2", "Наладка", "3", "", "Петров"),
+        ("1", "Повтор", "1", "", ""),
+    ])
+
+    with pytest.raises(Exception, match="несколько раз"):
+        import_tasks(db_manager, read_task_file(path), chunk_size=1)
+
+    # Задачи до ошибки записаны вместе с отложенной зависимостью, исполнителями и пересчитанными датами
+    tasks = {task.name: task for task in db_manager.get_all_tasks()}
+    assert set(tasks) == {"Монтаж", "Наладка"}
+    assert tasks["Монтаж"].dependencies == [tasks["Наладка"].id]
+    assert tasks["Монтаж"].planned_start > tasks["Наладка"].planned_end
+    names = {employee.id: employee.name for employee in db_manager.get_all_employees()}
+    assert names[tasks["Монтаж"].assigned_employee_id] == "Иванов"
+    assert_consistent(db_manager)
@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+
+import pytest
+
+from scheduling.work_calendar import WorkCalendar
+
+
+def naive_add_working_days(calendar, day, count):
+    # Эталон: перебор дней по одному
+    while not calendar.is_working_day(day):
+        day += timedelta(days=1)
+    step = 1 if count >= 0 else -1
+    for _ in range(abs(count)):
+        day += timedelta(days=step)
+        while not calendar.is_working_day(day):
+            day += timedelta(days=step)
+    return day
+
+
+def test_working_days_skip_weekends_and_holidays():
+    calendar = WorkCalendar(holidays=["2025-01-08"], origin=date(2025, 1, 1))
+    assert calendar.next_working_day(date(2025, 1, 4)) == date(2025, 1, 6)
+    assert calendar.add_working_days(date(2025, 1, 6), 2) == date(2025, 1, 9)
+    assert calendar.finish_date(date(2025, 1, 9), 3) == date(2025, 1, 13)
+    assert calendar.working_days_between(date(2025, 1, 6), date(2025, 1, 13)) == 4
+    assert calendar.working_days_between(date(2025, 1, 13), date(2025, 1, 6)) == -4
+
+
+@pytest.mark.parametrize("offset, count", [(0, 7), (-3000, 15), (5000, -40), (1200, 900), (-10, -700)])
+def test_offset_tables_match_day_by_day_count(offset, count):
+    # Даты далеко за пределами начального диапазона таблиц достраиваются в обе стороны
+    calendar = WorkCalendar(workdays=(0, 1, 2, 3, 5), holidays=["2025-05-01", "2031-01-02"], origin=date(2025, 1, 1))
+    day = date(2025, 1, 1) + timedelta(days=offset)
+    assert calendar.add_working_days(day, count) == naive_add_working_days(calendar, day, count)
+
+
+def test_employee_exceptions_override_project_calendar():
+    calendar = WorkCalendar(
+        holidays=["2025-01-08"],
+        employee_exceptions={1: {date(2025, 1, 8): True, date(2025, 1, 9): False}},
+        origin=date(2025, 1, 1),
+    )
+    employee_calendar = calendar.for_employee(1)
+    assert calendar.for_employee(2) is calendar
+    assert calendar.for_employee(1) is employee_calendar
+    assert employee_calendar.finish_date(date(2025, 1, 6), 4) == date(2025, 1, 10)
+    assert calendar.finish_date(date(2025, 1, 6), 4) == date(2025, 1, 10)
+    assert employee_calendar.add_working_days(date(2025, 1, 6), 3) == date(2025, 1, 10)
+    assert calendar.add_working_days(date(2025, 1, 6), 2) == date(2025, 1, 9)
+
+
+def test_calendar_without_workdays_is_rejected():
+    with pytest.raises(Exception):
+        WorkCalendar(workdays=())
+
+
+def test_calendar_changes_reschedule_tasks(db_manager):
+    db_manager.save_project_start_date("2025-01-06")
+    db_manager.add_employee("Иванов", "ЭТО")
+    db_manager.add_employee("Петров", "ЭТО")
+    first, second = db_manager.add_tasks_bulk([
+        {"name": "Монтаж", "duration": 3, "dependencies": [], "assigned_employee_id": 1, "ref": 1},
+        {"name": "Проверка", "duration": 2, "dependencies": [1], "assigned_employee_id": 2, "ref": 2},
+    ])
+
+    def planned(task_id):
+        task = next(task for task in db_manager.get_all_tasks() if task.id == task_id)
+        return task.planned_start, task.planned_end
+
+    assert planned(second) == (date(2025, 1, 9), date(2025, 1, 10))
+    db_manager.add_holiday("2025-01-07", "Рождество")
+    assert planned(first) == (date(2025, 1, 6), date(2025, 1, 9))
+    assert planned(second) == (date(2025, 1, 10), date(2025, 1, 13))
+
+    # Рабочая суббота только у второго сотрудника
+    db_manager.set_employee_calendar_exception(2, "2025-01-11", True)
+    assert planned(second) == (date(2025, 1, 10), date(2025, 1, 11))
+
+    db_manager.delete_holiday("2025-01-07")
+    db_manager.delete_employee_calendar_exception(2, "2025-01-11")
+    assert planned(second) == (date(2025, 1, 9), date(2025, 1, 10))
+
+    db_manager.save_project_workdays([0, 1, 2, 3, 4, 5])
+    assert planned(first) == (date(2025, 1, 6), date(2025, 1, 8))
+    assert planned(second) == (date(2025, 1, 9), date(2025, 1, 10))